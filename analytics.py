@@ -0,0 +1,326 @@
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+# Buzz, grade and timeout records for coaching players and tuning BUZZ_WINDOW
+# and ANSWER_WINDOW from real play.
+#
+# The event handlers record() a row per play into a fixed-size ring of NumPy
+# rows; nothing is formatted or written on their path. A background worker
+# take()s the rows every few seconds and PlayStore.write() appends them to the
+# game's file, CODE-game_id.plays, as one columnar block: a header, the pids,
+# names and categories first used in it (JSON lines; the player/name/category
+# columns index the game's strings in order), then each column's values as raw
+# little-endian arrays. If the worker falls so far behind that the ring fills,
+# the oldest rows are overwritten and counted.
+#
+# PlayStore.load() maps the blocks back into arrays, parsing only blocks added
+# since its last load, and report() aggregates them with bincounts and sorts,
+# not a Python loop per row, so a query over thousands of games stays fast.
+#
+# Row kinds, and what their ms column holds:
+#   open                       buzzers opened (NaN)
+#   won, beaten                a buzz that won or lost the race: ms after opening
+#   closed, locked_out         a buzz while buzzers were closed (early or after
+#                              the window), or from a player already wrong on the clue
+#   correct, incorrect         a grade: ms after the answer window started
+#   timeout                    the answer window ran out (its length)
+
+KINDS = ('open', 'won', 'beaten', 'closed', 'locked_out', 'correct', 'incorrect', 'timeout')
+OPEN, WON, BEATEN, CLOSED, LOCKED_OUT, CORRECT, INCORRECT, TIMEOUT = range(len(KINDS))
+BUZZES = (WON, BEATEN, CLOSED, LOCKED_OUT)
+JUDGED = (CORRECT, INCORRECT, TIMEOUT)
+
+COLUMNS = (('t', '<f8'), ('kind', 'u1'), ('round', 'u1'), ('value', '<i4'), ('ms', '<f4'),
+           ('player', '<i4'), ('name', '<i4'), ('category', '<i4'))
+STRING_COLUMNS = ('player', 'name', 'category')
+ROW = np.dtype(list(COLUMNS) + [('game', '<i4')])
+ROW_BYTES = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+HEADER = 8  # Block header: rows, bytes of new strings (little-endian uint32s)
+SUFFIX = '.plays'
+PERCENTILES = (50, 90, 99)
+
+
+class Batch:
+    __slots__ = ('rows', 'strings', 'games', 'dropped')
+
+    def __init__(self, rows, strings, games, dropped):
+        self.rows = rows  # ROW array, oldest first
+        self.strings = strings  # The recorder's string table (player/name/category ids index it)
+        self.games = games  # The recorder's [(code, game_id)] (game ids index it)
+        self.dropped = dropped  # Rows overwritten before this take
+
+
+class Recorder:
+    def __init__(self, capacity=65536):
+        self.rows = np.zeros(capacity, ROW)
+        self.head = 0  # Next slot to write
+        self.size = 0  # Rows waiting to be taken
+        self.dropped = 0
+        self.strings = []  # Append-only, so a Batch can keep referring to it
+        self._string_ids = {}
+        self.games = []
+        self._game_ids = {}
+        self._lock = threading.Lock()  # record() on the event loop, take() on the flusher's thread
+
+    def _intern(self, text):
+        if text is None:
+            return -1
+        i = self._string_ids.get(text)
+        if i is None:
+            i = self._string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return i
+
+    def record(self, code, game_id, kind, t, pid=None, name=None, category=None, value=0, round_no=0, ms=None):
+        with self._lock:
+            game = self._game_ids.get((code, game_id))
+            if game is None:
+                game = self._game_ids[(code, game_id)] = len(self.games)
+                self.games.append((code, game_id))
+            self.rows[self.head] = (t, kind, round_no, value or 0, math.nan if ms is None else ms,
+                                    self._intern(pid), self._intern(name), self._intern(category), game)
+            self.head = (self.head + 1) % len(self.rows)
+            if self.size == len(self.rows):
+                self.dropped += 1
+            else:
+                self.size += 1
+
+    def take(self):
+        # The rows recorded since the last take, or None if there are none
+        with self._lock:
+            if not self.size:
+                return None
+            start = self.head - self.size
+            if start < 0:
+                rows = np.concatenate((self.rows[start:], self.rows[:self.head]))
+            else:
+                rows = self.rows[start:self.head].copy()
+            dropped, self.size, self.dropped = self.dropped, 0, 0
+        return Batch(rows, self.strings, self.games, dropped)
+
+
+def encode_block(chunk, strings):
+    header = np.array([len(chunk), len(strings)], '<u4').tobytes()
+    return header + strings + b''.join(chunk[column].astype(dtype).tobytes() for column, dtype in COLUMNS)
+
+
+def decode_blocks(data, strings):
+    # The complete blocks in data as one dict of columns, appending their new
+    # strings to strings; also returns how many bytes they took
+    parts, offset = [], 0
+    while offset + HEADER <= len(data):
+        rows, strings_len = np.frombuffer(data, '<u4', 2, offset).tolist()
+        end = offset + HEADER + strings_len + rows * ROW_BYTES
+        if end > len(data):
+            break  # Partly written
+        strings.extend(json.loads(line) for line in data[offset + HEADER:offset + HEADER + strings_len].splitlines())
+        pos, part = offset + HEADER + strings_len, {}
+        for column, dtype in COLUMNS:
+            part[column] = np.frombuffer(data, dtype, rows, pos)
+            pos += rows * np.dtype(dtype).itemsize
+        parts.append(part)
+        offset = end
+    columns = {column: np.concatenate([part[column] for part in parts]) if parts else np.zeros(0, dtype)
+               for column, dtype in COLUMNS}
+    return columns, offset
+
+
+class Plays:
+    __slots__ = ('columns', 'strings', 'games')
+
+    def __init__(self, columns, strings, games):
+        self.columns = columns  # name -> array, plus 'game' (index into games)
+        self.strings = strings  # What player/name/category index
+        self.games = games  # Game file names
+
+
+class PlayStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._written = {}  # game file -> {text: id} for the strings in it
+        self._read = {}  # game file -> (bytes parsed, its strings, columns with ids into self.strings)
+        self.strings = []  # Strings of every game loaded, so columns of different games share ids
+        self._string_ids = {}
+        self._lock = threading.Lock()
+
+    def write(self, batch):
+        rows = batch.rows[np.argsort(batch.rows['game'], kind='stable')]
+        games, starts = np.unique(rows['game'], return_index=True)
+        with self._lock:
+            for game, chunk in zip(games.tolist(), np.split(rows, starts[1:])):
+                code, game_id = batch.games[game]
+                self._append(f'{code}-{game_id}{SUFFIX}', chunk, batch.strings)
+
+    def _append(self, name, chunk, strings):
+        path = os.path.join(self.directory, name)
+        written = self._written.get(name)
+        if written is None:
+            # First write from this process (e.g. a game recovered after a
+            # restart): pick up its strings and cut off a partly written block
+            known = []
+            if os.path.exists(path):
+                with open(path, 'r+b') as f:
+                    _, valid = decode_blocks(f.read(), known)
+                    f.truncate(valid)
+            written = self._written[name] = {text: i for i, text in enumerate(known)}
+        # Recorder string ids -> this game's; the extra last slot maps -1 (none) to -1
+        lut = np.full(len(strings) + 1, -1, '<i4')
+        new = []
+        used = np.unique(np.concatenate([chunk[column] for column in STRING_COLUMNS]))
+        for i in used[used >= 0].tolist():
+            text = strings[i]
+            if text not in written:
+                written[text] = len(written)
+                new.append(text)
+            lut[i] = written[text]
+        chunk = chunk.copy()
+        for column in STRING_COLUMNS:
+            chunk[column] = lut[chunk[column]]
+        block = encode_block(chunk, b''.join(json.dumps(text).encode() + b'\n' for text in new))
+        with open(path, 'ab') as f:
+            f.write(block)  # One write per game per flush
+
+    def _id(self, text):
+        i = self._string_ids.get(text)
+        if i is None:
+            i = self._string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return i
+
+    def _load_game(self, name):
+        # A game's columns, reading only the blocks added since the last load
+        offset, strings, columns = self._read.get(name, (0, [], None))
+        with open(os.path.join(self.directory, name), 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        added, used = decode_blocks(data, strings)
+        if used or columns is None:
+            lut = np.array([self._id(text) for text in strings] + [-1], '<i4')
+            for column in STRING_COLUMNS:
+                added[column] = lut[added[column]]
+            if columns is not None:
+                added = {column: np.concatenate((columns[column], added[column])) for column in columns}
+            columns = added
+            self._read[name] = (offset + used, strings, columns)
+        return columns
+
+    def load(self, code=None, since=None):
+        # Every recorded row, or one game code's, optionally only those at or after since (epoch seconds)
+        names, parts = [], []
+        with self._lock:
+            for name in sorted(os.listdir(self.directory)):
+                if not name.endswith(SUFFIX) or (code and not name.startswith(code + '-')):
+                    continue
+                columns = self._load_game(name)
+                if len(columns['t']):
+                    names.append(name[:-len(SUFFIX)])
+                    parts.append(columns)
+            strings = list(self.strings)
+        columns = {column: np.concatenate([part[column] for part in parts]) if parts else np.zeros(0, dtype)
+                   for column, dtype in COLUMNS}
+        columns['game'] = np.repeat(np.arange(len(parts)), [len(part['t']) for part in parts])
+        if since is not None:
+            keep = columns['t'] >= since
+            columns = {column: values[keep] for column, values in columns.items()}
+        return Plays(columns, strings, names)
+
+
+def grouped_percentiles(values, groups, size, percentiles=PERCENTILES):
+    # Nearest-rank percentiles of values within each group id in [0, size); NaN for empty groups
+    values = values[np.lexsort((values, groups))]
+    counts = np.bincount(groups, minlength=size)
+    starts = np.cumsum(counts) - counts
+    has = counts > 0
+    result = {}
+    for pct in percentiles:
+        ranks = starts + np.maximum(np.ceil(counts * pct / 100).astype(np.int64) - 1, 0)
+        out = np.full(size, np.nan)
+        out[has] = values[ranks[has]]
+        result[f'p{pct}'] = out
+    return result
+
+
+def _number(value, digits=1):
+    return None if value is None or math.isnan(value) else round(float(value), digits)
+
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def _summary(ms):
+    ms = ms[~np.isnan(ms)]
+    pcts = grouped_percentiles(ms, np.zeros(len(ms), np.int64), 1)
+    return dict({'n': int(len(ms))}, **{k: _number(v[0]) for k, v in pcts.items()})
+
+
+def _by(ids, mask, size):
+    return np.bincount(ids[mask], minlength=size)
+
+
+def report(plays, limit=100):
+    # Reaction times, accuracy and lockout rates: overall, per player (the
+    # `limit` who buzzed most), per category (the `limit` most played) and per clue value
+    c = plays.columns
+    kind, ms, size = c['kind'], c['ms'], len(plays.strings)
+    buzz, judged = np.isin(kind, BUZZES), np.isin(kind, JUDGED)
+    raced = np.isin(kind, (WON, BEATEN)) & ~np.isnan(ms)
+    graded = np.isin(kind, (CORRECT, INCORRECT))
+
+    player, has_player = c['player'], c['player'] >= 0
+    counts = {k: _by(player, has_player & (kind == i), size) for i, k in enumerate(KINDS)}
+    attempts = _by(player, has_player & buzz, size)
+    answered = _by(player, has_player & judged, size)
+    reaction = grouped_percentiles(ms[raced & has_player], player[raced & has_player], size)
+    # Each player's latest name
+    named = np.flatnonzero(has_player & (c['name'] >= 0))
+    named = named[np.argsort(c['t'][named], kind='stable')][::-1]
+    latest, first = np.unique(player[named], return_index=True)
+    names = dict(zip(latest.tolist(), c['name'][named][first].tolist()))
+    players = []
+    for i in np.lexsort((-answered, -attempts))[:limit].tolist():
+        if not attempts[i] and not answered[i]:
+            break
+        players.append({
+            'pid': plays.strings[i], 'name': plays.strings[names[i]] if i in names else None,
+            'buzzes': int(attempts[i]), **{k: int(counts[k][i]) for k in ('won', 'beaten', 'closed', 'locked_out')},
+            'lockout_rate': _rate(int(counts['closed'][i] + counts['locked_out'][i]), int(attempts[i])),
+            'judged': int(answered[i]), 'correct': int(counts['correct'][i]), 'timeouts': int(counts['timeout'][i]),
+            'accuracy': _rate(int(counts['correct'][i]), int(answered[i])),
+            **{f'{k}_ms': _number(v[i]) for k, v in reaction.items()},
+        })
+
+    category, has_category = c['category'], judged & (c['category'] >= 0)
+    cat_judged = _by(category, has_category, size)
+    cat_correct = _by(category, has_category & (kind == CORRECT), size)
+    cat_timeouts = _by(category, has_category & (kind == TIMEOUT), size)
+    categories = [{'category': plays.strings[i], 'judged': int(cat_judged[i]), 'correct': int(cat_correct[i]),
+                   'timeouts': int(cat_timeouts[i]), 'accuracy': _rate(int(cat_correct[i]), int(cat_judged[i]))}
+                  for i in np.argsort(-cat_judged, kind='stable')[:limit].tolist() if cat_judged[i]]
+
+    values, inverse = np.unique(c['value'][judged], return_inverse=True)
+    value_judged = np.bincount(inverse, minlength=len(values))
+    value_correct = np.bincount(inverse, weights=kind[judged] == CORRECT, minlength=len(values))
+    by_value = [{'value': int(v), 'judged': int(n), 'correct': int(k), 'accuracy': _rate(int(k), int(n))}
+                for v, n, k in zip(values.tolist(), value_judged.tolist(), value_correct.tolist())]
+
+    opened, won = int(np.count_nonzero(kind == OPEN)), int(np.count_nonzero(kind == WON))
+    return {
+        'games': int(len(np.unique(c['game']))),
+        'rows': int(len(kind)),
+        'windows': {'opened': opened, 'won': won, 'won_rate': _rate(won, opened)},
+        'reaction_ms': _summary(ms[raced]),
+        'answer_ms': _summary(ms[graded]),
+        'lockout_rate': _rate(int(np.count_nonzero(np.isin(kind, (CLOSED, LOCKED_OUT)))),
+                              int(np.count_nonzero(buzz))),
+        'timeout_rate': _rate(int(np.count_nonzero(kind == TIMEOUT)), int(np.count_nonzero(judged))),
+        'accuracy': _rate(int(np.count_nonzero(kind == CORRECT)), int(np.count_nonzero(judged))),
+        'players': players,
+        'categories': categories,
+        'values': by_value,
+    }
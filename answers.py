@@ -0,0 +1,70 @@
+import re
+import unicodedata
+
+# Loose matching of typed responses against a clue's answer, for pre-grading
+# Final Jeopardy. Both sides are normalized (case, accents, punctuation, a
+# leading "What is"/"Who was", articles), then compared exactly or within a
+# small edit distance that scales with the answer's length. The host still
+# confirms every grade; this only pre-fills them.
+
+_QUESTION = re.compile(r'^(?:(?:what|who|where|when)(?:\s+(?:is|are|was|were))?|whats|whos)\s+')
+_ARTICLES = re.compile(r'\b(?:a|an|the)\b')
+_NON_WORD = re.compile(r'[^a-z0-9 ]+')
+_SPACES = re.compile(r'\s+')
+_PARENS = re.compile(r'\([^)]*\)')
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', str(text or '')).encode('ascii', 'ignore').decode().lower()
+    text = _SPACES.sub(' ', _NON_WORD.sub(' ', text.replace("'", ''))).strip()
+    text = _QUESTION.sub('', text)
+    return _SPACES.sub(' ', _ARTICLES.sub(' ', text)).strip()
+
+
+def edit_distance(a, b, limit):
+    # Levenshtein distance, or limit + 1 as soon as it must exceed limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def allowed_typos(answer):
+    # None allowed in short answers: a typo there is usually a different word
+    return 0 if len(answer) <= 5 else 1 if len(answer) <= 10 else 2
+
+
+class Matcher:
+    def __init__(self, answer, alternates=()):
+        # Parenthesized parts of an answer ("(Saint) Matthew") are optional
+        accepted = set()
+        for text in [answer, *alternates]:
+            for form in (text, _PARENS.sub(' ', str(text or '')), str(text or '').replace('(', '').replace(')', '')):
+                form = normalize(form)
+                if form:
+                    accepted.add(form)
+        self.accepted = sorted(accepted)
+
+    def matches(self, response):
+        response = normalize(response)
+        if not response:
+            return False
+        for answer in self.accepted:
+            if response == answer:
+                return True
+            limit = allowed_typos(answer)
+            if limit and edit_distance(response, answer, limit) <= limit:
+                return True
+        return False
+
+
+def final_matcher(final_jeopardy):
+    # A clue's 'alternates' (optional, in the questions file) are accepted too
+    return Matcher(final_jeopardy.get('answer', ''), final_jeopardy.get('alternates', ()))
@@ -0,0 +1,230 @@
+"""Serve the game on asyncio (ASGI) instead of gevent.
+
+    pip install uvicorn asgiref
+    PORT=5000 python asgi_app.py
+    uvicorn asgi_app:asgi --port 5000
+
+Same pages, Socket.IO events and game rules as app.py (both run
+game_events.py), without monkey patching: python-socketio's AsyncServer on
+uvicorn, with the Flask pages mounted through asgiref. A handler of one game
+runs with that game's lock held until everything it sent has been handed to
+the sockets, so one game's frames go out in version order while other games
+carry on. /watch/stream is served on the loop too; the other Flask routes run
+on asgiref's worker thread.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import urllib.parse
+
+from asgiref.wsgi import WsgiToAsgi
+import socketio
+import telemetry
+
+telemetry.configure_logging(level=os.environ.get('LOG_LEVEL', 'INFO'), fmt=os.environ.get('LOG_FORMAT', 'text'),
+                            rate=float(os.environ.get('LOG_SAMPLE_RATE', 0.01)))
+
+import game_events  # noqa: E402  (after logging is set up, so journal recovery is logged)
+import game_logic  # noqa: E402
+import spectators  # noqa: E402
+from web import app  # noqa: E402
+
+
+def client_manager(url):
+    # python-socketio's asyncio managers cover Redis and AMQP only, not every
+    # kombu URL the gevent runtime accepts
+    if not url:
+        return None
+    scheme = urllib.parse.urlsplit(url).scheme
+    if scheme in ('redis', 'rediss', 'valkey', 'valkeys', 'unix'):
+        return socketio.AsyncRedisManager(url)
+    if scheme in ('amqp', 'amqps'):
+        return socketio.AsyncAioPikaManager(url)
+    raise ValueError(f'SOCKETIO_MESSAGE_QUEUE {scheme}:// is not supported by asgi_app.py; use redis:// or amqp://')
+
+
+sio = socketio.AsyncServer(async_mode='asgi', client_manager=client_manager(os.environ.get('SOCKETIO_MESSAGE_QUEUE')))
+loop = None  # The server's event loop, set at startup
+
+
+class GameLocks:
+    # One asyncio.Lock per game code with someone waiting on it, dropped when
+    # the last holder leaves so finished games leave nothing behind
+    def __init__(self):
+        self.locks = {}  # code -> [lock, holders]
+
+    async def acquire(self, code):
+        entry = self.locks.get(code)
+        if entry is None:
+            entry = self.locks[code] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        await entry[0].acquire()
+
+    def release(self, code):
+        entry = self.locks[code]
+        entry[0].release()
+        entry[1] -= 1
+        if not entry[1]:
+            del self.locks[code]
+
+
+game_locks = GameLocks()
+_outbox = contextvars.ContextVar('outbox', default=None)
+
+
+async def run_serialized(code, fn, *args):
+    # Run a synchronous game_events callable under code's lock (None: no lock),
+    # then send what it emitted, in order, before letting the next one in
+    if code is not None:
+        await game_locks.acquire(code)
+    outbox = []
+    token = _outbox.set(outbox)
+    try:
+        result = fn(*args)
+        for send in outbox:
+            await send
+        return result
+    finally:
+        _outbox.reset(token)
+        for send in outbox:
+            send.close()  # Only unawaited ones left if fn or a send raised
+        if code is not None:
+            game_locks.release(code)
+
+
+class AsyncioTransport(game_events.SocketIOTransport):
+    # game_events on python-socketio's AsyncServer. Sends are coroutines: inside
+    # run_serialized they queue on its outbox, anywhere else (other threads)
+    # they are handed to the loop.
+    server = sio
+    shared = bool(os.environ.get('SOCKETIO_MESSAGE_QUEUE'))
+
+    def _send(self, coro):
+        outbox = _outbox.get()
+        if outbox is not None:
+            outbox.append(coro)
+        else:
+            asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def emit(self, event, data=None, to=None):
+        self._send(sio.emit(event, data, to=to))
+
+    def join_room(self, sid, room):
+        self._send(sio.enter_room(sid, room))
+
+    def close_room(self, room):
+        self._send(sio.close_room(room))
+
+    def start_background_task(self, fn):
+        # The timer service and journal flusher block, so they get threads
+        threading.Thread(target=fn, daemon=True).start()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def run_blocking(self, fn):
+        return fn()  # Already off the loop, in the journal flusher's thread
+
+    def close(self, sock):
+        # Abort rather than close: a close waits for the queue to drain
+        self._send(sock.close(wait=False, abort=True))
+
+
+def run_timer(timer):
+    # The timer service runs in its own thread; callbacks run on the loop, under
+    # the owning game's lock
+    future = asyncio.run_coroutine_threadsafe(run_serialized(timer.owner, timer.callback, *timer.args), loop)
+    future.add_done_callback(report_failure)
+
+
+def report_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        telemetry.log('timer_failed', error=repr(future.exception()))
+
+
+game_events.transport = AsyncioTransport()
+game_events.timer_service.runner = run_timer
+
+
+def bind(event, handler):
+    async def on_event(sid, *args):
+        client = game_events.clients.get(sid)
+        code = client.code if client is not None and handler is not game_events.handle_clock_ping else None
+        return await run_serialized(code, handler, sid, *args)
+    sio.on(event, handler=on_event)
+
+
+for _event, _handler in game_events.HANDLERS.items():
+    bind(_event, _handler)
+
+
+@sio.on('connect')
+async def handle_connect(sid, environ, auth=None):
+    args = {k: v[-1] for k, v in urllib.parse.parse_qs(environ.get('QUERY_STRING', '')).items()}
+    await run_serialized(game_logic.normalize_code(args.get('game')), game_events.handle_connect, sid, args)
+
+
+@sio.on('disconnect')
+async def handle_disconnect(sid, *reason):
+    client = game_events.clients.get(sid)
+    await run_serialized(client.code if client else None, game_events.handle_disconnect, sid)
+
+
+async def watch_stream(scope, receive, send):
+    # spectators.SpectatorHub.stream blocks on a condition between updates, and
+    # on asgiref's single worker thread one open stream would hold up every
+    # page, so watchers are served here: each checks its feed once per tick
+    game_events.start_background_services()
+    query = urllib.parse.parse_qs(scope.get('query_string', b'').decode())
+    code = game_logic.normalize_code(query.get('game', [None])[-1])
+    feed = game_events.spectator_hub.watch(code)
+    gone = asyncio.ensure_future(receive())  # http.disconnect once the watcher leaves
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache'),
+                                (b'x-accel-buffering', b'no')]})
+        await send({'type': 'http.response.body', 'body': spectators.RETRY, 'more_body': True})
+        seen, idle = 0, 0.0
+        while not gone.done():
+            await asyncio.wait([gone], timeout=game_events.SPECTATOR_INTERVAL)
+            if feed.version != seen:
+                seen, idle = feed.version, 0.0
+                await send({'type': 'http.response.body', 'body': feed.chunk, 'more_body': True})
+            else:
+                idle += game_events.SPECTATOR_INTERVAL
+                if idle >= game_events.spectator_hub.keepalive:
+                    idle = 0.0
+                    await send({'type': 'http.response.body', 'body': spectators.KEEPALIVE, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        pass  # Watcher went away mid-write
+    finally:
+        gone.cancel()
+        game_events.spectator_hub.unwatch(code, feed)
+
+
+pages = WsgiToAsgi(app)
+
+
+async def http_app(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == '/watch/stream':
+        return await watch_stream(scope, receive, send)
+    return await pages(scope, receive, send)
+
+
+async def startup():
+    global loop
+    loop = asyncio.get_running_loop()
+
+
+asgi = socketio.ASGIApp(sio, other_asgi_app=http_app, on_startup=startup)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 5000))
+    telemetry.log('serving', url=f'http://0.0.0.0:{port}', runtime='asgi')
+    # asyncio turns TCP_NODELAY on for every connection (see app.listen)
+    uvicorn.run(asgi, host='0.0.0.0', port=port, log_level='warning')
@@ -0,0 +1,93 @@
+"""Board generation latency over a large question bank.
+
+    python benchmarks/bench_board_generator.py --clues 150000 --boards 500
+    python benchmarks/bench_board_generator.py --bank data/bank.sqlite --json
+
+Builds a synthetic bank (unless --bank is given), then times
+BoardGenerator.generate with venue history enabled, and prints p50/p99/max
+latency. --json prints the results as one JSON object for comparing runs.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import board_generator  # noqa: E402
+import question_bank  # noqa: E402
+
+
+def build_bank(path, n_clues, seed=0):
+    rng = random.Random(seed)
+    bank = question_bank.QuestionBank(path)
+    n_categories = n_clues // 5
+    for c in range(n_categories):
+        round_no = 1 if c % 2 else 2
+        cat_id = bank.category_id(f'CATEGORY {c % (n_categories // 3 + 1)}', round_no,
+                                  f'{1984 + c % 40}-{c % 12 + 1:02d}-{c % 28 + 1:02d}')
+        for i in range(5):
+            bank.add_clue(cat_id, {'value': (i + 1) * 200 * round_no, 'text': f'clue {c}-{i} {rng.random()}',
+                                   'answer': f'answer {c}-{i}'}, f'{c}-{i}')
+    final_id = bank.category_id('FINAL', question_bank.FINAL_ROUND)
+    bank.add_clue(final_id, {'value': 0, 'text': 'final', 'answer': 'final'}, 'final')
+    bank.commit()
+    return bank
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bank', help='existing bank to benchmark instead of a synthetic one')
+    parser.add_argument('--clues', type=int, default=150000)
+    parser.add_argument('--boards', type=int, default=500)
+    parser.add_argument('--venues', type=int, default=20)
+    parser.add_argument('--history', type=int, default=10)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.bank:
+        bank = question_bank.QuestionBank(args.bank)
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        started = time.perf_counter()
+        bank = build_bank(os.path.join(tmpdir.name, 'bank.sqlite'), args.clues)
+        if not args.json:
+            print(f"Built bank of {args.clues} clues in {time.perf_counter() - started:.1f}s")
+
+    gen = board_generator.BoardGenerator(bank, history_games=args.history, seed=1)
+    timings = []
+    for i in range(args.boards):
+        venue = f'VENUE{i % args.venues}'
+        started = time.perf_counter()
+        gen.generate(1 + i % 2, venue=venue, game_key=f'game{i // 2}')
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    result = {
+        'benchmark': 'board_generator',
+        'clues': bank.count_clues(),
+        'boards': args.boards,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'max_ms': round(timings[-1], 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+    }
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"{result['boards']} boards over {result['clues']} clues: p50 {result['p50_ms']}ms, "
+              f"p99 {result['p99_ms']}ms, max {result['max_ms']}ms")
+    bank.close()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Bytes on the wire and encode time per game, JSON vs MessagePack frames.
+
+    python benchmarks/bench_wire.py --games 10 --players 8
+    python benchmarks/bench_wire.py --json
+
+Plays scripted games (both rounds, every clue, Final Jeopardy) through app.py's
+Socket.IO test client with two board pages connected, one on the JSON wire and
+one on wire=msgpack. Everything each board receives is re-encoded as the
+Socket.IO packets the server sends and counted, and the time spent encoding
+frames is reported per game for both encodings. Requires msgpack.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from socketio import packet  # noqa: E402
+
+import app as server  # noqa: E402
+import game_events  # noqa: E402
+import wire  # noqa: E402
+
+msgpack_seconds = [0.0]
+_encode_frame = wire.encode_frame
+
+
+def timed_encode_frame(game, frame):
+    started = time.perf_counter()
+    try:
+        return _encode_frame(game, frame)
+    finally:
+        msgpack_seconds[0] += time.perf_counter() - started
+
+
+wire.encode_frame = timed_encode_frame
+
+
+def packet_bytes(name, args):
+    encoded = packet.Packet(packet.EVENT, data=[name] + args).encode()
+    if isinstance(encoded, list):  # Header plus binary attachments
+        return sum(len(p) if isinstance(p, bytes) else len(p.encode()) for p in encoded)
+    return len(encoded.encode())
+
+
+def settle():
+    server.socketio.sleep(0.005)  # Let deferred work (clue close) run
+
+
+def play_game(code, n_players):
+    def connect(wire_format='json'):
+        return server.socketio.test_client(server.app, query_string=f'game={code}&wire={wire_format}')
+
+    board_json, board_msgpack, admin = connect(), connect('msgpack'), connect()
+    players = [connect() for _ in range(n_players)]
+    for i, p in enumerate(players):
+        p.emit('join_game', {'name': f'Player {i}', 'player_id': f'{code}-p{i}'})
+    settle()
+    game = game_events.registry.get(code)
+    sid_of = {p: game.players[f'{code}-p{i}'].sid for i, p in enumerate(players)}
+
+    for round_no in (1, 2):
+        if round_no == 2:
+            admin.emit('admin_start_round_2')
+        for cat_idx in range(len(game.round_data)):
+            for clue_idx in range(len(game.round_data[cat_idx]['clues'])):
+                answerer = players[(cat_idx + clue_idx) % n_players]
+                admin.emit('admin_select_clue', {'cat_idx': cat_idx, 'clue_idx': clue_idx})
+                if game.is_daily_double_turn:
+                    admin.emit('admin_set_wager', {'wager': 500})
+                else:
+                    admin.emit('admin_clear_buzzers')
+                    for p in players:
+                        p.emit('buzz')
+                admin.emit('admin_update_score', {'sid': sid_of[answerer], 'points': 1})
+                admin.emit('admin_close_clue')
+                settle()
+                for c in [admin] + players:
+                    c.get_received()  # Only the boards' traffic is measured
+
+    admin.emit('admin_start_fj')
+    for p in players:
+        p.emit('player_fj_wager', {'wager': 0})
+    admin.emit('admin_reveal_fj_clue')
+    for i, p in enumerate(players):
+        p.emit('player_fj_answer', {'answer': f'What is {i}?'})
+    settle()
+
+    totals = {}
+    for label, client in (('json', board_json), ('msgpack', board_msgpack)):
+        received = client.get_received()
+        totals[label] = {'messages': len(received),
+                         'bytes': sum(packet_bytes(m['name'], m['args']) for m in received)}
+        if label == 'json':
+            frames = [m['args'][0] for m in received if m['name'] == 'frame']
+    started = time.perf_counter()
+    for frame in frames:
+        packet.Packet(packet.EVENT, data=['frame', frame]).encode()
+    totals['json']['encode_s'] = time.perf_counter() - started
+    for c in [board_json, board_msgpack, admin] + players:
+        c.disconnect()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--players', type=int, default=8)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    if 'msgpack' not in wire.ENCODINGS:
+        sys.exit('msgpack is not installed')
+
+    runs = []
+    for g in range(args.games):
+        msgpack_seconds[0] = 0.0
+        totals = play_game(f'WIRE{g}', args.players)
+        totals['msgpack']['encode_s'] = msgpack_seconds[0]
+        runs.append(totals)
+
+    result = {'games': args.games, 'players': args.players}
+    for label in ('json', 'msgpack'):
+        result[label] = {
+            'messages_per_game': round(sum(r[label]['messages'] for r in runs) / len(runs), 1),
+            'bytes_per_game': round(sum(r[label]['bytes'] for r in runs) / len(runs)),
+            'encode_ms_per_game': round(sum(r[label]['encode_s'] for r in runs) / len(runs) * 1000, 3),
+        }
+    result['bytes_saved'] = round(1 - result['msgpack']['bytes_per_game'] / result['json']['bytes_per_game'], 3)
+    if args.json:
+        print(json.dumps(result))
+        return
+    for label in ('json', 'msgpack'):
+        r = result[label]
+        print(f"{label:8} {r['bytes_per_game']:>9} bytes/game over {r['messages_per_game']} messages, "
+              f"{r['encode_ms_per_game']}ms encoding")
+    print(f"msgpack saves {result['bytes_saved']:.1%} of board traffic")
+
+
+if __name__ == '__main__':
+    main()
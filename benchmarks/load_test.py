@@ -0,0 +1,387 @@
+"""Headless load test of the Socket.IO event paths.
+
+    python benchmarks/load_test.py --games 50 --players 20
+    python benchmarks/load_test.py --games 200 --players 10 --clues 10 --json --out results.jsonl
+    python benchmarks/load_test.py --url http://localhost:5000 --server-pid 1234
+    python benchmarks/load_test.py --runtime asgi --games 200 --players 10
+
+Starts app.py (or asgi_app.py with --runtime asgi) on a free port, unless --url
+is given, and drives every game
+with one board, one host and --players player clients over raw Socket.IO
+websockets: join, select clue, open buzzers, everyone buzzes at once, grade,
+close, and a full Final Jeopardy with bulk grading. Reports:
+  - throughput: Socket.IO messages sent + received per second
+  - buzz latency: each player's buzz to its copy of buzz_winner (p50/p99)
+  - fan-out: host's admin_clear_buzzers to the last client in the room
+    receiving buzzers_cleared
+  - server memory per connection (RSS growth while clients connect; needs
+    /proc, so Linux only)
+--json prints one JSON object (with the git commit) and --out appends it to a
+JSON-lines file, so runs can be compared across commits.
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import resource  # noqa: E402
+import socket  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+
+from urllib.parse import urlsplit  # noqa: E402
+
+import gevent  # noqa: E402
+import gevent.event  # noqa: E402
+import gevent.queue  # noqa: E402
+from gevent.pool import Pool  # noqa: E402
+from wsproto import ConnectionType, WSConnection  # noqa: E402
+from wsproto.events import Message, Ping, Request, TextMessage  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+ROUND_SIZE = (6, 5)  # Categories x clues on the stock boards in data/questions.json
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def summarize(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return {'n': len(values), 'p50_ms': round(percentile(values, 50), 3),
+            'p99_ms': round(percentile(values, 99), 3), 'max_ms': round(values[-1], 3)}
+
+
+class BenchClient:
+    # Minimal Socket.IO (Engine.IO v4) client over a raw websocket: just enough
+    # protocol to emit events and time their arrival, one greenlet per socket
+    sent = 0
+    received = 0
+
+    def __init__(self, url, game, timeout, role=None):
+        parsed = urlsplit(url)
+        self.timeout = timeout
+        self.sock = socket.create_connection((parsed.hostname, parsed.port or 80), timeout=timeout)
+        self.sock.settimeout(None)
+        # Small frames: don't let Nagle + delayed ACKs add ~40ms to every round trip
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.ws = WSConnection(ConnectionType.CLIENT)
+        self.sock.sendall(self.ws.send(Request(host=parsed.netloc,
+                                               target=f'/socket.io/?EIO=4&transport=websocket&game={game}'
+                                                      + (f'&role={role}' if role else ''))))
+        self.inbox = gevent.queue.Queue()
+        self.waiters = {}  # event -> [[remaining, AsyncResult, arrivals]]
+        self.reader = gevent.spawn(self.read_loop)
+        self.next_packet()  # Engine.IO open packet
+        self.send('40')
+        packet = self.next_packet()
+        if not packet.startswith('40'):
+            raise ConnectionError(f'namespace connect refused: {packet!r}')
+        self.sid = json.loads(packet[2:])['sid']
+
+    def send(self, text):
+        self.sock.sendall(self.ws.send(Message(data=text)))
+
+    def next_packet(self):
+        # Handshake packets only; once connected, events go to waiters
+        packet = self.inbox.get(timeout=self.timeout)
+        if packet is None:
+            raise ConnectionError('connection closed during handshake')
+        return packet
+
+    def emit(self, event, data=None):
+        BenchClient.sent += 1
+        self.send('42' + json.dumps([event] if data is None else [event, data]))
+
+    def expect(self, event, count=1):
+        # Register before triggering; resolves to [(arrival time, payload), ...]
+        result = gevent.event.AsyncResult()
+        self.waiters.setdefault(event, []).append([count, result, []])
+        return result
+
+    def read_loop(self):
+        text = []
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except OSError:
+                data = b''
+            self.ws.receive_data(data or None)
+            for ev in self.ws.events():
+                if isinstance(ev, TextMessage):
+                    text.append(ev.data)
+                    if ev.message_finished:
+                        self.on_packet(''.join(text))
+                        text = []
+                elif isinstance(ev, Ping):
+                    self.sock.sendall(self.ws.send(ev.response()))
+            if not data:
+                self.inbox.put(None)
+                return
+
+    def on_packet(self, packet):
+        if packet == '2':
+            self.send('3')  # Engine.IO ping
+            return
+        if not packet.startswith('42'):
+            self.inbox.put(packet)
+            return
+        now = time.perf_counter()
+        BenchClient.received += 1
+        event, *args = json.loads(packet[2:])
+        if event == 'frame':
+            # One message carrying every event of a state transition
+            for name, *data in args[0]['events']:
+                self.deliver(name, now, data[0] if data else None)
+        else:
+            self.deliver(event, now, args[0] if args else None)
+
+    def deliver(self, event, now, data):
+        # Final Jeopardy status comes in batches; those count once per player
+        step = len(data['players']) if event == 'admin_fj_status' else 1
+        for waiter in list(self.waiters.get(event, ())):
+            waiter[0] -= step
+            waiter[2].append((now, data))
+            if waiter[0] <= 0:
+                self.waiters[event].remove(waiter)
+                waiter[1].set(waiter[2])
+
+    def close(self):
+        self.sock.close()
+        self.reader.join(timeout=1)
+
+
+class GameRun:
+    def __init__(self, url, code, players, clues, timeout, stats):
+        self.url = url
+        self.code = code
+        self.n_players = players
+        self.clues = clues
+        self.timeout = timeout
+        self.stats = stats
+
+    def connect(self):
+        self.board = BenchClient(self.url, self.code, self.timeout)
+        self.admin = BenchClient(self.url, self.code, self.timeout, role='admin')
+        self.players = [BenchClient(self.url, self.code, self.timeout) for _ in range(self.n_players)]
+        self.everyone = [self.board, self.admin] + self.players
+        for i, p in enumerate(self.players):
+            p.pid = f'{self.code}-p{i}'
+            p.emit('join_game', {'name': f'Player {i}', 'player_id': p.pid})
+
+    def wait(self, results):
+        return [r.get(timeout=self.timeout) for r in results]
+
+    def play(self):
+        for n in range(self.clues):
+            if n == ROUND_SIZE[0] * ROUND_SIZE[1]:
+                started = self.admin.expect('round_2_started')
+                self.admin.emit('admin_start_round_2')
+                self.wait([started])
+            cat_idx, clue_idx = divmod(n % (ROUND_SIZE[0] * ROUND_SIZE[1]), ROUND_SIZE[1])
+            self.play_clue(cat_idx, clue_idx)
+            self.stats['clues'] += 1
+        self.play_final()
+
+    def play_clue(self, cat_idx, clue_idx):
+        shown, dd = self.admin.expect('show_clue'), self.admin.expect('show_daily_double')
+        self.admin.emit('admin_select_clue', {'cat_idx': cat_idx, 'clue_idx': clue_idx})
+        gevent.wait([shown, dd], count=1, timeout=self.timeout)
+        if dd.ready():
+            self.admin.emit('admin_set_wager', {'wager': 0})
+            self.wait([shown])
+            winner_sid = self.players[0].sid
+        else:
+            # Host opens the buzzers; time the broadcast reaching the whole room
+            cleared = [c.expect('buzzers_cleared') for c in self.everyone]
+            sent = time.perf_counter()
+            self.admin.emit('admin_clear_buzzers')
+            arrivals = self.wait(cleared)
+            self.stats['fanout'].append((max(a[0][0] for a in arrivals) - sent) * 1000)
+            # Everyone buzzes at once
+            winners = [p.expect('buzz_winner') for p in self.players]
+            buzzed = {}
+            for p in self.players:
+                buzzed[p] = time.perf_counter()
+                p.emit('buzz', {'client_ts': time.time() * 1000})
+            for p, result in zip(self.players, winners):
+                arrival, data = result.get(timeout=self.timeout)[0]
+                self.stats['buzz'].append((arrival - buzzed[p]) * 1000)
+                winner_sid = data['sid']
+        value = shown.get()[0][1]['value']
+        self.admin.emit('admin_update_score', {'sid': winner_sid, 'points': value})
+        closed = self.admin.expect('update_board_state')
+        self.admin.emit('admin_close_clue')
+        self.wait([closed])
+
+    def play_final(self):
+        started = [p.expect('start_final_jeopardy') for p in self.players]
+        self.admin.emit('admin_start_fj')
+        self.wait(started)
+        wagers = self.admin.expect('admin_fj_status', len(self.players))
+        for p in self.players:
+            p.emit('player_fj_wager', {'wager': 0})
+        self.wait([wagers])
+        shown = [p.expect('show_fj_clue') for p in self.players]
+        self.admin.emit('admin_reveal_fj_clue')
+        self.wait(shown)
+        answers = self.admin.expect('admin_fj_status', len(self.players))
+        for p in self.players:
+            p.emit('player_fj_answer', {'answer': 'What is a benchmark?'})
+        self.wait([answers])
+        graded = self.admin.expect('admin_fj_status', len(self.players))
+        self.admin.emit('admin_grade_fj_bulk', {'grades': {p.pid: True for p in self.players}})
+        self.wait([graded])
+
+    def close(self):
+        for c in self.everyone:
+            c.close()
+
+
+def rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+SERVERS = {'gevent': 'app.py', 'asgi': 'asgi_app.py'}
+
+
+def start_server(port, runtime='gevent'):
+    env = dict(os.environ, PORT=str(port))
+    script = SERVERS[runtime]
+    proc = subprocess.Popen([sys.executable, script], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError(f'{script} exited during startup')
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f'{script} did not start listening')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO load test for the game server.')
+    parser.add_argument('--url', help='drive an already running server instead of starting app.py')
+    parser.add_argument('--server-pid', type=int, help='pid of the --url server, for memory figures')
+    parser.add_argument('--runtime', choices=sorted(SERVERS), default='gevent',
+                        help='server to start: app.py on gevent or asgi_app.py on asyncio')
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--players', type=int, default=10, help='player clients per game')
+    parser.add_argument('--clues', type=int, default=5, help='clues played per game (max 60)')
+    parser.add_argument('--connect-concurrency', type=int, default=100)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--out', help='append the JSON result to this file')
+    args = parser.parse_args()
+
+    # Every client is a socket; lift the soft fd limit as far as allowed
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    proc = None
+    url, pid = args.url, args.server_pid
+    if url is None:
+        port = free_port()
+        proc = start_server(port, args.runtime)
+        url, pid = f'http://127.0.0.1:{port}', proc.pid
+    stats = {'clues': 0, 'buzz': [], 'fanout': [], 'errors': 0}
+    runs = [GameRun(url, f'LOAD{i}', args.players, min(args.clues, 60), args.timeout, stats)
+            for i in range(args.games)]
+    try:
+        rss_before = rss_kb(pid) if pid else None
+        started = time.perf_counter()
+        Pool(max(1, args.connect_concurrency // (args.players + 2))).map(lambda run: run.connect(), runs)
+        connect_s = time.perf_counter() - started
+        gevent.sleep(1)  # Let join_game settle before measuring
+        rss_after = rss_kb(pid) if pid else None
+        connections = sum(len(run.everyone) for run in runs)
+
+        def play(run):
+            try:
+                run.play()
+            except (gevent.Timeout, gevent.queue.Empty, ConnectionError) as e:
+                stats['errors'] += 1
+                print(f'{run.code}: {type(e).__name__} {e}', file=sys.stderr)
+
+        BenchClient.sent = BenchClient.received = 0
+        started = time.perf_counter()
+        gevent.joinall([gevent.spawn(play, run) for run in runs])
+        duration = time.perf_counter() - started
+        for run in runs:
+            run.close()
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    messages = BenchClient.sent + BenchClient.received
+    result = {
+        'benchmark': 'socketio_load',
+        'commit': git_commit(),
+        'runtime': None if args.url else args.runtime,
+        'games': args.games,
+        'players_per_game': args.players,
+        'connections': connections,
+        'connect_s': round(connect_s, 3),
+        'duration_s': round(duration, 3),
+        'clues_played': stats['clues'],
+        'messages': messages,
+        'messages_per_s': round(messages / duration, 1) if duration else None,
+        'buzz_to_winner': summarize(stats['buzz']),
+        'fanout': summarize(stats['fanout']),
+        'server_rss_mb': round(rss_after / 1024, 1) if rss_after else None,
+        'rss_per_connection_kb': (round((rss_after - rss_before) / connections, 1)
+                                  if rss_before and rss_after else None),
+        'errors': stats['errors'],
+    }
+    if args.out:
+        with open(args.out, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"{connections} connections in {args.games} games, connected in {result['connect_s']}s")
+        print(f"{stats['clues']} clues in {result['duration_s']}s: {result['messages_per_s']} msgs/s, "
+              f"{stats['errors']} errors")
+        for label, key in (('Buzz to buzz_winner', 'buzz_to_winner'), ('Broadcast fan-out', 'fanout')):
+            s = result[key]
+            if s:
+                print(f"{label}: p50 {s['p50_ms']}ms, p99 {s['p99_ms']}ms, max {s['max_ms']}ms (n={s['n']})")
+        if result['rss_per_connection_kb'] is not None:
+            print(f"Server RSS {result['server_rss_mb']}MB, {result['rss_per_connection_kb']}KB per connection")
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
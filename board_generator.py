@@ -0,0 +1,142 @@
+import random
+import time
+
+import question_bank
+
+# Assembles rounds from the question bank under a few constraints:
+#   - N categories, each able to fill the round's whole value ladder
+#   - no clue a venue has seen in its last K games, as long as the bank has
+#     enough others; past that the categories it saw least recently come back
+#   - no two categories with the same name on one board
+#   - difficulty balance: the bank carries no difficulty ratings, so a category's
+#     tier is the round it originally aired in (Double Jeopardy material is
+#     harder). tier_mix says how many categories each round draws per tier;
+#     by default each round swaps one category for one from the other tier.
+#   - Daily Doubles weighted toward the lower rows, one per category at most
+# Everything random comes from one seeded random.Random, so the same seed over
+# the same bank builds the same board.
+
+# Share of Daily Doubles per row on the show, top row first
+DD_ROW_WEIGHTS = [0.0, 0.09, 0.26, 0.39, 0.26]
+DAILY_DOUBLES = {1: 1, 2: 2}
+DEFAULT_TIER_MIX = {1: {1: 5, 2: 1}, 2: {1: 1, 2: 5}}
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS venue_history (
+    venue TEXT NOT NULL,
+    game_key TEXT NOT NULL,
+    played_at REAL NOT NULL,
+    clue_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS venue_history_venue ON venue_history (venue, played_at);
+"""
+
+
+class BoardError(ValueError):
+    pass
+
+
+class BoardGenerator:
+    def __init__(self, bank, history_games=10, tier_mix=None, seed=None):
+        self.bank = bank
+        self.history_games = history_games  # K: recent games per venue whose clues are excluded
+        self.tier_mix = tier_mix or DEFAULT_TIER_MIX
+        self.rng = random.Random(seed)
+        self._history_ready = False
+
+    def _history(self):
+        if not self._history_ready:
+            self.bank.conn.executescript(HISTORY_SCHEMA)
+            self._history_ready = True
+        return self.bank.conn
+
+    def recent_clues(self, venue):
+        # clue id -> when the venue last played it, over its last K games
+        if not venue or not self.history_games:
+            return {}
+        conn = self._history()
+        rows = conn.execute(
+            'SELECT clue_id, MAX(played_at) FROM venue_history WHERE venue = ? AND game_key IN ('
+            ' SELECT game_key FROM venue_history WHERE venue = ?'
+            ' GROUP BY game_key ORDER BY MAX(played_at) DESC LIMIT ?) GROUP BY clue_id',
+            (venue, venue, self.history_games)).fetchall()
+        return dict(rows)
+
+    def record_round(self, venue, game_key, round_data):
+        if not venue:
+            return
+        conn = self._history()
+        now = time.time()
+        conn.executemany('INSERT INTO venue_history (venue, game_key, played_at, clue_id) VALUES (?, ?, ?, ?)',
+                         [(venue, game_key, now, clue['id']) for cat in round_data for clue in cat['clues']])
+        # Only the last K games matter, so the history never grows past that per venue
+        conn.execute('DELETE FROM venue_history WHERE venue = ? AND game_key NOT IN ('
+                     ' SELECT game_key FROM venue_history WHERE venue = ?'
+                     ' GROUP BY game_key ORDER BY MAX(played_at) DESC LIMIT ?)',
+                     (venue, venue, max(self.history_games, 1)))
+        conn.commit()
+
+    def pick_categories(self, mix, ladder_size, recent, rng):
+        picked, names, seen_ids = [], set(), set()
+        for tier, count in sorted(mix.items()):
+            wanted = len(picked) + count
+            stale = []  # (last played, category) for those the venue saw recently
+            # A few rounds of oversampling absorb venue-history and name collisions
+            for _ in range(8):
+                if len(picked) >= wanted:
+                    break
+                for cat in self.bank.random_categories(tier, (wanted - len(picked)) * 2, ladder_size, rng, seen_ids):
+                    seen_ids.add(cat['id'])
+                    if len(picked) >= wanted or cat['category'] in names:
+                        continue
+                    clues = self.bank.category_clues(cat['id'])[:ladder_size]
+                    played = [recent[clue['id']] for clue in clues if clue['id'] in recent]
+                    if played:
+                        stale.append((max(played), len(stale), {'category': cat['category'], 'clues': clues}))
+                        continue
+                    names.add(cat['category'])
+                    picked.append({'category': cat['category'], 'clues': clues})
+            # Too few the venue hasn't seen: repeat the least recently played
+            for _, _, cat in sorted(stale, key=lambda s: s[:2]):
+                if len(picked) >= wanted:
+                    break
+                if cat['category'] not in names:
+                    names.add(cat['category'])
+                    picked.append(cat)
+            if len(picked) < wanted:
+                raise BoardError(f'the question bank has fewer than {count} tier-{tier} categories '
+                                 f'with {ladder_size} clues')
+        rng.shuffle(picked)
+        return picked
+
+    def place_daily_doubles(self, round_no, round_data, rng):
+        coords = []
+        free_cols = list(range(len(round_data)))
+        for _ in range(DAILY_DOUBLES.get(round_no, 0)):
+            if not free_cols:
+                break
+            col = free_cols.pop(rng.randrange(len(free_cols)))
+            rows = len(round_data[col]['clues'])
+            row = rng.choices(range(rows), weights=DD_ROW_WEIGHTS[:rows])[0]
+            coords.append((col, row))
+        return coords
+
+    def generate(self, round_no, venue=None, game_key=None, n_categories=6, seed=None):
+        # Returns (round_data, daily_double_coords); round_data matches data/questions.json
+        rng = random.Random(seed) if seed is not None else self.rng
+        ladder = question_bank.ROUND_LADDERS[round_no]
+        mix = self.tier_mix.get(round_no, {})
+        if sum(mix.values()) != n_categories:
+            mix = {round_no: n_categories}
+        with self.bank.lock:
+            round_data = self.pick_categories(mix, len(ladder), self.recent_clues(venue), rng)
+            for cat in round_data:
+                for clue, value in zip(cat['clues'], ladder):
+                    clue['value'] = value
+            if game_key:
+                self.record_round(venue, game_key, round_data)
+        return round_data, self.place_daily_doubles(round_no, round_data, rng)
+
+    def final(self, seed=None):
+        rng = random.Random(seed) if seed is not None else self.rng
+        return self.bank.materialize_final(rng)
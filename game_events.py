@@ -0,0 +1,1008 @@
+import atexit
+import collections
+import contextlib
+import logging
+import os
+import time
+
+import analytics
+import answers
+import board_generator
+import game_logic
+import journal
+import media
+import pagecache
+import question_bank
+import ratelimit
+import sounds
+import spectators
+import state_store
+import telemetry
+import timers
+import wire
+
+# The game's Socket.IO events and everything they share (registry, timers,
+# frames, journal, metrics), independent of the server runtime. app.py serves
+# them with Flask-SocketIO on gevent, asgi_app.py with python-socketio on
+# asyncio; each binds HANDLERS, handle_connect and handle_disconnect to its
+# server and sets `transport`. Handlers run synchronously from start to finish,
+# so a runtime only has to keep two handlers of the same game from running at
+# once (gevent gets that from cooperative scheduling, asyncio from a lock per game).
+
+# Idle games are dropped after GAME_TTL seconds; the sweep runs every GAME_SWEEP_INTERVAL
+GAME_TTL = int(os.environ.get('GAME_TTL', 3600))
+GAME_SWEEP_INTERVAL = int(os.environ.get('GAME_SWEEP_INTERVAL', 60))
+
+BUZZ_WINDOW = 10  # Seconds players have to buzz once buzzers open
+ANSWER_WINDOW = 10  # Seconds the buzz winner has to answer
+DD_ANSWER_WINDOW = 30
+FJ_ANSWER_WINDOW = 30
+# Seconds to collect buzzes before awarding the earliest latency-corrected one;
+# 0 awards the first packet to arrive. Hosts can change it per game.
+BUZZ_ARBITRATION_WINDOW = float(os.environ.get('BUZZ_ARBITRATION_WINDOW', 0))
+# Joins, leaves and score changes within this many seconds go out as one players_delta
+PLAYER_FLUSH_INTERVAL = float(os.environ.get('PLAYER_FLUSH_INTERVAL', 0.1))
+# Recent frames kept per game so a reconnecting page can catch up on what it
+# missed; a page further behind than this gets a full snapshot instead
+FRAME_HISTORY = int(os.environ.get('FRAME_HISTORY', 64))
+# Final Jeopardy wagers and answers reach the host (only) in batches, this often
+FJ_STATUS_INTERVAL = float(os.environ.get('FJ_STATUS_INTERVAL', 0.25))
+
+# Inbound events each connection may send, as (per second, burst), per event
+# type; anything over is dropped before it reaches the game
+RATE_LIMITS = {
+    'buzz': (10, 10),
+    'player_fj_wager': (2, 5),
+    'player_fj_answer': (2, 5),
+}
+DEFAULT_RATE_LIMIT = (20, 40)
+# A socket with more than this many packets waiting to be written (a client
+# that stopped reading) is disconnected; it resumes from the frame history when
+# it comes back. Checked every BACKPRESSURE_INTERVAL seconds.
+MAX_OUTBOUND = int(os.environ.get('MAX_OUTBOUND', 500))
+BACKPRESSURE_INTERVAL = float(os.environ.get('BACKPRESSURE_INTERVAL', 1.0))
+
+# STATE_STORE moves game state out of process memory so several workers can share
+# it (see state_store.from_url); unset keeps every game in this process
+# QUESTION_BANK points at a SQLite question bank (see question_bank.py and
+# import_clues.py); unset plays the boards in data/questions.json. Boards from
+# the bank skip every clue the game code saw in its last BOARD_HISTORY_GAMES games.
+boards = None
+if os.environ.get('QUESTION_BANK'):
+    boards = board_generator.BoardGenerator(question_bank.QuestionBank(os.environ['QUESTION_BANK']),
+                                            history_games=int(os.environ.get('BOARD_HISTORY_GAMES', 10)))
+# JOURNAL_DIR journals every in-process game there (see journal.py) so a restart
+# picks games up where they were; the journal is flushed every JOURNAL_FLUSH_INTERVAL
+# seconds and compacted every JOURNAL_SNAPSHOT_EVERY events
+JOURNAL_FLUSH_INTERVAL = float(os.environ.get('JOURNAL_FLUSH_INTERVAL', 0.05))
+game_journal = None
+if os.environ.get('JOURNAL_DIR'):
+    game_journal = journal.GameJournal(os.environ['JOURNAL_DIR'],
+                                       snapshot_every=int(os.environ.get('JOURNAL_SNAPSHOT_EVERY', 500)))
+    atexit.register(game_journal.flush)
+# ANALYTICS_DIR records every buzz, grade and answer timeout (see analytics.py)
+# for /analytics; rows are written there every ANALYTICS_FLUSH_INTERVAL seconds
+ANALYTICS_FLUSH_INTERVAL = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL', 2.0))
+plays = None
+play_store = None
+if os.environ.get('ANALYTICS_DIR'):
+    plays = analytics.Recorder(int(os.environ.get('ANALYTICS_BUFFER', 65536)))
+    play_store = analytics.PlayStore(os.environ['ANALYTICS_DIR'])
+    atexit.register(lambda: write_plays())
+_recover_started = time.time()
+registry = game_logic.GameRegistry(ttl=GAME_TTL, store=state_store.from_url(os.environ.get('STATE_STORE')),
+                                   arbitration_window=BUZZ_ARBITRATION_WINDOW, boards=boards, journal=game_journal)
+if registry.journal is not None and registry.games:
+    telemetry.log('journal_recovered', games=len(registry.games), dir=game_journal.directory,
+                  ms=round((time.time() - _recover_started) * 1000))
+clients = {}  # sid -> Client (each socket belongs to exactly one game room)
+# Metrics served on /metrics (see telemetry.py)
+metrics = telemetry.REGISTRY
+buzz_packets = metrics.counter('jeopardy_buzz_total', 'Buzz packets by outcome', ['result'])
+handler_seconds = metrics.histogram('jeopardy_handler_seconds', 'Socket event handler duration', ['handler'])
+broadcast_seconds = metrics.histogram('jeopardy_broadcast_seconds', 'Time to fan a room broadcast out', ['event'])
+timer_lateness = metrics.histogram('jeopardy_timer_lateness_seconds', 'How far past its deadline a timer fired', ['timer'])
+connected_clients = metrics.gauge('jeopardy_connected_clients', 'Connected sockets per game', ['game'])
+games_held = metrics.gauge('jeopardy_games', 'Games held in this process')
+pending_timers = metrics.gauge('jeopardy_pending_timers', 'Timers waiting to fire')
+spectator_watchers = metrics.gauge('jeopardy_spectators', 'Open /watch streams in this process')
+events_dropped = metrics.counter('jeopardy_events_dropped_total', 'Inbound events over the rate limit', ['event'])
+plays_dropped = metrics.counter('jeopardy_plays_dropped_total', 'Analytics rows overwritten before they were written')
+slow_clients_dropped = metrics.counter('jeopardy_slow_clients_dropped_total',
+                                       'Sockets disconnected with more than MAX_OUTBOUND packets waiting')
+profiler = telemetry.GameProfiler()
+# Spectators (/watch) get a read-only projection of their game, refreshed at
+# most every SPECTATOR_INTERVAL seconds and shared by all of them (see
+# spectators.py); spectator.py serves them from a separate process instead
+SPECTATOR_INTERVAL = float(os.environ.get('SPECTATOR_INTERVAL', 0.5))
+spectator_hub = spectators.SpectatorHub()
+
+# Versioned URLs and per-round media manifests for files under static/ (media.py)
+assets = media.AssetIndex(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+media_manifests = {}  # game code -> ((game_id, round), manifest)
+# Rendered /board and /admin shells and /board/data bodies (pagecache.py)
+pages = pagecache.RenderCache()
+
+# SOUND_PACK names a JSON sound pack (see sounds.py), rendered at startup into
+# static/assets/audio/packs/<name> (only the sounds that changed) and played by
+# the board instead of the defaults
+SOUND_PACK = os.environ.get('SOUND_PACK')
+sound_dir = 'assets/audio'
+sound_names = sorted(sounds.DEFAULT_PACK)
+if SOUND_PACK:
+    _pack = sounds.load_pack(SOUND_PACK)
+    sound_dir = f'assets/audio/packs/{os.path.splitext(os.path.basename(SOUND_PACK))[0]}'
+    sound_names = sorted(_pack)
+    _built = sounds.build_pack(_pack, os.path.join(assets.root, sound_dir))
+    telemetry.log('sound_pack_built', pack=SOUND_PACK, written=len(_built['written']), cached=len(_built['cached']),
+                  ms=round(_built['seconds'] * 1000, 1))
+
+# Every game timer in this process runs off one scheduler loop, owned by game code
+timer_service = timers.TimerService(
+    on_fire=lambda timer, late: timer_lateness.labels(timer.name).observe(max(0.0, late)))
+_background_started = False
+
+# The server runtime (app.py on gevent, asgi_app.py on asyncio) sets this to an
+# object with emit(event, data, to), join_room(sid, room), close_room(room),
+# start_background_task(fn), sleep(seconds), run_blocking(fn), backlogged(limit)
+# (sids with more than limit packets waiting to be written), drop(sid) and
+# listening(room) (False only when nobody can be in the room).
+transport = None
+
+
+class SocketIOTransport:
+    # What both runtimes' transports share: python-socketio's Server and
+    # AsyncServer keep Engine.IO sockets and the sid mapping the same way.
+    # Subclasses set server and close(sock) the runtime's way.
+    server = None
+    shared = False  # True when a message queue fans emits out to other workers
+
+    def listening(self, room):
+        # Members on other workers are not visible here, so a shared room always may have some
+        return self.shared or bool(self.server.manager.rooms.get('/', {}).get(room))
+
+    def backlogged(self, limit):
+        server = self.server
+        sids = [server.manager.sid_from_eio_sid(eio_sid, '/') for eio_sid, sock in list(server.eio.sockets.items())
+                if sock.queue.qsize() > limit]
+        return [sid for sid in sids if sid is not None]  # None: not connected to Socket.IO yet
+
+    def drop(self, sid):
+        sock = self.server.eio.sockets.get(self.server.manager.eio_sid_from_sid(sid, '/'))
+        if sock is not None:
+            self.close(sock)
+
+    def close(self, sock):
+        raise NotImplementedError
+
+
+class Client:
+    # One connected socket: the game it joined, its role, its wire encoding and its rate limits
+    __slots__ = ('sid', 'code', 'role', 'encoding', 'buckets')
+
+    def __init__(self, sid, code, encoding, role=None):
+        self.sid = sid
+        self.code = code
+        self.role = role if role in ROLES else None  # 'admin', 'board', or None for players
+        self.encoding = encoding
+        self.buckets = {}  # event -> ratelimit.TokenBucket, made on first use
+
+    def allow(self, event):
+        bucket = self.buckets.get(event)
+        if bucket is None:
+            bucket = self.buckets[event] = ratelimit.TokenBucket(*RATE_LIMITS.get(event, DEFAULT_RATE_LIMIT),
+                                                                 clock=timer_service.clock)
+        if bucket.take():
+            return True
+        events_dropped.labels(event).inc()
+        return False
+
+    def emit(self, event, data=None):
+        transport.emit(event, data, to=self.sid)
+
+
+HANDLERS = {}  # Socket.IO event -> handler(sid, *args), bound by the server runtime
+
+def on(event):
+    # Register a game event handler. It is called as f(client, game, *args) for
+    # the game the calling socket joined, inside a registry session, so it is
+    # atomic per game, and everything it broadcasts goes out as one frame.
+    def register(f):
+        timing = handler_seconds.labels(f.__name__)
+
+        def handler(sid, *args):
+            client = clients.get(sid)
+            if client is None or not client.allow(event):
+                return
+            started = time.perf_counter()
+            with registry.session(client.code, create=False) as game:
+                if game is None:
+                    return
+                with profiler.profile(game.code), game_frame(game):
+                    result = f(client, game, *args)
+                if game.dirty_players:
+                    schedule_player_flush(game.code)
+            timing.observe(time.perf_counter() - started)
+            return result
+        HANDLERS[event] = handler
+        return f
+    return register
+
+_frames = {}  # game code -> [[event, data], ...] for the frame being built
+frame_history = {}  # game code -> deque of the last FRAME_HISTORY frames sent
+
+@contextlib.contextmanager
+def game_frame(game):
+    # Everything broadcast to the room while this is open goes out as one
+    # versioned 'frame' when the action is done: {v, phase, events}. Clients
+    # run the events' handlers back to back (static/js/frames.js), so the room
+    # never sees half a transition, and a gap in v tells them to resync.
+    if game.code in _frames:
+        yield  # Nested; the outer frame sends
+        return
+    events = _frames[game.code] = []
+    try:
+        yield
+    finally:
+        del _frames[game.code]
+    answer = _host_answers.pop(game.code, None)
+    delta = game.take_player_delta()
+    if delta:
+        # Player changes made by this action ride along instead of waiting for the flush
+        timer_service.cancel(game.code, 'player_flush')
+        events.append(['players_delta', delta])
+    if events:
+        game.frame_version += 1
+        frame = {'v': game.frame_version, 'phase': game_phase(game), 'events': events}
+        history = frame_history.get(game.code)
+        if history is None:
+            history = frame_history[game.code] = collections.deque(maxlen=FRAME_HISTORY)
+        history.append(frame)
+        started = time.perf_counter()
+        transport.emit('frame', frame, to=wire.room(game.code, 'json'))
+        room = wire.room(game.code, 'msgpack')
+        if 'msgpack' in wire.ENCODINGS and transport.listening(room):
+            transport.emit('frame', wire.encode_frame(game, frame), to=room)
+        broadcast_seconds.labels('frame').observe(time.perf_counter() - started)
+    if answer:
+        transport.emit('clue_answer', answer, to=role_room(game.code, 'admin'))
+
+@contextlib.contextmanager
+def framed_session(code):
+    # Registry session for timer callbacks and other work outside a socket handler
+    with registry.session(code, create=False) as game:
+        if game is None:
+            yield None
+            return
+        with game_frame(game):
+            yield game
+
+def active_timer(game):
+    # The countdown clients are showing, if any
+    for name in ('buzz', 'answer', 'fj_answer'):
+        timer = timer_service.get(game.code, name)
+        if timer is not None:
+            return dict(timer.countdown(), name=name)
+    return None
+
+def game_phase(game):
+    phase = game.phase()
+    phase['timer'] = active_timer(game)
+    return phase
+
+def spectator_view(game):
+    view = game.spectator_view()
+    view['timer'] = active_timer(game)
+    manifest = media_manifest(game)
+    if manifest['media']:
+        # Spectator pages prefetch these; the clue points at the same versioned URL
+        view['media'] = [m['src'] for m in manifest['media']]
+        if view['clue'] and view['clue']['media_url']:
+            view['clue']['media_url'] = next((m['src'] for m in manifest['media']
+                                              if m['url'] == view['clue']['media_url']), view['clue']['media_url'])
+    return spectators.encode(view)
+
+def media_manifest(game):
+    # Built once per game and round (see media.round_manifest)
+    key = (game.game_id, game.current_round)
+    cached = media_manifests.get(game.code)
+    if cached is None or cached[0] != key:
+        cached = media_manifests[game.code] = (key, media.round_manifest(game.current_round, game.round_data, assets))
+    return cached[1]
+
+def state_events(game):
+    # Events that rebuild a client's view from scratch, for a resync frame
+    events = [['player_list_update', game.player_snapshot()]]
+    for cat_idx, column in enumerate(game.board_state):
+        for clue_idx, answered in enumerate(column):
+            if answered:
+                events.append(['update_board_state', {'cat_idx': cat_idx, 'clue_idx': clue_idx}])
+    events.append(['hide_clue'])
+    if game.in_final_jeopardy:
+        events.append(['start_final_jeopardy', {'category': game.final_jeopardy.get('category')}])
+    elif game.wager_pending:
+        events.append(['show_daily_double', public_clue(daily_double_clue(game))])  # The clue itself waits for the wager
+    elif game.current_clue:
+        events.append(['show_clue', public_clue(game.current_clue)])
+    if game.current_buzzer:
+        p = game.get_player_by_sid(game.current_buzzer)
+        events.append(['buzz_winner', {'sid': game.current_buzzer, 'name': p.name if p else 'Unknown'}])
+    if game.buzzers_locked:
+        events.append(['buzzers_locked'])
+    else:
+        events.append(['buzzers_reopened', {'locked_out': sorted(game.incorrect_buzzers)}])
+    timer = game_phase(game)['timer']
+    if timer:
+        events.append(['start_timer', timer])
+    return events
+
+def broadcast(code, event, data=None):
+    # Emit to everyone in a game's room, timing the fan-out per event. Inside a
+    # game_frame the event is added to the frame instead. Clues go out without
+    # their answer, which only the host gets (see send_clue_answer).
+    answer = None
+    if event in CLUE_EVENTS and isinstance(data, dict) and 'answer' in data:
+        answer = clue_answer(data)
+        data = public_clue(data)
+    frame = _frames.get(code)
+    if frame is not None:
+        frame.append([event] if data is None else [event, data])
+        if answer:
+            _host_answers[code] = answer
+        return
+    started = time.perf_counter()
+    transport.emit(event, data, to=code)
+    if answer:
+        transport.emit('clue_answer', answer, to=role_room(code, 'admin'))
+    broadcast_seconds.labels(event).observe(time.perf_counter() - started)
+
+CLUE_EVENTS = ('show_clue', 'show_daily_double')
+_host_answers = {}  # game code -> clue_answer for the host, sent after the frame being built
+
+def public_clue(clue):
+    return {k: v for k, v in clue.items() if k != 'answer'}
+
+def clue_answer(clue):
+    return {'cat_idx': clue.get('cat_idx'), 'clue_idx': clue.get('clue_idx'), 'answer': clue.get('answer')}
+
+def send_clue_answer(client, game):
+    # The open clue's answer, to a host page that has just been resynced
+    if client.role == 'admin' and game.current_clue and not game.in_final_jeopardy:
+        client.emit('clue_answer', clue_answer(game.current_clue))
+
+def start_background_services():
+    # Started on first use, once per process
+    global _background_started
+    if not _background_started:
+        _background_started = True
+        transport.start_background_task(timer_service.run_forever)
+        timer_service.schedule(None, 'sweep', GAME_SWEEP_INTERVAL, evict_idle_games)
+        timer_service.schedule(None, 'spectate', SPECTATOR_INTERVAL, publish_spectator_views)
+        timer_service.schedule(None, 'backpressure', BACKPRESSURE_INTERVAL, drop_slow_clients)
+        if registry.journal is not None:
+            transport.start_background_task(flush_journal_forever)
+        if plays is not None:
+            transport.start_background_task(flush_plays_forever)
+
+def flush_journal_forever():
+    # Group commit: one write+fsync per game per interval, however many events
+    # arrived. The I/O runs off the event loop (see the transports), so a slow
+    # disk never stalls it.
+    while True:
+        transport.sleep(JOURNAL_FLUSH_INTERVAL)
+        if registry.journal.pending():
+            try:
+                transport.run_blocking(registry.journal.flush)
+            except OSError as e:
+                telemetry.log('journal_flush_failed', level=logging.ERROR, error=str(e))
+
+def flush_plays_forever():
+    while True:
+        transport.sleep(ANALYTICS_FLUSH_INTERVAL)
+        try:
+            transport.run_blocking(write_plays)
+        except OSError as e:
+            telemetry.log('analytics_flush_failed', level=logging.ERROR, error=str(e))
+
+def write_plays():
+    batch = plays.take()
+    if batch is not None:
+        if batch.dropped:
+            plays_dropped.inc(batch.dropped)
+        play_store.write(batch)
+
+def evict_idle_games():
+    timer_service.schedule(None, 'sweep', GAME_SWEEP_INTERVAL, evict_idle_games)
+    for code in registry.evict_idle():
+        forget_game(code)
+        telemetry.log('game_evicted', game=code)
+
+def forget_game(code):
+    # Drop everything this process holds for a game that left the registry
+    timer_service.cancel_owner(code)
+    frame_history.pop(code, None)
+    profiler.discard(code)
+    fj_pending.pop(code, None)
+    media_manifests.pop(code, None)
+    pages.discard(code)
+    buzz_opened.pop(code, None)
+    connected_clients.remove(code)
+    broadcast(code, 'game_expired', {'game': code})
+    transport.close_room(code)
+    for sid in [s for s, c in clients.items() if c.code == code]:
+        del clients[sid]
+
+def publish_spectator_views():
+    # One projection per watched game per tick, however many are watching
+    timer_service.schedule(None, 'spectate', SPECTATOR_INTERVAL, publish_spectator_views)
+    for code in spectator_hub.watched():
+        game = registry.peek(code)
+        if game is not None:
+            spectator_hub.publish(code, spectator_view(game))
+
+def drop_slow_clients():
+    # Bounds what the server holds for a client that stopped reading
+    timer_service.schedule(None, 'backpressure', BACKPRESSURE_INTERVAL, drop_slow_clients)
+    for sid in transport.backlogged(MAX_OUTBOUND):
+        slow_clients_dropped.inc()
+        telemetry.log('slow_client_dropped', level=logging.WARNING, sid=sid,
+                      game=clients[sid].code if sid in clients else None)
+        transport.drop(sid)
+
+ROLES = ('admin', 'board')
+
+def role_room(code, role):
+    # Host and board pages connect with role=admin / role=board and also join this room
+    return f'{code}/{role}'
+
+fj_pending = {}  # game code -> pids whose Final Jeopardy status the host hasn't seen
+
+def queue_fj_status(code, pid):
+    pending = fj_pending.setdefault(code, set())
+    pending.add(pid)
+    if timer_service.get(code, 'fj_status') is None:
+        timer_service.schedule(code, 'fj_status', FJ_STATUS_INTERVAL, flush_fj_status, code)
+
+def flush_fj_status(code):
+    pids = fj_pending.pop(code, None)
+    game = registry.peek(code)
+    if pids and game is not None:
+        transport.emit('admin_fj_status', fj_status(game, sorted(pids)), to=role_room(code, 'admin'))
+
+def fj_status(game, pids):
+    # Each player's progress and answer, with the matcher's suggested grade
+    matcher = answers.final_matcher(game.final_jeopardy)
+    players = []
+    for pid in pids:
+        if pid not in game.players:
+            continue
+        answer = game.fj_answers.get(pid)
+        players.append({'pid': pid, 'has_wager': pid in game.fj_wagers, 'has_answer': answer is not None,
+                        'answer': answer, 'suggested': matcher.matches(answer) if answer is not None else None,
+                        'graded': game.fj_grades.get(pid)})
+    return {'players': players}
+
+def schedule_player_flush(code):
+    # Coalesce player changes: the first change in a burst schedules the flush,
+    # later ones ride along with it
+    if timer_service.get(code, 'player_flush') is None:
+        timer_service.schedule(code, 'player_flush', PLAYER_FLUSH_INTERVAL, flush_player_updates, code)
+
+def flush_player_updates(code):
+    with framed_session(code):
+        pass  # The frame picks up the pending players_delta
+
+def start_countdown(game, name, seconds, callback=None, *args):
+    # Schedule the server-side deadline and show clients the same deadline
+    timer = timer_service.schedule(game.code, name, seconds, callback or (lambda: None), *args)
+    broadcast(game.code, 'start_timer', timer.countdown())
+    return timer
+
+# --- Socket.IO events ---
+
+def handle_connect(sid, args):
+    # Called by the runtime with the connect query string. Clients connect with
+    # io({query: {game: CODE, wire: ...}}) and are scoped to that game's room.
+    start_background_services()
+    with registry.session(args.get('game')) as game:
+        client = clients[sid] = Client(sid, game.code, wire.client_encoding(args), args.get('role'))
+        role = client.role
+        transport.join_room(sid, game.code)
+        transport.join_room(sid, wire.room(game.code, client.encoding))
+        if client.encoding == 'msgpack':
+            send_clue_table(client, game)
+        if role:
+            transport.join_room(sid, role_room(game.code, role))
+        if role == 'admin' and game.in_final_jeopardy:
+            client.emit('admin_fj_status', fj_status(game, game.players))
+        if role == 'board' and media_manifest(game)['media']:
+            client.emit('media_manifest', media_manifest(game))
+    connected_clients.labels(game.code).inc()
+    telemetry.log('client_connected', sid=sid, game=game.code)
+
+@on('request_player_sync')
+def handle_player_sync(client, game):
+    # Sent by clients that spot a gap in players_delta versions
+    client.emit('player_list_update', game.player_snapshot())
+
+@on('request_state')
+def handle_request_state(client, game):
+    # Sent by clients that missed a frame; answered with a resync frame to them alone
+    send_snapshot(client, game)
+
+@on('resume')
+def handle_resume(client, game, data=None):
+    # Every page sends this on (re)connect with the last frame version it
+    # applied (null on a fresh load). If the frames since then are still in
+    # the history they are replayed to it; otherwise it gets a snapshot.
+    since = data.get('since') if isinstance(data, dict) else None
+    missed = None
+    if isinstance(since, int) and 0 <= since <= game.frame_version:
+        missed = [f for f in frame_history.get(game.code, ()) if f['v'] > since]
+        if len(missed) != game.frame_version - since:
+            missed = None  # Fell out of the history, or sent by another worker
+    if missed is None:
+        send_snapshot(client, game)
+        return
+    for frame in missed:
+        send_frame(client, game, dict(frame, replay=True))
+    send_clue_answer(client, game)
+
+def send_frame(client, game, frame):
+    # A frame for one socket alone, in its wire encoding
+    if client.encoding == 'msgpack':
+        client.emit('frame', wire.encode_frame(game, frame))
+    else:
+        client.emit('frame', frame)
+
+def send_clue_table(client, game):
+    # Players' copy leaves out the answers
+    client.emit('clue_table', wire.encode(wire.clue_table(game, answers=client.role is not None)))
+
+def send_snapshot(client, game):
+    if client.encoding == 'msgpack':
+        send_clue_table(client, game)
+    send_frame(client, game, {'v': game.frame_version, 'phase': game_phase(game), 'events': state_events(game), 'resync': True})
+    send_clue_answer(client, game)
+
+@on('join_game')
+def handle_join(client, game, data):
+    name = data.get('name')
+    player_id = data.get('player_id')
+    if not player_id:
+        player_id = "temp_" + client.sid
+
+    game.add_player(client.sid, name, player_id)
+    telemetry.log('player_joined', game=game.code, name=name, pid=player_id)
+
+def handle_disconnect(sid):
+    client = clients.pop(sid, None)
+    code = client.code if client else None
+    if code:
+        connected_clients.labels(code).dec()
+        with registry.session(code, create=False) as game:
+            if game:
+                game.remove_player(sid)
+                schedule_player_flush(game.code)
+    telemetry.log('client_disconnected', sid=sid, game=code)
+
+# --- Clock sync ---
+# Clients ping with their clock, the server answers with its own, and the client
+# reports the exchange back so the server keeps a per-player offset/RTT estimate.
+
+def handle_clock_ping(sid, data=None):
+    # Answered straight away, without touching the game
+    client = clients.get(sid)
+    if client is None or not client.allow('clock_ping') or not isinstance(data, dict):
+        return
+    transport.emit('clock_pong', {'t0': data.get('t0'), 'ts': time.time() * 1000}, to=sid)
+
+HANDLERS['clock_ping'] = handle_clock_ping
+
+@on('clock_report')
+def handle_clock_report(client, game, data):
+    p = game.get_player_by_sid(client.sid)
+    try:
+        sample = float(data['t0']), float(data['ts']), float(data['t3'])
+    except (KeyError, TypeError, ValueError):
+        return
+    if p:
+        p.record_clock_sample(*sample)
+
+@on('admin_request_latency')
+def handle_request_latency(client, game):
+    client.emit('player_latency', {
+        'arbitration_window': game.arbitration_window,
+        'players': [p.to_dict() for p in game.players.values() if p.connected]
+    })
+
+@on('admin_set_arbitration')
+def handle_set_arbitration(client, game, data):
+    try:
+        window_ms = max(0, min(1000, int(data.get('window_ms', 0))))
+    except (TypeError, ValueError):
+        return
+    game.arbitration_window = window_ms / 1000.0
+    telemetry.log('arbitration_window_set', game=game.code, window_ms=window_ms)
+
+@on('buzz')
+def handle_buzz(client, game, data=None):
+    telemetry.log('buzz_received', level=logging.DEBUG, sampled=True, game=game.code, sid=client.sid,
+                  locked=game.buzzers_locked, current=game.current_buzzer)
+    if game.arbitration_window > 0:
+        # Collect buzzes for the window, then award the earliest corrected timestamp
+        client_ts = data.get('client_ts') if isinstance(data, dict) else None
+        if game.submit_buzz(client.sid, client_ts, time.time() * 1000):
+            timer_service.schedule(game.code, 'arbitrate', game.arbitration_window, resolve_buzz_window, game.code, game.buzz_session)
+        if client.sid in game.pending_buzzes:
+            buzz_packets.labels('queued').inc()
+        else:
+            buzz_packets.labels('rejected').inc()
+            record_refused_buzz(game, client.sid)
+    elif game.handle_buzz(client.sid):
+        record_play(game, analytics.WON, client.sid)
+        announce_buzz_winner(game, client.sid)
+    else:
+        buzz_packets.labels('rejected').inc()
+        record_refused_buzz(game, client.sid)
+
+buzz_opened = {}  # game code -> wall time its buzzers last opened, for reaction times
+
+def record_play(game, kind, sid=None, ms=None):
+    # One analytics row about the current clue, when ANALYTICS_DIR is set.
+    # Buzzes default to the time since buzzers opened.
+    if plays is None:
+        return
+    now = timer_service.wall_clock()
+    if kind == analytics.OPEN:
+        buzz_opened[game.code] = now
+    elif ms is None and kind in analytics.BUZZES and game.code in buzz_opened:
+        ms = (now - buzz_opened[game.code]) * 1000
+    p = game.get_player_by_sid(sid) if sid else None
+    clue = game.current_clue or {}
+    plays.record(game.code, game.game_id, kind, now, pid=p.pid if p else None, name=p.name if p else None,
+                 category=clue.get('category'), value=clue.get('value'), round_no=game.current_round, ms=ms)
+
+def record_refused_buzz(game, sid):
+    if sid == game.current_buzzer:
+        return  # The winner pressing again
+    if sid in game.incorrect_buzzers:
+        record_play(game, analytics.LOCKED_OUT, sid)
+    else:
+        record_play(game, analytics.BEATEN if game.current_buzzer else analytics.CLOSED, sid)
+
+def answer_ms(game):
+    # How long the answer window has been open, if it is
+    timer = timer_service.get(game.code, 'answer')
+    if timer is None:
+        return None
+    return (timer_service.wall_clock() - (timer.wall_deadline - timer.delay)) * 1000
+
+def resolve_buzzes(game):
+    # Close an arbitration window; every buzz queued in it won or was beaten
+    pending = game.pending_buzzes
+    sid = game.resolve_buzz()
+    for buzzer, ts in pending.items():
+        record_play(game, analytics.WON if buzzer == sid else analytics.BEATEN, buzzer,
+                    ms=ts - game.buzz_opened_at if game.buzz_opened_at is not None else None)
+    return sid
+
+def resolve_buzz_window(code, session_id):
+    with framed_session(code) as game:
+        if game is None or game.buzz_session != session_id:
+            return
+        sid = resolve_buzzes(game)
+        if sid:
+            announce_buzz_winner(game, sid)
+
+def announce_buzz_winner(game, sid):
+    broadcast(game.code, 'play_sound', {'name': 'buzz'})
+    p = game.get_player_by_sid(sid)
+    name = p.name if p else "Unknown"
+    buzz_packets.labels('accepted').inc()
+    telemetry.log('buzz_accepted', game=game.code, sid=sid, name=name)
+    broadcast(game.code, 'buzz_winner', {'sid': sid, 'name': name})
+    # Inform everyone that buzzers are now locked
+    broadcast(game.code, 'buzzers_locked')
+    # Start Answer Timer with Countdown; the server-side timeout enforces it
+    timer_service.cancel(game.code, 'buzz')
+    start_countdown(game, 'answer', ANSWER_WINDOW, answer_timeout, game.code, game.sid_to_pid.get(sid, sid))
+
+def buzz_timeout(code, session_id):
+    with framed_session(code) as game:
+        if game is None:
+            return
+        # Check if this session is still valid and no one buzzed
+        if game.buzz_session != session_id:
+            telemetry.log('buzz_timeout_stale', level=logging.DEBUG, game=code, session=session_id,
+                          current=game.buzz_session)
+            return
+        if game.pending_buzzes:
+            # Buzzes arrived in time but their arbitration window is still open
+            sid = resolve_buzzes(game)
+            if sid:
+                announce_buzz_winner(game, sid)
+                return
+        if not game.current_buzzer and not game.buzzers_locked:
+            game.lock_buzzers()
+            broadcast(game.code, 'play_sound', {'name': 'times_up'})
+            broadcast(game.code, 'buzzers_locked')
+            telemetry.log('buzz_timeout', game=code)
+
+
+def answer_timeout(code, expected_pid):
+    # Fires at the end of the answer period. If the same player is still the current_buzzer
+    # (possibly on a new socket after reconnecting), treat it like an incorrect/no-answer and lock them out.
+    with framed_session(code) as game:
+        if game is None:
+            return
+        # If buzzer changed or was cleared, abort
+        sid = game.current_buzzer
+        if sid is None or game.sid_to_pid.get(sid, sid) != expected_pid:
+            telemetry.log('answer_timeout_stale', level=logging.DEBUG, game=code, expected=expected_pid,
+                          current=sid)
+            return
+        # Treat as incorrect timeout - mark the player incorrect and require host to manually reopen buzzers
+        p = game.get_player_by_sid(sid)
+        name = p.name if p else 'Unknown'
+        record_play(game, analytics.TIMEOUT, sid, ms=ANSWER_WINDOW * 1000)
+        game.incorrect_buzzers.add(sid)
+        game.current_buzzer = None
+        # Keep buzzers locked until host explicitly re-opens them
+        game.buzzers_locked = True
+        game.buzz_session += 1
+        broadcast(game.code, 'play_sound', {'name': 'times_up'})
+        # Notify admin and board of timeout; do NOT reopen buzzers automatically
+        broadcast(game.code, 'player_timed_out', {'sid': sid, 'name': name})
+        broadcast(game.code, 'buzzers_locked')
+        telemetry.log('answer_timeout', game=code, sid=sid, session=game.buzz_session)
+
+@on('admin_clear_buzzers')
+def handle_clear_buzzers(client, game):
+    game.clear_buzzers()
+    record_play(game, analytics.OPEN)
+    broadcast(game.code, 'buzzers_cleared')
+    # Start Buzz Timer with countdown - Manual override if needed
+    timer_service.cancel(game.code, 'answer')
+    start_countdown(game, 'buzz', BUZZ_WINDOW, buzz_timeout, game.code, game.buzz_session)
+
+def daily_double_clue(game):
+    # The current clue plus who is wagering on it, for show_daily_double
+    clue = game.current_clue
+    dd_player_name = "No one"
+    dd_player_score = 0
+    dd_max_wager = clue['value']  # Default to clue value if no control or negative score
+    p = game.players.get(game.control_player) if game.control_player else None
+    if p:
+        dd_player_name = p.name
+        dd_player_score = p.score
+        # Max wager: player's score if positive, otherwise clue value (minimum bet)
+        # If player has less than clue value, they can still bet up to clue value
+        if p.score > 0:
+            dd_max_wager = p.score
+    return dict(clue, dd_player_name=dd_player_name, dd_player_score=dd_player_score, dd_max_wager=dd_max_wager)
+
+@on('admin_select_clue')
+def handle_select_clue(client, game, data):
+    # Prevent selecting a new clue while a clue is still active
+    if game.current_clue:
+        client.emit('select_rejected', {'reason': 'Previous clue must be closed before selecting another.'})
+        return
+    cat_idx = data['cat_idx']
+    clue_idx = data['clue_idx']
+    clue = game.get_clue(cat_idx, clue_idx)
+
+    if clue:
+        game.current_clue = clue
+        if clue['is_daily_double']:
+             game.is_daily_double_turn = True
+             game.wager_pending = True
+             broadcast(game.code, 'play_sound', {'name': 'daily_double'})
+
+             dd_clue = daily_double_clue(game)
+             p = game.players.get(game.control_player) if game.control_player else None
+             if p:
+                 # Notify Admin of Control Player
+                 client.emit('assign_dd_control', {'sid': p.sid, 'name': p.name, 'score': p.score, 'max_wager': dd_clue['dd_max_wager']})
+
+             # Clear any previous overlays/answers before showing a new clue
+             broadcast(game.code, 'hide_clue')
+             broadcast(game.code, 'show_daily_double', dd_clue)
+        else:
+             game.is_daily_double_turn = False
+             game.wager_pending = False
+             # Clear previous overlays/answers and then show the clue
+             broadcast(game.code, 'hide_clue')
+             broadcast(game.code, 'show_clue', clue)
+
+             # Do NOT auto-open buzzers -- host will manually open/clear buzzers
+             # Notify clients that a clue is shown and buzzers are still locked
+             broadcast(game.code, 'buzzers_locked')
+
+@on('admin_set_wager')
+def handle_set_wager(client, game, data):
+    try:
+        wager = int(data['wager'])
+    except:
+        wager = 0
+    
+    # Validate wager - can't bet more than your score (or clue value if score is 0 or negative)
+    if game.control_player and game.current_clue:
+        p = game.players.get(game.control_player)
+        if p:
+            if p.score <= 0:
+                max_wager = game.current_clue['value']
+            else:
+                max_wager = p.score
+            wager = min(wager, max_wager)
+            wager = max(wager, 0)  # Can't bet negative
+    
+    game.set_wager(wager)
+    telemetry.log('dd_wager_set', game=game.code, wager=wager)
+    # Now show the clue
+    # Clear any previous overlays/answers before revealing the daily double clue
+    broadcast(game.code, 'hide_clue')
+    broadcast(game.code, 'show_clue', game.current_clue)
+    # For Daily Double: lock buzzers and start an answer timer for the DD answer window
+    if game.current_clue and game.current_clue.get('is_daily_double'):
+        game.buzzers_locked = True
+        game.current_buzzer = None
+        broadcast(game.code, 'buzzers_locked')
+        # Start a DD answer timer (30s default)
+        start_countdown(game, 'answer', DD_ANSWER_WINDOW)
+
+def close_clue(code, cat_idx, clue_idx, answer_text):
+    with framed_session(code) as game:
+        if game is None:
+            return
+        timer_service.cancel(code, 'buzz')
+        timer_service.cancel(code, 'answer')
+        timer_service.cancel(code, 'arbitrate')
+        buzz_opened.pop(code, None)
+        # Show answer
+        broadcast(game.code, 'show_answer_text', {'text': answer_text})
+        # Immediately close the clue; no wait
+        game.mark_answered(cat_idx, clue_idx)
+        game.current_clue = None
+        game.is_daily_double_turn = False
+        game.wager_pending = False
+        game.incorrect_buzzers.clear()  # Reset for next clue
+        broadcast(game.code, 'hide_clue')
+        broadcast(game.code, 'update_board_state', {'cat_idx': cat_idx, 'clue_idx': clue_idx})
+        # After closing a clue, ensure buzzers are locked until host opens them
+        broadcast(game.code, 'buzzers_locked')
+
+@on('admin_close_clue')
+def handle_close_clue(client, game):
+    if game.current_clue:
+        cat_idx = game.current_clue['cat_idx']
+        clue_idx = game.current_clue['clue_idx']
+        answer = game.current_clue['answer']
+        # Deferred to the scheduler so it runs after this handler's session is saved
+        timer_service.schedule(game.code, 'close', 0, close_clue, game.code, cat_idx, clue_idx, answer)
+
+@on('admin_update_score')
+def handle_update_score(client, game, data):
+    sid = data['sid']
+    # If DD, ignore data['points'] from client and use wager
+    if game.is_daily_double_turn:
+         points = game.current_wager if data['points'] > 0 else -game.current_wager
+    else:
+         points = data['points']
+
+    if game.current_clue:
+        record_play(game, analytics.CORRECT if points > 0 else analytics.INCORRECT, sid, ms=answer_ms(game))
+    game.update_score(sid, points)
+
+    # Broadcast Control Update
+    if game.control_player:
+        p = game.players.get(game.control_player)
+        if p:
+            broadcast(game.code, 'control_update', {'name': p.name})
+
+    if points > 0:
+        # Correct
+        broadcast(game.code, 'play_sound', {'name': 'correct'})
+        # Show the answer but do NOT auto-close the clue; host must manually close it
+        if game.current_clue:
+            answer = game.current_clue['answer']
+            broadcast(game.code, 'show_answer_text', {'text': answer})
+            # Prevent any running answer timeout for current buzzer — clear it
+            game.current_buzzer = None
+            timer_service.cancel(game.code, 'answer')
+    else:
+        # Incorrect
+        broadcast(game.code, 'play_sound', {'name': 'incorrect'})
+        # For DD: Close after incorrect (only one player can answer DD)
+        if game.is_daily_double_turn:
+            if game.current_clue:
+                cat_idx = game.current_clue['cat_idx']
+                clue_idx = game.current_clue['clue_idx']
+                answer = game.current_clue['answer']
+                timer_service.schedule(game.code, 'close', 0, close_clue, game.code, cat_idx, clue_idx, answer)
+        else:
+            # For Normal Clues: Re-enable buzzers for other players
+            # Track this player as having answered incorrectly
+            game.incorrect_buzzers.add(sid)
+            # Re-open buzzers but the incorrect player stays locked out
+            game.reopen_buzzers()
+            record_play(game, analytics.OPEN)
+            telemetry.log('buzzers_reopened', game=game.code, session=game.buzz_session,
+                          locked_out=sorted(game.incorrect_buzzers))
+            broadcast(game.code, 'buzzers_reopened', {'locked_out': sorted(game.incorrect_buzzers)})
+            timer_service.cancel(game.code, 'answer')
+            start_countdown(game, 'buzz', BUZZ_WINDOW, buzz_timeout, game.code, game.buzz_session)
+
+
+@on('admin_set_score')
+def handle_set_score(client, game, data):
+    # Set player's score to an absolute value
+    sid = data.get('sid')
+    try:
+        new_score = int(data.get('score', 0))
+    except:
+        new_score = 0
+
+    p = game.set_score(sid, new_score)
+    if p:
+        telemetry.log('score_set', game=game.code, name=p.name, score=new_score)
+
+@on('admin_start_round_2')
+def handle_start_round_2(client, game):
+    game.start_round_2()
+    # Board and host pages reload and fetch the new grid from /board/data, and
+    # the board gets the round's media manifest when it reconnects
+    broadcast(game.code, 'round_2_started', {'board_state': game.board_state})
+
+# --- Final Jeopardy Events ---
+
+@on('admin_start_fj')
+def handle_start_fj(client, game):
+    game.start_final_jeopardy()
+    category = game.final_jeopardy['category']
+    broadcast(game.code, 'start_final_jeopardy', {'category': category})
+
+@on('player_fj_wager')
+def handle_fj_wager(client, game, data):
+    try:
+        wager = int(data['wager'])
+    except:
+        wager = 0
+
+    p = game.get_player_by_sid(client.sid)
+    if p and game.fj_wagers.get(p.pid) != wager:  # Resent wagers aren't passed on
+        game.set_fj_wager(p.pid, wager)
+        queue_fj_status(game.code, p.pid)
+
+@on('admin_reveal_fj_clue')
+def handle_reveal_fj_clue(client, game):
+    clue_text = game.final_jeopardy['text']
+    broadcast(game.code, 'show_fj_clue', {'text': clue_text})
+    # Start 30s timer with countdown
+    start_countdown(game, 'fj_answer', FJ_ANSWER_WINDOW)
+
+@on('player_fj_answer')
+def handle_fj_answer(client, game, data):
+    answer = data['answer']
+    p = game.get_player_by_sid(client.sid)
+    if p and game.fj_answers.get(p.pid) != answer:  # Nor resent answers
+        game.set_fj_answer(p.pid, answer)
+        queue_fj_status(game.code, p.pid)
+
+@on('admin_grade_fj')
+def handle_grade_fj(client, game, data):
+    pid = data['pid'] # Expect PID
+    if game.grade_fj(pid, bool(data['correct'])):
+        queue_fj_status(game.code, pid)
+
+@on('admin_grade_fj_bulk')
+def handle_grade_fj_bulk(client, game, data):
+    # {grades: {pid: correct}} for everyone at once; the scores go out as one
+    # players_delta in this action's frame
+    grades = data.get('grades') if isinstance(data, dict) else None
+    if not isinstance(grades, dict):
+        return
+    graded = [pid for pid, correct in grades.items() if game.grade_fj(pid, bool(correct))]
+    for pid in graded:
+        queue_fj_status(game.code, pid)
+    telemetry.log('fj_bulk_graded', game=game.code, graded=len(graded))
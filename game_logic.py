@@ -1,6 +1,31 @@
 import json
 import random
 import os
+import time
+import uuid
+from contextlib import contextmanager
+
+import telemetry
+
+DEFAULT_GAME_CODE = 'MAIN'
+QUESTIONS_PATH = os.path.join('data', 'questions.json')
+CLOCK_SAMPLES = 8  # Recent clock-sync samples kept per player
+
+_question_cache = {}
+
+def load_questions(data_path):
+    # Parsed question files are shared by every game in the process; games only
+    # ever read round_data, per-game progress lives in board_state.
+    if data_path not in _question_cache:
+        with open(data_path, 'r') as f:
+            _question_cache[data_path] = json.load(f)
+    return _question_cache[data_path]
+
+def normalize_code(code):
+    if isinstance(code, str) and code.isalnum() and code.isupper():
+        return code  # Already normal, as on every session after the first
+    code = ''.join(ch for ch in str(code or '') if ch.isalnum()).upper()
+    return code or DEFAULT_GAME_CODE
 
 class Player:
     def __init__(self, pid, name, sid=None):
@@ -9,6 +34,11 @@ class Player:
         self.sid = sid
         self.score = 0
         self.connected = True
+        # Clock sync estimates in milliseconds (None until the first sample)
+        self.clock_offset = None  # server clock minus client clock
+        self.rtt = None
+        self.jitter = None
+        self.clock_samples = []  # [rtt, offset] pairs, newest last
 
     def to_dict(self):
         return {
@@ -16,11 +46,59 @@ class Player:
             'pid': self.pid,
             'name': self.name,
             'score': self.score,
-            'connected': self.connected
+            'connected': self.connected,
+            'rtt_ms': None if self.rtt is None else round(self.rtt, 1),
+            'jitter_ms': None if self.jitter is None else round(self.jitter, 1)
         }
 
+    def to_state(self):
+        d = self.to_dict()
+        d['rtt'] = self.rtt
+        d['jitter'] = self.jitter
+        d['clock_offset'] = self.clock_offset
+        d['clock_samples'] = self.clock_samples
+        return d
+
+    @classmethod
+    def from_state(cls, d):
+        p = cls(d['pid'], d['name'], d.get('sid'))
+        p.score = d.get('score', 0)
+        p.connected = d.get('connected', False)
+        p.rtt = d.get('rtt')
+        p.jitter = d.get('jitter')
+        p.clock_offset = d.get('clock_offset')
+        p.clock_samples = d.get('clock_samples', [])
+        return p
+
+    def record_clock_sample(self, client_sent, server_time, client_received):
+        # NTP-style exchange: the client stamps a ping, the server stamps the pong,
+        # the client stamps its arrival. Offsets from low-RTT samples are the most
+        # trustworthy, so the offset comes from the fastest recent round trip.
+        rtt = client_received - client_sent
+        if rtt < 0:
+            return
+        offset = server_time - (client_sent + client_received) / 2.0
+        if self.rtt is None:
+            self.rtt, self.jitter = rtt, 0.0
+        else:
+            self.jitter = 0.75 * self.jitter + 0.25 * abs(rtt - self.rtt)
+            self.rtt = 0.875 * self.rtt + 0.125 * rtt
+        self.clock_samples = (self.clock_samples + [[rtt, offset]])[-CLOCK_SAMPLES:]
+        self.clock_offset = min(self.clock_samples)[1]
+
+    def to_server_time(self, client_time):
+        if self.clock_offset is None or client_time is None:
+            return None
+        return client_time + self.clock_offset
+
 class Game:
-    def __init__(self):
+    def __init__(self, code=DEFAULT_GAME_CODE, state=None, boards=None):
+        self.code = code
+        self.game_id = uuid.uuid4().hex  # Distinguishes this game from earlier ones at the same code
+        # Optional board_generator.BoardGenerator over the question bank; boards
+        # come from data/questions.json without one
+        self.boards = boards
+        self.last_active = time.time()
         self.players = {}  # pid -> Player
         self.sid_to_pid = {} # sid -> pid
         self.buzzers_locked = True
@@ -29,33 +107,212 @@ class Game:
         self.round_data = []
         self.final_jeopardy = {}
         self.board_state = [] # boolean grid
+        self.board_version = 0  # Bumped whenever round_data or board_state change (keys cached board renders)
         self.daily_double_coords = [] # List of tuples
         self.current_clue = None
         self.current_wager = 0
         self.is_daily_double_turn = False
+        self.wager_pending = False  # A Daily Double is showing and its wager isn't set yet
         self.incorrect_buzzers = set()  # SIDs of players who buzzed incorrectly on current clue
         self.buzz_session = 0  # Incremented each time buzzers are opened, to invalidate old timeouts
         self.fj_wagers = {} # sid -> amount (should use pid now?)
         self.fj_answers = {} # sid -> text
+        self.fj_grades = {}  # pid -> correct, once the host has graded them
         self.in_final_jeopardy = False
         self.current_round = 1
         self.control_player = None # PID
-        self.load_data()
-        self.reset_board()
+        # Fair arbitration: with a window > 0, buzzes are collected for that many
+        # seconds after the first one arrives and the earliest corrected client
+        # timestamp wins. 0 keeps first-packet-wins.
+        self.arbitration_window = 0
+        self.buzz_opened_at = None  # Server ms when buzzers last opened
+        self.pending_buzzes = {}  # sid -> corrected buzz time (server ms)
+        # Player list/score sync: clients hold a copy at players_version and get
+        # coalesced diffs of the players changed since (see take_player_delta)
+        self.players_version = 0
+        self.dirty_players = set()  # pids changed since the last delta
+        # Room broadcasts go out as one versioned frame per action; clients use
+        # the version to notice a missed frame and resync
+        self.frame_version = 0
+        # Optional journal.GameJournal; every state change below is recorded to
+        # it with a per-game sequence number so the game survives a restart
+        self.journal = None
+        self.journal_seq = 0
+        self.snapshot_seq = 0
+        if state is not None:
+            self.load_state(state)
+        else:
+            self.load_data()
 
     def load_data(self):
-        data_path = os.path.join('data', 'questions.json')
-        with open(data_path, 'r') as f:
-            self.all_data = json.load(f)
-            self.round_data = self.all_data['round_1']
+        if self.boards is not None:
+            self.final_jeopardy = self.boards.final()
+        else:
+            self.all_data = load_questions(QUESTIONS_PATH)
             self.final_jeopardy = self.all_data['final_jeopardy']
+        self.round_data, daily_doubles = self.load_round(1)
+        self.reset_board(daily_doubles)
 
-    def reset_board(self):
+    def load_round(self, round_no):
+        # Returns (round_data, daily_double_coords or None). Boards from the bank
+        # are generated only when a round starts.
+        if self.boards is not None:
+            return self.boards.generate(round_no, venue=self.code, game_key=self.game_id)
+        return load_questions(QUESTIONS_PATH)[f'round_{round_no}'], None
+
+    def touch(self):
+        self.last_active = time.time()
+
+    def to_state(self):
+        # Plain-JSON snapshot of everything that changes during play, used by
+        # the shared state stores so any worker can pick the game up
+        return {
+            'code': self.code,
+            'game_id': self.game_id,
+            'last_active': self.last_active,
+            'players': [p.to_state() for p in self.players.values()],
+            'sid_to_pid': dict(self.sid_to_pid),
+            'buzzers_locked': self.buzzers_locked,
+            'current_buzzer': self.current_buzzer,
+            'round_data': self.round_data,
+            'final_jeopardy': self.final_jeopardy,
+            'board_state': self.board_state,
+            'board_version': self.board_version,
+            'daily_double_coords': [list(c) for c in self.daily_double_coords],
+            'current_clue': self.current_clue,
+            'current_wager': self.current_wager,
+            'is_daily_double_turn': self.is_daily_double_turn,
+            'wager_pending': self.wager_pending,
+            'incorrect_buzzers': sorted(self.incorrect_buzzers),
+            'buzz_session': self.buzz_session,
+            'fj_wagers': self.fj_wagers,
+            'fj_answers': self.fj_answers,
+            'fj_grades': self.fj_grades,
+            'in_final_jeopardy': self.in_final_jeopardy,
+            'current_round': self.current_round,
+            'control_player': self.control_player,
+            'arbitration_window': self.arbitration_window,
+            'buzz_opened_at': self.buzz_opened_at,
+            'pending_buzzes': self.pending_buzzes,
+            'players_version': self.players_version,
+            'dirty_players': sorted(self.dirty_players),
+            'journal_seq': self.journal_seq,
+            'frame_version': self.frame_version,
+        }
+
+    def load_state(self, state):
+        self.code = state['code']
+        self.game_id = state['game_id']
+        self.last_active = state['last_active']
+        self.players = {d['pid']: Player.from_state(d) for d in state['players']}
+        self.sid_to_pid = dict(state['sid_to_pid'])
+        self.buzzers_locked = state['buzzers_locked']
+        self.current_buzzer = state['current_buzzer']
+        self.round_data = state['round_data']
+        self.final_jeopardy = state['final_jeopardy']
+        self.board_state = state['board_state']
+        self.board_version = state.get('board_version', 0)
+        self.daily_double_coords = [tuple(c) for c in state['daily_double_coords']]
+        self.current_clue = state['current_clue']
+        self.current_wager = state['current_wager']
+        self.is_daily_double_turn = state['is_daily_double_turn']
+        self.wager_pending = state.get('wager_pending', False)
+        self.incorrect_buzzers = set(state['incorrect_buzzers'])
+        self.buzz_session = state['buzz_session']
+        self.fj_wagers = dict(state['fj_wagers'])
+        self.fj_answers = dict(state['fj_answers'])
+        self.fj_grades = dict(state.get('fj_grades', {}))
+        self.in_final_jeopardy = state['in_final_jeopardy']
+        self.current_round = state['current_round']
+        self.control_player = state['control_player']
+        self.arbitration_window = state['arbitration_window']
+        self.buzz_opened_at = state['buzz_opened_at']
+        self.pending_buzzes = dict(state['pending_buzzes'])
+        self.players_version = state['players_version']
+        self.dirty_players = set(state['dirty_players'])
+        self.journal_seq = self.snapshot_seq = state.get('journal_seq', 0)
+        self.frame_version = state.get('frame_version', 0)
+
+    def record(self, event, **data):
+        # Append a state change to the journal; compacts into a snapshot every
+        # snapshot_every events so recovery replays a bounded log
+        if self.journal is None:
+            return
+        self.journal_seq += 1
+        self.journal.append(self.code, self.journal_seq, event, data)
+        if self.journal_seq - self.snapshot_seq >= self.journal.snapshot_every:
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        self.journal.snapshot(self.code, self.journal_seq, self.to_state())
+        self.snapshot_seq = self.journal_seq
+
+    def apply_event(self, event, data):
+        # Replay one journaled change. Mirrors the methods that record them.
+        if event == 'join':
+            p = self.players.get(data['pid'])
+            if p is None:
+                p = self.players[data['pid']] = Player(data['pid'], data['name'])
+            p.name = data['name']
+        elif event == 'score':
+            self.update_score_by_pid(data['pid'], data['points'])
+        elif event == 'set_score':
+            if data['pid'] in self.players:
+                self.players[data['pid']].score = data['score']
+        elif event == 'answered':
+            self.mark_answered(data['cat_idx'], data['clue_idx'])
+        elif event == 'dd_wager':
+            self.current_wager = data['wager']
+        elif event == 'fj_wager':
+            self.fj_wagers[data['pid']] = data['wager']
+        elif event == 'fj_answer':
+            self.fj_answers[data['pid']] = data['answer']
+        elif event == 'fj_grade':
+            self.fj_grades[data['pid']] = data['correct']  # The points were logged as a 'score'
+        elif event == 'round':
+            self.current_round = data['round']
+            self.round_data = data['round_data']
+            self.reset_board(data['daily_doubles'])
+        elif event == 'final':
+            self.in_final_jeopardy = True
+        # 'buzz' is kept for the record only; who buzzed doesn't outlive a restart
+
+    @classmethod
+    def recover(cls, code, state, events, boards=None):
+        # Rebuild a game from its last snapshot plus the events logged after it
+        game = cls(code, state=state, boards=boards)
+        for entry in events:
+            game.apply_event(entry['event'], entry['data'])
+            game.journal_seq = entry['seq']
+        # Sockets, buzzers and the open clue belonged to the dead process; players
+        # rejoin with their player_id and the host reopens the clue
+        game.sid_to_pid = {}
+        for p in game.players.values():
+            p.sid = None
+            p.connected = False
+        game.buzzers_locked = True
+        game.current_buzzer = None
+        game.pending_buzzes = {}
+        game.incorrect_buzzers = set()
+        game.current_clue = None
+        game.is_daily_double_turn = False
+        game.wager_pending = False
+        game.dirty_players = set()
+        return game
+
+    def reset_board(self, daily_doubles=None):
         # Initialize board state (all false = unanswered)
+        self.board_version += 1
         self.board_state = []
         for cat in self.round_data:
             self.board_state.append([False] * len(cat['clues']))
 
+        if daily_doubles is not None:
+            # Placed by the board generator
+            self.daily_double_coords = [tuple(c) for c in daily_doubles]
+            telemetry.log('daily_doubles', game=self.code, round=self.current_round, coords=self.daily_double_coords)
+            return
+
         # Pick Daily Doubles
         self.daily_double_coords = []
         num_dd = 1 if self.current_round == 1 else 2
@@ -70,17 +327,27 @@ class Game:
         if len(all_coords) >= num_dd:
             self.daily_double_coords = random.sample(all_coords, num_dd)
 
-        print(f"Round {self.current_round} Daily Doubles at: {self.daily_double_coords}")
+        telemetry.log('daily_doubles', game=self.code, round=self.current_round, coords=self.daily_double_coords)
 
     def start_round_2(self):
+        # Generate first: if the bank can't fill the round, the game stays in round 1
+        round_data, daily_doubles = self.load_round(2)
         self.current_round = 2
-        self.round_data = self.all_data['round_2']
-        self.reset_board()
+        self.round_data = round_data
+        self.reset_board(daily_doubles)
+        self.record('round', round=2, round_data=self.round_data,
+                    daily_doubles=[list(c) for c in self.daily_double_coords])
+
+    def start_final_jeopardy(self):
+        self.in_final_jeopardy = True
+        self.record('final')
 
     def add_player(self, sid, name, pid):
         if pid in self.players:
             # Reconnect
             p = self.players[pid]
+            if p.sid and p.sid != sid:
+                self.rebind_sid(p.sid, sid)
             p.sid = sid
             p.name = name
             p.connected = True
@@ -90,17 +357,98 @@ class Game:
             self.players[pid] = p
 
         self.sid_to_pid[sid] = pid
+        self.dirty_players.add(pid)
+        self.record('join', pid=pid, name=name)
 
     def remove_player(self, sid):
         if sid in self.sid_to_pid:
-            pid = self.sid_to_pid[sid]
-            if pid in self.players:
-                self.players[pid].connected = False
-            del self.sid_to_pid[sid]
+            pid = self.sid_to_pid.pop(sid)
+            p = self.players.get(pid)
+            # A late disconnect of a socket the player already replaced changes nothing
+            if p and p.sid == sid:
+                p.connected = False
+                self.dirty_players.add(pid)
+
+    def rebind_sid(self, old, new):
+        # A reconnecting player's new socket takes over the old one: the stale
+        # mapping is dropped (its disconnect may not have arrived yet) and buzz
+        # state follows the player, so a won buzz or a lockout survives
+        self.sid_to_pid.pop(old, None)
+        if self.current_buzzer == old:
+            self.current_buzzer = new
+        if old in self.incorrect_buzzers:
+            self.incorrect_buzzers.discard(old)
+            self.incorrect_buzzers.add(new)
+        if old in self.pending_buzzes:
+            self.pending_buzzes[new] = self.pending_buzzes.pop(old)
+
+    def phase(self):
+        # Summary of where the game stands, carried by every frame
+        clue = self.current_clue
+        return {
+            'round': self.current_round,
+            'final': self.in_final_jeopardy,
+            'clue': None if not clue else {'cat_idx': clue['cat_idx'], 'clue_idx': clue['clue_idx'],
+                                           'value': clue['value'], 'daily_double': clue['is_daily_double']},
+            'buzzers': 'locked' if self.buzzers_locked else 'open',
+            'buzzer': self.current_buzzer,
+            'locked_out': sorted(self.incorrect_buzzers),
+            'control': self.control_player,
+            'scores': {pid: p.score for pid, p in self.players.items()},
+        }
+
+    def spectator_view(self):
+        # Read-only projection for the spectator tier: no answers, sids or wagers,
+        # and no Daily Double text or media until its wager is in
+        clue = self.current_clue
+        buzzer = self.get_player_by_sid(self.current_buzzer) if self.current_buzzer else None
+        return {
+            'game': self.code,
+            'round': self.current_round,
+            'final': self.final_jeopardy.get('category') if self.in_final_jeopardy else None,
+            'categories': [{'category': cat['category'], 'values': [c['value'] for c in cat['clues']]}
+                           for cat in self.round_data],
+            'board': self.board_state,
+            'clue': None if not clue else dict(
+                {k: clue[k] for k in ('cat_idx', 'clue_idx', 'category', 'value', 'type', 'is_daily_double')},
+                text=None if self.wager_pending else clue['text'],
+                media_url=None if self.wager_pending else clue['media_url'], wager_pending=self.wager_pending),
+            'buzzers': 'locked' if self.buzzers_locked else 'open',
+            'buzzer': buzzer.name if buzzer else None,
+            'scores': sorted(({'name': p.name, 'score': p.score} for p in self.players.values()),
+                             key=lambda p: -p['score']),
+        }
+
+    def board_view(self):
+        # The round's grid for the board and host pages: titles, values, answered cells
+        return {
+            'round': self.current_round,
+            'categories': [{'category': cat['category'], 'values': [c['value'] for c in cat['clues']]}
+                           for cat in self.round_data],
+            'board': self.board_state,
+        }
 
     def get_player_list(self):
         return [p.to_dict() for p in self.players.values()]
 
+    def player_snapshot(self):
+        # Full list for a client that is (re)syncing; pending dirty players are
+        # already included, so replaying the next delta on top of it is harmless
+        return {'version': self.players_version, 'players': self.get_player_list()}
+
+    def take_player_delta(self):
+        # One versioned diff covering every player changed since the last call
+        if not self.dirty_players:
+            return None
+        delta = {
+            'from_version': self.players_version,
+            'version': self.players_version + 1,
+            'players': [self.players[pid].to_dict() for pid in sorted(self.dirty_players) if pid in self.players]
+        }
+        self.players_version += 1
+        self.dirty_players = set()
+        return delta
+
     def get_player_by_sid(self, sid):
         if sid in self.sid_to_pid:
             pid = self.sid_to_pid[sid]
@@ -117,29 +465,109 @@ class Game:
 
         self.current_buzzer = sid
         self.buzzers_locked = True
+        self.record('buzz', pid=self.sid_to_pid.get(sid))
         return True
 
+    def corrected_buzz_time(self, sid, client_ts, received_at):
+        # Map the client's timestamp onto the server clock. The result is clamped
+        # to what the measured latency makes plausible, so a skewed or dishonest
+        # client clock can't claim a buzz before buzzers opened or earlier than
+        # its round trip allows. Unsynced players are judged on arrival time.
+        p = self.get_player_by_sid(sid)
+        ts = p.to_server_time(client_ts) if p else None
+        if ts is None:
+            return received_at
+        earliest = received_at - (p.rtt + 2 * p.jitter + 50)
+        if self.buzz_opened_at is not None:
+            earliest = max(earliest, self.buzz_opened_at)
+        return min(max(ts, earliest), received_at)
+
+    def submit_buzz(self, sid, client_ts, received_at):
+        # Arbitration mode: record a buzz for the open window. Returns True when
+        # this is the first buzz of the window (the caller starts the window timer).
+        if self.buzzers_locked or self.current_buzzer or sid in self.incorrect_buzzers:
+            return False
+        if sid in self.pending_buzzes:
+            return False
+        first = not self.pending_buzzes
+        self.pending_buzzes[sid] = self.corrected_buzz_time(sid, client_ts, received_at)
+        return first
+
+    def resolve_buzz(self):
+        # Close the arbitration window: earliest corrected time wins, lockouts still apply
+        candidates = [(ts, sid) for sid, ts in self.pending_buzzes.items() if sid not in self.incorrect_buzzers]
+        self.pending_buzzes = {}
+        if not candidates or self.buzzers_locked or self.current_buzzer:
+            return None
+        _, sid = min(candidates)
+        self.current_buzzer = sid
+        self.buzzers_locked = True
+        self.record('buzz', pid=self.sid_to_pid.get(sid))
+        return sid
+
     def clear_buzzers(self):
         self.current_buzzer = None
         self.buzzers_locked = False
         self.incorrect_buzzers = set()  # Reset for new clue
+        self.pending_buzzes = {}
+        self.buzz_opened_at = time.time() * 1000
+        self.buzz_session += 1  # Invalidate old timeout tasks
+
+    def reopen_buzzers(self):
+        # After an incorrect answer: others may buzz again, incorrect_buzzers stay locked out
+        self.current_buzzer = None
+        self.buzzers_locked = False
+        self.pending_buzzes = {}
+        self.buzz_opened_at = time.time() * 1000
         self.buzz_session += 1  # Invalidate old timeout tasks
 
     def lock_buzzers(self):
         self.buzzers_locked = True
+        self.pending_buzzes = {}
 
     def update_score(self, sid, points):
         p = self.get_player_by_sid(sid)
         if p:
-            p.score += points
-            if points > 0:
-                self.control_player = p.pid
+            self.update_score_by_pid(p.pid, points)
 
     def update_score_by_pid(self, pid, points):
         if pid in self.players:
             self.players[pid].score += points
+            self.dirty_players.add(pid)
             if points > 0:
                 self.control_player = pid
+            self.record('score', pid=pid, points=points)
+
+    def set_score(self, sid, score):
+        p = self.get_player_by_sid(sid)
+        if p:
+            p.score = score
+            self.dirty_players.add(p.pid)
+            self.record('set_score', pid=p.pid, score=score)
+        return p
+
+    def set_wager(self, wager):
+        self.current_wager = wager
+        self.wager_pending = False
+        self.record('dd_wager', wager=wager)
+
+    def set_fj_wager(self, pid, wager):
+        self.fj_wagers[pid] = wager
+        self.record('fj_wager', pid=pid, wager=wager)
+
+    def set_fj_answer(self, pid, answer):
+        self.fj_answers[pid] = answer
+        self.record('fj_answer', pid=pid, answer=answer)
+
+    def grade_fj(self, pid, correct):
+        # Win or lose the player's wager; each player is graded once
+        if pid not in self.players or pid in self.fj_grades:
+            return False
+        self.fj_grades[pid] = correct
+        wager = self.fj_wagers.get(pid, 0)
+        self.update_score_by_pid(pid, wager if correct else -wager)
+        self.record('fj_grade', pid=pid, correct=correct)
+        return True
 
     def get_clue(self, cat_idx, clue_idx):
         if 0 <= cat_idx < len(self.round_data):
@@ -164,5 +592,108 @@ class Game:
         if 0 <= cat_idx < len(self.board_state):
              if 0 <= clue_idx < len(self.board_state[cat_idx]):
                  self.board_state[cat_idx][clue_idx] = True
+                 self.board_version += 1
+                 self.record('answered', cat_idx=cat_idx, clue_idx=clue_idx)
+
+class GameRegistry:
+    def __init__(self, ttl=3600, store=None, arbitration_window=0, boards=None, journal=None):
+        self.games = {}  # code -> Game
+        self.boards = boards  # Shared board_generator.BoardGenerator for new boards, if any
+        self.ttl = ttl  # Seconds a game may sit idle before it is evicted
+        self.arbitration_window = arbitration_window  # Default for new games
+        # Optional state_store.StateStore. Without one, games live in this
+        # process only; with one, every session loads and saves through it.
+        self.store = store
+        # Optional journal.GameJournal for in-process games (a shared store is
+        # already durable). Journaled games are recovered when the registry starts.
+        self.journal = journal if store is None else None
+        if self.journal is not None:
+            self.recover()
+
+    def recover(self):
+        # Rebuild every journaled game; returns the recovered codes
+        recovered = []
+        for code in self.journal.codes():
+            loaded = self.journal.load(code)
+            if loaded is None or loaded[0] is None:
+                continue
+            state, events = loaded
+            game = Game.recover(code, state, events, boards=self.boards)
+            game.journal = self.journal
+            # Re-snapshot so new events start a fresh log past any torn tail
+            game.write_snapshot()
+            self.games[code] = game
+            recovered.append(code)
+        return recovered
+
+    @contextmanager
+    def session(self, code, create=True):
+        # Yields the Game for one atomic unit of work (one socket event or timer).
+        # With a shared store the game is locked, loaded, and written back on
+        # success, so a buzz handled by any worker sees every earlier buzz.
+        code = normalize_code(code)
+        if self.store is None:
+            game = self.get_or_create(code) if create else self.get(code)
+            if game is not None:
+                game.touch()
+            yield game
+            return
+        with self.store.locked(code):
+            state = self.store.load(code)
+            if state is None and not create:
+                yield None
+                return
+            game = Game(code, state=state, boards=self.boards)
+            if state is None:
+                game.arbitration_window = self.arbitration_window
+            game.touch()
+            yield game
+            self.store.save(code, game.to_state())
+
+    def get(self, code):
+        return self.games.get(normalize_code(code))
+
+    def peek(self, code):
+        # Read-only look at a game for spectators: no touch, and with a store
+        # no lock or write-back
+        code = normalize_code(code)
+        if self.store is None:
+            return self.get(code)
+        state = self.store.load(code)
+        return None if state is None else Game(code, state=state, boards=self.boards)
+
+    def get_or_create(self, code):
+        code = normalize_code(code)
+        game = self.games.get(code)
+        if game is None:
+            created = Game(code, boards=self.boards)
+            created.arbitration_window = self.arbitration_window
+            # setdefault: under asgi_app.py a page request (on a worker thread)
+            # and a socket (on the event loop) can race to create the same game
+            game = self.games.setdefault(code, created)
+            if game is created and self.journal is not None:
+                # Starting snapshot holds the generated boards the events refer to
+                game.journal = self.journal
+                game.write_snapshot()
+        game.touch()
+        return game
+
+    def remove(self, code):
+        code = normalize_code(code)
+        if self.store is not None:
+            self.store.delete(code)  # For every worker, not just this one
+        if self.journal is not None:
+            self.journal.discard(code)
+        return self.games.pop(code, None)
 
-game_instance = Game()
+    def evict_idle(self, now=None):
+        # Drop games nobody has touched within the TTL; returns the evicted codes
+        now = time.time() if now is None else now
+        if self.store is not None:
+            return self.store.evict_idle(now - self.ttl)
+        expired = [code for code, g in self.games.items() if now - g.last_active > self.ttl]
+        for code in expired:
+            del self.games[code]
+            if self.journal is not None:
+                self.journal.discard(code)
+        return expired
@@ -1,67 +1,33 @@
-import wave
-import math
-import struct
-import os
-
-def write_tone(filename, freq=440, duration=0.5, volume=0.5, wave_type='sine'):
-    sample_rate = 44100
-    n_samples = int(sample_rate * duration)
-
-    with wave.open(filename, 'w') as f:
-        f.setnchannels(1)
-        f.setsampwidth(2)
-        f.setframerate(sample_rate)
-
-        for i in range(n_samples):
-            t = float(i) / sample_rate
-            if wave_type == 'sine':
-                value = math.sin(2.0 * math.pi * freq * t)
-            elif wave_type == 'square':
-                value = 1.0 if math.sin(2.0 * math.pi * freq * t) > 0 else -1.0
-            elif wave_type == 'saw':
-                 value = 2.0 * (t * freq - math.floor(t * freq + 0.5))
-
-            # Apply envelope (simple decay)
-            decay = 1.0 - (i / n_samples)
+"""Build the board's sound effects.
 
-            data = int(value * volume * decay * 32767.0)
-            f.writeframes(struct.pack('<h', data))
+    python generate_sounds.py
+    python generate_sounds.py --pack packs/retro.json --out static/assets/audio/packs/retro
+    python generate_sounds.py --force
 
-def generate_daily_double(filename):
-    # Ascending 'laser' sound
-    sample_rate = 44100
-    duration = 2.0
-    n_samples = int(sample_rate * duration)
-
-    with wave.open(filename, 'w') as f:
-        f.setnchannels(1)
-        f.setsampwidth(2)
-        f.setframerate(sample_rate)
-
-        for i in range(n_samples):
-            t = float(i) / sample_rate
-            # Frequency sweep 400 -> 1200
-            freq = 400 + (800 * t / duration)
-            value = math.sin(2.0 * math.pi * freq * t * 5) # *5 for wobble
-
-            data = int(value * 0.5 * 32767.0)
-            f.writeframes(struct.pack('<h', data))
-
-os.makedirs('static/assets/audio', exist_ok=True)
+Renders the default sounds (or a pack: a JSON file of {name: spec}, see
+sounds.py) into static/assets/audio. Sounds whose spec hasn't changed since
+the last build are skipped; --force renders everything again.
+"""
+import argparse
+import os
+import sys
 
-# Buzz In (Medium Tone)
-write_tone('static/assets/audio/buzz.wav', freq=440, duration=0.5)
+import sounds
 
-# Correct (High Ding)
-write_tone('static/assets/audio/correct.wav', freq=880, duration=0.8)
 
-# Incorrect (Low Buzz)
-write_tone('static/assets/audio/incorrect.wav', freq=150, duration=0.5, wave_type='square')
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the board sound effects.')
+    parser.add_argument('--pack', help='JSON sound pack; names it leaves out keep the default sound')
+    parser.add_argument('--out', default=os.path.join('static', 'assets', 'audio'))
+    parser.add_argument('--force', action='store_true', help='render even unchanged sounds')
+    args = parser.parse_args(argv)
 
-# Time's Up (Three beeps - simulating one)
-write_tone('static/assets/audio/times_up.wav', freq=800, duration=0.2)
+    pack = sounds.load_pack(args.pack) if args.pack else sounds.DEFAULT_PACK
+    result = sounds.build_pack(pack, args.out, force=args.force)
+    print(f"Sounds generated in {result['seconds'] * 1000:.1f}ms: "
+          f"{len(result['written'])} written, {len(result['cached'])} unchanged.")
+    return 0
 
-# Daily Double
-generate_daily_double('static/assets/audio/daily_double.wav')
 
-print("Sounds generated.")
+if __name__ == '__main__':
+    sys.exit(main())
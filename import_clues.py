@@ -0,0 +1,324 @@
+"""Stream clue archives into the question bank.
+
+    python import_clues.py dump.tsv --bank data/bank.sqlite
+    python import_clues.py clues.jsonl --format jsonl
+    python import_clues.py kaggle.csv --map text=Question,answer=Answer,category=Category
+
+Reads TSV, CSV or JSONL one record at a time, validates each against the clue
+schema the game uses (value, text, answer, type, media_url), normalizes values
+and rounds, drops duplicates by content hash, and commits in batches. Progress
+is saved with every batch, so an interrupted import picks up where it stopped
+when re-run on the same file (use --restart to start over). data/questions.json
+style board files can be imported with --format board.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+
+import media
+import question_bank
+
+# Column names tried for each field when no --map is given
+FIELD_ALIASES = {
+    'round': ['round', 'Round'],
+    'category': ['category', 'Category'],
+    'value': ['value', 'clue_value', 'Value'],
+    'text': ['text', 'clue', 'Question', 'question'],
+    'answer': ['answer', 'response', 'Answer'],
+    'type': ['type'],
+    'media_url': ['media_url'],
+    'air_date': ['air_date', 'Air Date', 'airdate'],
+}
+ROUND_NAMES = {
+    '1': 1, 'jeopardy': 1, 'jeopardy!': 1, 'j': 1,
+    '2': 2, 'double jeopardy': 2, 'double jeopardy!': 2, 'dj': 2,
+    '3': 3, 'final jeopardy': 3, 'final jeopardy!': 3, 'fj': 3,
+}
+CLUE_TYPES = {'text', 'image', 'audio', 'video'}
+PROGRESS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS import_progress (
+    source TEXT PRIMARY KEY,
+    size INTEGER,
+    rows INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    inserted INTEGER NOT NULL,
+    duplicates INTEGER NOT NULL,
+    rejected INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+
+class InvalidClue(ValueError):
+    pass
+
+
+def normalize_value(raw, round_no):
+    if raw is None or str(raw).strip() in ('', 'None', 'null'):
+        if round_no == question_bank.FINAL_ROUND:
+            return 0
+        raise InvalidClue('missing value')
+    digits = re.sub(r'[^\d]', '', str(raw))
+    if not digits:
+        raise InvalidClue(f'bad value {raw!r}')
+    return int(digits)
+
+
+def normalize_round(raw):
+    if raw is None or str(raw).strip() == '':
+        return 1
+    round_no = ROUND_NAMES.get(str(raw).strip().lower())
+    if round_no is None:
+        raise InvalidClue(f'unknown round {raw!r}')  # e.g. tiebreakers
+    return round_no
+
+
+def clean_text(raw):
+    # Archives often carry HTML escapes/markup and stray whitespace
+    text = re.sub(r'<[^>]+>', '', str(raw or ''))
+    text = text.replace('\\\'', "'").replace('\\"', '"')
+    return ' '.join(text.split())
+
+
+def to_clue(record):
+    # Validate a mapped record into the shape Game.get_clue expects, plus bank metadata
+    round_no = normalize_round(record.get('round'))
+    text = clean_text(record.get('text'))
+    answer = clean_text(record.get('answer'))
+    category = clean_text(record.get('category'))
+    if not text or not answer or not category:
+        raise InvalidClue('missing text, answer or category')
+    media_url = (record.get('media_url') or '').strip() or None
+    clue_type = (record.get('type') or '').strip().lower()
+    if not clue_type:
+        clue_type = media.media_type(media_url) or 'text'  # From the extension
+    if clue_type not in CLUE_TYPES:
+        raise InvalidClue(f'bad type {clue_type!r}')
+    if clue_type != 'text' and not media_url:
+        raise InvalidClue(f'{clue_type} clue without media_url')
+    return {
+        'round': round_no,
+        'category': category,
+        'air_date': (record.get('air_date') or '').strip() or None,
+        'value': normalize_value(record.get('value'), round_no),
+        'text': text,
+        'answer': answer,
+        'type': clue_type,
+        'media_url': media_url,
+    }
+
+
+def content_hash(clue):
+    key = '\x1f'.join([clue['category'].lower(), clue['text'].lower(), clue['answer'].lower()])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def build_mapper(fieldnames, overrides):
+    # Returns a function from a raw record to our field names
+    mapping = {}
+    for field, aliases in FIELD_ALIASES.items():
+        if field in overrides:
+            mapping[field] = overrides[field]
+            continue
+        for alias in aliases:
+            if fieldnames is None or alias in fieldnames:
+                mapping[field] = alias
+                break
+    return lambda record: {field: record.get(column) for field, column in mapping.items()}
+
+
+def read_lines(f, start_offset):
+    # Yields (line, offset after the line) from a binary file, starting at a byte offset
+    f.seek(start_offset)
+    offset = start_offset
+    for line in f:
+        offset += len(line)
+        yield line.decode('utf-8', errors='replace').rstrip('\r\n'), offset
+
+
+def read_tsv(path, overrides, start):
+    # Archive TSVs are unquoted, one record per line, so we can resume by byte offset
+    with open(path, 'rb') as f:
+        header = f.readline().decode('utf-8').rstrip('\r\n').split('\t')
+        mapper = build_mapper(header, overrides)
+        for line, offset in read_lines(f, max(start['offset'], f.tell())):
+            if line:
+                yield mapper(dict(zip(header, line.split('\t')))), offset
+
+
+def read_jsonl(path, overrides, start):
+    mapper = build_mapper(None, overrides)
+    with open(path, 'rb') as f:
+        for line, offset in read_lines(f, start['offset']):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield None, offset
+                continue
+            yield mapper(record), offset
+
+
+def read_csv(path, overrides, start):
+    # Quoted CSV fields may span lines, so resume by skipping already-imported rows
+    with open(path, newline='', encoding='utf-8', errors='replace') as f:
+        reader = csv.DictReader(f)
+        mapper = build_mapper(reader.fieldnames, overrides)
+        for row_no, record in enumerate(reader, 1):
+            if row_no > start['rows']:
+                yield mapper(record), 0
+
+
+def read_board(path, overrides, start):
+    # data/questions.json layout: round_1 / round_2 lists of categories plus final_jeopardy
+    with open(path) as f:
+        data = json.load(f)
+    records = []
+    for round_no in (1, 2):
+        for cat in data.get(f'round_{round_no}', []):
+            for clue in cat['clues']:
+                records.append(dict(clue, round=round_no, category=cat['category']))
+    if data.get('final_jeopardy'):
+        records.append(dict(data['final_jeopardy'], round=3))
+    for record in records[start['rows']:]:
+        yield record, 0
+
+
+READERS = {'tsv': read_tsv, 'jsonl': read_jsonl, 'csv': read_csv, 'board': read_board}
+
+
+def guess_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext == 'json':
+        return 'board'
+    if ext in ('ndjson', 'jsonl'):
+        return 'jsonl'
+    return ext if ext in READERS else 'tsv'
+
+
+class Importer:
+    def __init__(self, bank, source, fmt, overrides=None, batch_size=5000, report_every=5.0, out=sys.stderr):
+        self.bank = bank
+        self.source = os.path.abspath(source)
+        self.fmt = fmt
+        self.overrides = overrides or {}
+        self.batch_size = batch_size
+        self.report_every = report_every
+        self.out = out
+        self.category_ids = OrderedDict()  # (name, round, air_date) -> id, bounded LRU
+        self.bank.conn.execute(PROGRESS_SCHEMA)
+
+    def load_progress(self, restart=False):
+        size = os.path.getsize(self.source)
+        row = self.bank.conn.execute('SELECT size, rows, offset, inserted, duplicates, rejected, done '
+                                     'FROM import_progress WHERE source = ?', (self.source,)).fetchone()
+        if restart or row is None or row[0] != size:
+            return {'rows': 0, 'offset': 0, 'inserted': 0, 'duplicates': 0, 'rejected': 0, 'done': False}
+        return {'rows': row[1], 'offset': row[2], 'inserted': row[3], 'duplicates': row[4],
+                'rejected': row[5], 'done': bool(row[6])}
+
+    def save_progress(self, progress):
+        # Written in the same transaction as the batch it describes
+        self.bank.conn.execute(
+            'INSERT OR REPLACE INTO import_progress '
+            '(source, size, rows, offset, inserted, duplicates, rejected, done) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (self.source, os.path.getsize(self.source), progress['rows'], progress['offset'], progress['inserted'],
+             progress['duplicates'], progress['rejected'], int(progress['done'])))
+        self.bank.commit()
+
+    def category_id(self, clue):
+        key = (clue['category'], clue['round'], clue['air_date'])
+        cat_id = self.category_ids.get(key)
+        if cat_id is None:
+            cat_id = self.category_ids[key] = self.bank.category_id(*key)
+            if len(self.category_ids) > 10000:
+                self.category_ids.popitem(last=False)
+        else:
+            self.category_ids.move_to_end(key)
+        return cat_id
+
+    def run(self, restart=False):
+        progress = self.load_progress(restart)
+        if progress['done']:
+            print(f"{self.source} already imported ({progress['inserted']} clues)", file=self.out)
+            return progress
+        if progress['rows']:
+            print(f"Resuming {self.source} after row {progress['rows']}", file=self.out)
+        started = last_report = time.time()
+        start_rows = progress['rows']
+        pending = 0
+        for record, offset in READERS[self.fmt](self.source, self.overrides, progress):
+            progress['rows'] += 1
+            progress['offset'] = offset
+            try:
+                if record is None:
+                    raise InvalidClue('unparseable record')
+                clue = to_clue(record)
+            except InvalidClue:
+                progress['rejected'] += 1
+            else:
+                if self.bank.add_clue(self.category_id(clue), clue, content_hash(clue)):
+                    progress['inserted'] += 1
+                else:
+                    progress['duplicates'] += 1
+            pending += 1
+            if pending >= self.batch_size:
+                self.save_progress(progress)
+                pending = 0
+                now = time.time()
+                if now - last_report >= self.report_every:
+                    self.report(progress, progress['rows'] - start_rows, now - started)
+                    last_report = now
+        progress['done'] = True
+        self.save_progress(progress)
+        self.report(progress, progress['rows'] - start_rows, time.time() - started, final=True)
+        return progress
+
+    def report(self, progress, rows, elapsed, final=False):
+        rate = rows / elapsed if elapsed > 0 else 0.0
+        label = 'Done' if final else 'Progress'
+        print(f"{label}: {progress['rows']} rows ({rate:,.0f} rows/s) - inserted {progress['inserted']}, "
+              f"duplicates {progress['duplicates']}, rejected {progress['rejected']}", file=self.out)
+
+
+def parse_map(value):
+    overrides = {}
+    for pair in filter(None, (value or '').split(',')):
+        field, _, column = pair.partition('=')
+        if field not in FIELD_ALIASES or not column:
+            raise argparse.ArgumentTypeError(f'bad mapping {pair!r}')
+        overrides[field] = column
+    return overrides
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import clue archives into the question bank.')
+    parser.add_argument('source', help='TSV, CSV, JSONL or board JSON file')
+    parser.add_argument('--bank', default=os.environ.get('QUESTION_BANK', os.path.join('data', 'bank.sqlite')))
+    parser.add_argument('--format', choices=sorted(READERS), help='defaults to the file extension')
+    parser.add_argument('--map', type=parse_map, default={}, help='field=column overrides, e.g. text=Question')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--restart', action='store_true', help='ignore saved progress for this file')
+    args = parser.parse_args(argv)
+
+    bank = question_bank.QuestionBank(args.bank)
+    importer = Importer(bank, args.source, args.format or guess_format(args.source), args.map, args.batch_size)
+    try:
+        importer.run(restart=args.restart)
+    except KeyboardInterrupt:
+        print('Interrupted; re-run the same command to resume.', file=sys.stderr)
+        return 1
+    finally:
+        bank.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import collections
+import json
+import os
+
+# Append-only journal of game events with periodic snapshots.
+#
+# Game methods hand every state change to append() as (seq, event, data). That
+# encodes it and puts it on an in-memory queue; flush() -- run by one background worker
+# every few milliseconds -- writes everything queued since the last flush and
+# fsyncs each touched file once (group commit). A crash loses at most one flush
+# interval of events, and no event waits on its own fsync.
+#
+# Every snapshot_every events a game queues a full snapshot (Game.to_state).
+# flush() writes it atomically and truncates that game's log, so recovery reads
+# one snapshot plus at most snapshot_every events.
+#
+# Files per game code in the journal directory:
+#   CODE.snap  {"seq": n, "state": {...}}
+#   CODE.log   one {"seq", "event", "data"} JSON object per line, seq > snapshot seq
+
+
+class GameJournal:
+    def __init__(self, directory, snapshot_every=500, fsync=True):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        # deque append/popleft are atomic, so append() from the game and flush()
+        # from a worker thread need no lock
+        self._queue = collections.deque()
+        self._logs = {}  # code -> open log file
+
+    def _path(self, code, ext):
+        return os.path.join(self.directory, f'{code}.{ext}')
+
+    # Entries are encoded on the caller's side: the game keeps mutating the
+    # objects it passed in while the flush worker is writing
+
+    def append(self, code, seq, event, data):
+        line = json.dumps({'seq': seq, 'event': event, 'data': data}).encode('utf-8') + b'\n'
+        self._queue.append(('event', code, line))
+
+    def snapshot(self, code, seq, state):
+        self._queue.append(('snapshot', code, json.dumps({'seq': seq, 'state': state}).encode('utf-8')))
+
+    def discard(self, code):
+        # Forget a game entirely (e.g. evicted after its TTL)
+        self._queue.append(('discard', code, None))
+
+    def pending(self):
+        return len(self._queue)
+
+    def flush(self):
+        touched = set()
+        while True:
+            try:
+                kind, code, payload = self._queue.popleft()
+            except IndexError:
+                break
+            if kind == 'event':
+                self._log(code).write(payload)
+                touched.add(code)
+            elif kind == 'snapshot':
+                self._write_snapshot(code, payload)
+                touched.discard(code)
+            elif kind == 'discard':
+                self._close(code)
+                for ext in ('snap', 'log'):
+                    if os.path.exists(self._path(code, ext)):
+                        os.remove(self._path(code, ext))
+                touched.discard(code)
+        for code in touched:
+            f = self._logs[code]
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def _log(self, code):
+        f = self._logs.get(code)
+        if f is None:
+            f = self._logs[code] = open(self._path(code, 'log'), 'ab')
+        return f
+
+    def _close(self, code):
+        f = self._logs.pop(code, None)
+        if f is not None:
+            f.close()
+
+    def _write_snapshot(self, code, payload):
+        tmp = self._path(code, 'snap.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, self._path(code, 'snap'))
+        # Everything logged so far is covered by the snapshot
+        self._close(code)
+        open(self._path(code, 'log'), 'wb').close()
+
+    def load(self, code):
+        # Returns (snapshot state or None, [events after it]) or None if the game was never journaled
+        snap_path, log_path = self._path(code, 'snap'), self._path(code, 'log')
+        if not os.path.exists(snap_path) and not os.path.exists(log_path):
+            return None
+        snap_seq, state = 0, None
+        if os.path.exists(snap_path):
+            with open(snap_path, 'rb') as f:
+                snap = json.loads(f.read())
+            snap_seq, state = snap['seq'], snap['state']
+        events = []
+        if os.path.exists(log_path):
+            with open(log_path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Torn write at the tail from a crash
+                    if entry['seq'] > snap_seq:
+                        events.append(entry)
+        return state, events
+
+    def codes(self):
+        names = os.listdir(self.directory)
+        return sorted({n.rsplit('.', 1)[0] for n in names if n.endswith(('.snap', '.log'))})
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import threading
+
+from flask import abort, request, send_from_directory, url_for
+
+# Content-addressed URLs for files under static/. An asset's version is a hash
+# of its bytes, so `/static/<path>?v=<digest>` never changes meaning and can be
+# cached by browsers for good (install() serves those as immutable), while the
+# same digest is the file's strong ETag for unversioned requests. Digests are
+# computed once per file and recomputed only when its size or mtime changes.
+#
+# Clue media (media_url) under /static/ gets versioned URLs too, and each round
+# has a manifest of its media so boards can prefetch it before a clue opens.
+
+STATIC_PREFIX = '/static/'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MEDIA_TYPES = {'jpg': 'image', 'jpeg': 'image', 'png': 'image', 'gif': 'image',
+               'mp3': 'audio', 'wav': 'audio', 'ogg': 'audio', 'mp4': 'video', 'webm': 'video'}
+
+
+class AssetIndex:
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        self._digests = {}  # path under root -> (mtime_ns, size, digest)
+        self._lock = threading.Lock()
+
+    def digest(self, path):
+        # None if path isn't a file under root
+        full = os.path.realpath(os.path.join(self.root, path))
+        if not full.startswith(self.root + os.sep):
+            return None
+        try:
+            st = os.stat(full)
+        except OSError:
+            return None
+        cached = self._digests.get(path)
+        if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        h = hashlib.sha256()
+        with open(full, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        digest = h.hexdigest()[:20]
+        with self._lock:
+            self._digests[path] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def url(self, url):
+        # Versioned form of a /static/ URL (or static/..., as questions files
+        # often write it); anything else (another host, a missing file) is
+        # returned unchanged
+        if url and url.startswith(STATIC_PREFIX[1:]):
+            url = '/' + url
+        if not url or not url.startswith(STATIC_PREFIX):
+            return url
+        digest = self.digest(url[len(STATIC_PREFIX):].split('?', 1)[0])
+        return f'{url}?v={digest}' if digest else url
+
+
+def media_type(url, declared=None):
+    if declared and declared != 'text':
+        return declared
+    return MEDIA_TYPES.get(url.rsplit('.', 1)[-1].lower()) if url else None
+
+
+def round_manifest(round_no, round_data, assets):
+    # Every distinct media_url in the round: {url, src (versioned), type}
+    seen, items = set(), []
+    for cat in round_data:
+        for clue in cat['clues']:
+            url = clue.get('media_url')
+            if url and url not in seen:
+                seen.add(url)
+                items.append({'url': url, 'src': assets.url(url), 'type': media_type(url, clue.get('type'))})
+    return {'round': round_no, 'media': items}
+
+
+def install(app, assets):
+    # Serve app's /static/ from assets.root with the digest as strong ETag,
+    # conditional GETs and Range requests (werkzeug's send_file), immutable for
+    # a year when the URL carries the current version and revalidated otherwise.
+    # Templates get asset_url(filename) for versioned URLs.
+    def static_file(filename):
+        digest = assets.digest(filename)
+        if digest is None:
+            abort(404)
+        response = send_from_directory(assets.root, filename, etag=digest)
+        if request.args.get('v') == digest:
+            response.cache_control.no_cache = False  # send_file's default
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
+
+    app.add_url_rule(STATIC_PREFIX + '<path:filename>', endpoint='static', view_func=static_file)
+    app.add_template_global(lambda filename: url_for('static', filename=filename, v=assets.digest(filename)),
+                            name='asset_url')
@@ -0,0 +1,93 @@
+import collections
+import gzip
+import hashlib
+import threading
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are offered gzipped only
+    brotli = None
+
+# Rendered responses kept per game, so the board and host pages aren't
+# re-rendered for every request. An entry is stored under (page, code) with
+# the version it was rendered for: a lookup with a newer version (the game's
+# board_version changed, see Game.mark_answered/reset_board) renders again and
+# replaces it. Bodies are compressed once when rendered, and their hash (plus
+# the encoding, so each representation has its own strong ETag) is the ETag,
+# so repeat requests are answered 304 without a body at all. Pages take any
+# ?game= code, so the least recently used entries are dropped past capacity.
+
+MIN_COMPRESS = 256  # Smaller bodies aren't worth an encoding
+CAPACITY = 1024  # Entries kept; three pages per game
+
+
+class Rendered:
+    __slots__ = ('body', 'mimetype', 'etag', 'encoded')
+
+    def __init__(self, body, mimetype):
+        self.body = body.encode() if isinstance(body, str) else body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(self.body).hexdigest()[:20]
+        self.encoded = {}  # Content-Encoding -> bytes, only where it's smaller
+        if len(self.body) >= MIN_COMPRESS:
+            candidates = {'gzip': gzip.compress(self.body, 9, mtime=0)}
+            if brotli is not None:
+                candidates['br'] = brotli.compress(self.body)
+            self.encoded = {enc: data for enc, data in candidates.items() if len(data) < len(self.body)}
+
+
+class RenderCache:
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self._entries = collections.OrderedDict()  # (page, code) -> (version, Rendered), least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def get(self, page, code, version, render, mimetype='text/html'):
+        key = (page, code)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        rendered = Rendered(render(), mimetype)
+        self.renders += 1
+        with self._lock:
+            self._entries[key] = (version, rendered)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return rendered
+
+    def discard(self, code):
+        # Drop a game's entries (it was evicted from the registry)
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == code]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def encoding_for(rendered, accept_encodings):
+    for enc in ('br', 'gzip'):
+        if enc in rendered.encoded and accept_encodings[enc]:
+            return enc
+    return None
+
+
+def send(rendered):
+    # The current request's response for a cached render: 304 if the client
+    # already has it, else the best encoding it accepts. Always revalidated.
+    enc = encoding_for(rendered, request.accept_encodings)
+    etag = f'{rendered.etag}-{enc}' if enc else rendered.etag
+    headers = {'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    if enc:
+        headers['Content-Encoding'] = enc
+    return Response(rendered.encoded[enc] if enc else rendered.body, mimetype=rendered.mimetype, headers=headers)
@@ -0,0 +1,139 @@
+import os
+import random
+import sqlite3
+import threading
+
+# SQLite question bank for running games from a large archive of clues.
+#
+# Each row of `categories` is one airing of a category (name, round, air date);
+# its clues hang off it with the value they aired at. Boards are materialized on
+# demand -- a handful of indexed lookups per round -- so a worker never loads the
+# bank into memory and startup cost doesn't grow with the archive. Reads go
+# through SQLite's memory-mapped I/O, so every worker on a box shares the same
+# OS page cache for the file.
+#
+# Round numbers: 1 = Jeopardy, 2 = Double Jeopardy, 3 = Final Jeopardy.
+
+FINAL_ROUND = 3
+# Clues are re-valued onto the standard ladder for the round being played, so
+# archives from eras with different dollar amounts mix on one board
+ROUND_LADDERS = {1: [200, 400, 600, 800, 1000], 2: [400, 800, 1200, 1600, 2000]}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    air_date TEXT,
+    clue_count INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (name, round, air_date)
+);
+CREATE TABLE IF NOT EXISTS clues (
+    id INTEGER PRIMARY KEY,
+    category_id INTEGER NOT NULL REFERENCES categories (id),
+    value INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    type TEXT NOT NULL DEFAULT 'text',
+    media_url TEXT,
+    hash TEXT NOT NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS categories_round ON categories (round, id);
+CREATE INDEX IF NOT EXISTS categories_full_ladder ON categories (round, id) WHERE clue_count >= 5;
+CREATE INDEX IF NOT EXISTS categories_name ON categories (name);
+CREATE INDEX IF NOT EXISTS categories_air_date ON categories (air_date);
+CREATE INDEX IF NOT EXISTS clues_category ON clues (category_id, value);
+CREATE INDEX IF NOT EXISTS clues_value ON clues (value);
+"""
+
+
+class QuestionBank:
+    def __init__(self, path, mmap_size=256 * 1024 * 1024):
+        self.path = path
+        self.mmap_size = mmap_size
+        self._conn = None  # Opened on first use so importing/constructing is free
+        self.lock = threading.Lock()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def category_id(self, name, round_no, air_date=None):
+        # Id of the category airing, created if new
+        conn = self.conn
+        row = conn.execute('SELECT id FROM categories WHERE name = ? AND round = ? AND air_date IS ?',
+                           (name, round_no, air_date)).fetchone()
+        if row:
+            return row[0]
+        return conn.execute('INSERT INTO categories (name, round, air_date) VALUES (?, ?, ?)',
+                            (name, round_no, air_date)).lastrowid
+
+    def add_clue(self, category_id, clue, content_hash):
+        # Returns False if a clue with the same content hash is already banked
+        cur = self.conn.execute(
+            'INSERT OR IGNORE INTO clues (category_id, value, text, answer, type, media_url, hash) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (category_id, clue['value'], clue['text'], clue['answer'],
+             clue.get('type', 'text'), clue.get('media_url'), content_hash))
+        if cur.rowcount:
+            self.conn.execute('UPDATE categories SET clue_count = clue_count + 1 WHERE id = ?', (category_id,))
+            return True
+        return False
+
+    def commit(self):
+        self.conn.commit()
+
+    def count_clues(self):
+        return self.conn.execute('SELECT COUNT(*) FROM clues').fetchone()[0]
+
+    def random_categories(self, round_no, n, min_clues, rng=None, exclude=()):
+        # Random categories of a round with at least min_clues clues. Probes random
+        # ids through the (round, id) index instead of ORDER BY random(),
+        # so the cost is O(n log N) however large the bank is. min_clues is
+        # inlined so a full-ladder query can use the categories_full_ladder
+        # partial index and never scans past categories that can't fill a board.
+        rng = rng or random
+        conn = self.conn
+        playable = f'round = ? AND clue_count >= {int(min_clues)}'
+        bounds = conn.execute(f'SELECT MIN(id), MAX(id) FROM categories WHERE {playable}', (round_no,)).fetchone()
+        if bounds[0] is None:
+            return []
+        picked = []
+        seen = set(exclude)
+        for _ in range(n * 20):
+            if len(picked) == n:
+                break
+            probe = rng.randint(bounds[0], bounds[1])
+            row = conn.execute(f'SELECT id, name, air_date FROM categories WHERE {playable} AND id >= ? '
+                               'ORDER BY id LIMIT 1', (round_no, probe)).fetchone()
+            if row and row[0] not in seen:
+                seen.add(row[0])
+                picked.append({'id': row[0], 'category': row[1], 'air_date': row[2]})
+        return picked
+
+    def category_clues(self, category_id):
+        rows = self.conn.execute('SELECT id, value, text, answer, type, media_url FROM clues '
+                                 'WHERE category_id = ? ORDER BY value, id', (category_id,)).fetchall()
+        return [{'id': r[0], 'value': r[1], 'text': r[2], 'answer': r[3], 'type': r[4], 'media_url': r[5]}
+                for r in rows]
+
+    def materialize_final(self, rng=None):
+        with self.lock:
+            cats = self.random_categories(FINAL_ROUND, 1, 1, rng)
+            if not cats:
+                return {}
+            clue = self.category_clues(cats[0]['id'])[0]
+            return {'category': cats[0]['category'], 'text': clue['text'], 'answer': clue['answer']}
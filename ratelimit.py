@@ -0,0 +1,26 @@
+import time
+
+# Token buckets for inbound socket events. Each connection gets one bucket per
+# event type (see game_events.RATE_LIMITS): a bucket holds up to `burst` tokens,
+# refills at `rate` per second, and every event takes one. Events that find it
+# empty are dropped before they reach the game.
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated', 'clock')
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.clock = clock
+        self.updated = clock()
+
+    def take(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
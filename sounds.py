@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import time
+import wave
+
+import numpy as np
+
+# Sound effect synthesis. A sound is described by a small JSON-able spec, and
+# whole waveforms are computed with NumPy and written with one writeframes call.
+#
+#   {"kind": "tone", "freq": 440, "duration": 0.5, "volume": 0.5, "wave": "sine"}
+#       (wave: sine, square or saw; fades out linearly over the duration)
+#   {"kind": "sweep", "start": 400, "end": 1200, "duration": 2.0, "wobble": 5}
+#   {"kind": "sequence", "parts": [spec, {"kind": "silence", "duration": 0.1}, ...]}
+#
+# A pack maps play_sound names to specs. build_pack writes one WAV per name and
+# records a hash of each spec next to them, so an unchanged sound is never
+# rendered twice.
+
+SAMPLE_RATE = 44100
+SYNTH_VERSION = 1  # Bump when rendering changes, so cached files are rebuilt
+MANIFEST = '.sounds.json'
+
+DEFAULT_PACK = {
+    'buzz': {'kind': 'tone', 'freq': 440, 'duration': 0.5},  # Medium tone
+    'correct': {'kind': 'tone', 'freq': 880, 'duration': 0.8},  # High ding
+    'incorrect': {'kind': 'tone', 'freq': 150, 'duration': 0.5, 'wave': 'square'},  # Low buzz
+    'times_up': {'kind': 'tone', 'freq': 800, 'duration': 0.2},
+    'daily_double': {'kind': 'sweep', 'start': 400, 'end': 1200, 'duration': 2.0, 'wobble': 5},  # Ascending 'laser'
+}
+
+
+def _times(duration, sample_rate):
+    return np.arange(int(sample_rate * duration)) / sample_rate
+
+
+def tone(freq, duration, volume=0.5, wave='sine', sample_rate=SAMPLE_RATE):
+    t = _times(duration, sample_rate)
+    phase = 2.0 * np.pi * freq * t
+    if wave == 'sine':
+        value = np.sin(phase)
+    elif wave == 'square':
+        value = np.where(np.sin(phase) > 0, 1.0, -1.0)
+    elif wave == 'saw':
+        value = 2.0 * (t * freq - np.floor(t * freq + 0.5))
+    else:
+        raise ValueError(f'unknown wave {wave!r}')
+    decay = 1.0 - np.arange(len(t)) / len(t) if len(t) else t
+    return value * volume * decay
+
+
+def sweep(start, end, duration, wobble=1, volume=0.5, sample_rate=SAMPLE_RATE):
+    t = _times(duration, sample_rate)
+    freq = start + (end - start) * t / duration
+    return np.sin(2.0 * np.pi * freq * t * wobble) * volume
+
+
+def render(spec, sample_rate=SAMPLE_RATE):
+    kind = spec.get('kind', 'tone')
+    if kind == 'tone':
+        return tone(spec['freq'], spec['duration'], spec.get('volume', 0.5), spec.get('wave', 'sine'), sample_rate)
+    if kind == 'sweep':
+        return sweep(spec['start'], spec['end'], spec['duration'], spec.get('wobble', 1), spec.get('volume', 0.5),
+                     sample_rate)
+    if kind == 'silence':
+        return np.zeros(int(sample_rate * spec['duration']))
+    if kind == 'sequence':
+        return np.concatenate([render(part, sample_rate) for part in spec['parts']] or [np.zeros(0)])
+    raise ValueError(f'unknown sound kind {kind!r}')
+
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    # 16-bit mono; float samples in [-1, 1], truncated toward zero like int()
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+def spec_key(spec, sample_rate=SAMPLE_RATE):
+    blob = json.dumps([SYNTH_VERSION, sample_rate, spec], sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+def load_pack(path):
+    # A JSON file of {name: spec}; names it leaves out keep the default sound
+    with open(path) as f:
+        return dict(DEFAULT_PACK, **json.load(f))
+
+
+def build_pack(pack, out_dir, force=False, sample_rate=SAMPLE_RATE):
+    # Render the pack's sounds that changed since the last build into out_dir;
+    # returns {'written': [...], 'cached': [...], 'seconds': ...}
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            built = json.load(f)
+    except (OSError, ValueError):
+        built = {}
+    written, cached = [], []
+    for name, spec in sorted(pack.items()):
+        key = spec_key(spec, sample_rate)
+        path = os.path.join(out_dir, f'{name}.wav')
+        if not force and built.get(name) == key and os.path.exists(path):
+            cached.append(name)
+            continue
+        write_wav(path, render(spec, sample_rate), sample_rate)
+        built[name] = key
+        written.append(name)
+    if written:
+        with open(manifest_path, 'w') as f:
+            json.dump(built, f, indent=1, sort_keys=True)
+    return {'written': written, 'cached': cached, 'seconds': time.perf_counter() - started}
@@ -0,0 +1,74 @@
+"""Serve /watch spectators from their own process.
+
+    GAME_SERVER=http://localhost:5000 python spectator.py --port 5001
+
+Spectators open http://<host>:5001/watch?game=CODE. For every game someone is
+watching, this process fetches the game server's /watch/state once per
+--interval and fans the result out to all of that game's watchers, so the game
+server sees one small request per game per tick however big the audience is,
+and spectator connections never compete with buzz handling.
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse  # noqa: E402
+import os  # noqa: E402
+import urllib.error  # noqa: E402
+import urllib.parse  # noqa: E402
+import urllib.request  # noqa: E402
+
+import gevent  # noqa: E402
+from flask import Flask, Response, render_template, request  # noqa: E402
+from gevent import pywsgi  # noqa: E402
+
+import game_logic  # noqa: E402
+import media  # noqa: E402
+import spectators  # noqa: E402
+
+app = Flask(__name__, static_folder=None)
+media.install(app, media.AssetIndex(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')))
+hub = spectators.SpectatorHub()
+
+
+@app.route('/watch')
+def watch():
+    return render_template('watch.html', game_code=game_logic.normalize_code(request.args.get('game')))
+
+
+@app.route('/watch/stream')
+def watch_stream():
+    code = game_logic.normalize_code(request.args.get('game'))
+    return Response(hub.stream(code), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def fetch(base, code, timeout):
+    url = f'{base}/watch/state?game={urllib.parse.quote(code)}'
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as r:
+            hub.publish(code, r.read().decode())
+    except (urllib.error.URLError, OSError):
+        pass  # Unknown game or server unreachable; try again next tick
+
+
+def poll_forever(base, interval):
+    while True:
+        gevent.sleep(interval)
+        gevent.joinall([gevent.spawn(fetch, base, code, interval * 4) for code in hub.watched()],
+                       timeout=interval * 4)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--game-server', default=os.environ.get('GAME_SERVER', 'http://localhost:5000'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5001)))
+    parser.add_argument('--interval', type=float, default=float(os.environ.get('SPECTATOR_INTERVAL', 0.5)))
+    args = parser.parse_args()
+    gevent.spawn(poll_forever, args.game_server.rstrip('/'), args.interval)
+    print(f'Serving spectators on port {args.port} from {args.game_server}')
+    pywsgi.WSGIServer(('0.0.0.0', args.port), app, log=None).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import json
+import threading
+
+# Read-only fan-out for spectators (/watch). Each watched game has one feed
+# holding its latest projection (Game.spectator_view plus the timer), serialized
+# once per tick as a Server-Sent Events chunk and written as-is to every
+# watcher. Watchers always get the newest state: one that falls behind skips
+# straight to it instead of queueing updates, so a slow phone costs nothing.
+#
+# The feeds are filled on a fixed tick, either inside app.py or by spectator.py
+# polling the game server, so the update rate is bounded however fast the game
+# moves and however many people watch.
+
+
+RETRY = b'retry: 2000\n\n'  # Browsers reconnect after 2s
+KEEPALIVE = b': keepalive\n\n'
+
+
+class _Feed:
+    def __init__(self):
+        self.version = 0
+        self.body = None
+        self.chunk = None
+        self.watchers = 0
+        self.changed = threading.Condition()
+
+
+class SpectatorHub:
+    def __init__(self, keepalive=15.0):
+        self.keepalive = keepalive  # Seconds between comment lines on an idle stream
+        self.feeds = {}  # game code -> _Feed
+
+    def watched(self):
+        return [code for code, feed in self.feeds.items() if feed.watchers]
+
+    def watchers(self):
+        return sum(feed.watchers for feed in self.feeds.values())
+
+    def publish(self, code, body):
+        # body is the projection already serialized as JSON; unchanged ones are dropped
+        feed = self.feeds.get(code)
+        if feed is None or feed.body == body:
+            return False
+        with feed.changed:
+            feed.version += 1
+            feed.body = body
+            feed.chunk = f'id: {feed.version}\ndata: {body}\n\n'.encode()
+            feed.changed.notify_all()
+        return True
+
+    def watch(self, code):
+        feed = self.feeds.get(code)
+        if feed is None:
+            feed = self.feeds[code] = _Feed()
+        feed.watchers += 1
+        return feed
+
+    def unwatch(self, code, feed):
+        feed.watchers -= 1
+        if not feed.watchers and self.feeds.get(code) is feed:
+            del self.feeds[code]
+
+    def stream(self, code):
+        # Generator for one watcher's text/event-stream response (a blocking
+        # one; asgi_app.py has its own for the event loop)
+        feed = self.watch(code)
+        seen = 0
+        try:
+            yield RETRY
+            while True:
+                with feed.changed:
+                    if feed.version == seen:
+                        feed.changed.wait(self.keepalive)
+                    chunk, version = feed.chunk, feed.version
+                if version == seen:
+                    yield KEEPALIVE
+                else:
+                    seen = version
+                    yield chunk
+        finally:
+            self.unwatch(code, feed)
+
+
+def encode(view):
+    return json.dumps(view, separators=(',', ':'))
@@ -0,0 +1,149 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Game state stores for running more than one worker process.
+#
+# A store holds one JSON document per game code (see Game.to_state) and hands
+# out a per-game lock. GameRegistry.session() takes the lock, loads the state,
+# runs the event handler and saves the result, so every mutation of a game --
+# including Game.handle_buzz -- is serialized no matter which worker gets it.
+#
+# Redis or another shared database can be plugged in by implementing the same
+# five methods. The two stores here need nothing beyond the standard library:
+#   MemoryStateStore  - in-process, exercises the full load/save round trip
+#   SQLiteStateStore  - shared by every worker on one box through a single file
+
+
+class StateStore:
+    def locked(self, code):
+        raise NotImplementedError
+
+    def load(self, code):
+        raise NotImplementedError
+
+    def save(self, code, state):
+        raise NotImplementedError
+
+    def delete(self, code):
+        raise NotImplementedError
+
+    def evict_idle(self, cutoff):
+        # Delete games last active before the cutoff timestamp; returns their codes
+        raise NotImplementedError
+
+
+class _LockTable:
+    # One lock per game code so unrelated games never wait on each other
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}
+
+    def get(self, code):
+        with self._guard:
+            lock = self._locks.get(code)
+            if lock is None:
+                lock = self._locks[code] = threading.RLock()
+            return lock
+
+    def discard(self, code):
+        with self._guard:
+            self._locks.pop(code, None)
+
+
+class MemoryStateStore(StateStore):
+    def __init__(self):
+        self._docs = {}  # code -> (last_active, JSON text)
+        self._locks = _LockTable()
+
+    @contextmanager
+    def locked(self, code):
+        with self._locks.get(code):
+            yield
+
+    def load(self, code):
+        doc = self._docs.get(code)
+        return json.loads(doc[1]) if doc else None
+
+    def save(self, code, state):
+        self._docs[code] = (state.get('last_active', time.time()), json.dumps(state))
+
+    def delete(self, code):
+        self._docs.pop(code, None)
+        self._locks.discard(code)
+
+    def evict_idle(self, cutoff):
+        expired = [code for code, (last_active, _) in self._docs.items() if last_active < cutoff]
+        for code in expired:
+            self.delete(code)
+        return expired
+
+
+class SQLiteStateStore(StateStore):
+    def __init__(self, path):
+        self.path = path
+        # SQLite allows one writer per file anyway, so a single connection and a
+        # single in-process lock are all a worker needs. The lock keeps greenlets
+        # of this worker from queueing on SQLite's busy timeout (which would block
+        # the whole event loop); BEGIN IMMEDIATE then excludes the other workers.
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS games ('
+                           'code TEXT PRIMARY KEY, state TEXT NOT NULL, last_active REAL NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS games_last_active ON games (last_active)')
+
+    @contextmanager
+    def locked(self, code=None):
+        with self._lock:
+            self._depth += 1
+            try:
+                if self._depth > 1:
+                    yield
+                    return
+                self._conn.execute('BEGIN IMMEDIATE')
+                try:
+                    yield
+                except BaseException:
+                    self._conn.execute('ROLLBACK')
+                    raise
+                self._conn.execute('COMMIT')
+            finally:
+                self._depth -= 1
+
+    def load(self, code):
+        row = self._conn.execute('SELECT state FROM games WHERE code = ?', (code,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, code, state):
+        self._conn.execute('INSERT OR REPLACE INTO games (code, state, last_active) VALUES (?, ?, ?)',
+                           (code, json.dumps(state), state.get('last_active', time.time())))
+
+    def delete(self, code):
+        with self.locked():
+            self._conn.execute('DELETE FROM games WHERE code = ?', (code,))
+
+    def evict_idle(self, cutoff):
+        with self.locked():
+            expired = [row[0] for row in self._conn.execute('SELECT code FROM games WHERE last_active < ?', (cutoff,))]
+            self._conn.execute('DELETE FROM games WHERE last_active < ?', (cutoff,))
+        return expired
+
+
+def from_url(url):
+    # STATE_STORE values: '' (games stay in process memory), 'memory', 'sqlite:///path/to/state.db'
+    if not url:
+        return None
+    if url == 'memory':
+        return MemoryStateStore()
+    if url.startswith('sqlite:///'):
+        path = url[len('sqlite:///'):]
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SQLiteStateStore(path)
+    raise ValueError(f"Unsupported STATE_STORE: {url}")
@@ -0,0 +1,19 @@
+// The round's grid (categories, values, answered cells) is fetched from
+// /board/data rather than rendered into the page, so the board and host pages
+// are the same for every request and answered with 304s. The JSON is
+// revalidated by ETag too and only re-rendered when the board changes.
+//
+// Pages build their grid before connecting the socket, so every
+// update_board_state applies to a cell that already exists.
+
+const BoardData = {
+    load(onLoad) {
+        return fetch(`/board/data?game=${encodeURIComponent(GAME_CODE)}`, {cache: 'no-cache'})
+            .then(r => r.json())
+            .then(onLoad);
+    },
+
+    roundTitle(round) {
+        return round === 1 ? 'JEOPARDY!' : 'DOUBLE JEOPARDY!';
+    },
+};
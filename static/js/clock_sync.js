@@ -0,0 +1,37 @@
+// NTP-style clock sync over the game socket.
+// The server keeps per-player offset/RTT estimates from our reports (used for
+// fair buzz arbitration); we keep our own offset so countdowns can run to the
+// server's deadline instead of a locally started duration.
+const ClockSync = {
+    offset: 0,      // server clock minus our clock, ms
+    bestRtt: null,
+
+    start(socket) {
+        socket.on('clock_pong', (data) => {
+            const t3 = Date.now();
+            const rtt = t3 - data.t0;
+            if (this.bestRtt === null || rtt <= this.bestRtt * 1.5) {
+                this.offset = data.ts - (data.t0 + t3) / 2;
+                this.bestRtt = this.bestRtt === null ? rtt : Math.min(this.bestRtt, rtt);
+            }
+            socket.emit('clock_report', {t0: data.t0, ts: data.ts, t3: t3});
+        });
+        const ping = () => socket.emit('clock_ping', {t0: Date.now()});
+        // A quick burst on (re)connect, then a slow refresh
+        socket.on('connect', () => {
+            this.bestRtt = null;
+            for (let i = 0; i < 5; i++) setTimeout(ping, i * 200);
+        });
+        setInterval(ping, 5000);
+    },
+
+    serverNow() {
+        return Date.now() + this.offset;
+    },
+
+    // Seconds left on a start_timer payload, falling back to its duration
+    remaining(timer) {
+        if (!timer.deadline) return timer.duration;
+        return Math.max(0, Math.round(timer.deadline - this.serverNow() / 1000));
+    }
+};
@@ -0,0 +1,58 @@
+// Applies the server's state-transition frames. Everything one action sends to
+// the room arrives as a single 'frame' ({v, phase, events: [[name, data], ...]});
+// the events' handlers (registered with socket.on as usual) run back to back in
+// one task, so the page never renders half a transition. 'v' goes up by one per
+// frame; after a gap we ask for a resync frame rebuilt from the game's state.
+// On every (re)connect we send the last version we applied: the server replays
+// the frames we missed (without their sounds), or sends a snapshot if it no
+// longer has them or this is a fresh page.
+//
+// Pages opened with ?wire=msgpack connect with wire=msgpack (see msgpack.js)
+// and frames arrive as binary. Clues in them are [round, cat_idx, clue_idx]
+// references into the 'clue_table' sent on connect, expanded here. Pages that
+// stay open across rounds (players) take the next table from round_2_started.
+const Frames = {
+    version: null,
+    phase: null,    // Latest phase summary: round, clue, buzzers, timer, scores
+    table: null,    // Clue table for the current round (msgpack only)
+    wire: new URLSearchParams(location.search).get('wire') === 'msgpack' ? 'msgpack' : 'json',
+
+    decode(raw) {
+        return (raw instanceof ArrayBuffer || ArrayBuffer.isView(raw)) ? MessagePack.decode(raw) : raw;
+    },
+
+    expand(data) {
+        if (!data || !data.ref) return data;
+        const [round, catIdx, clueIdx] = data.ref;
+        if (!this.table || this.table.round !== round) return null;
+        const cat = this.table.categories[catIdx];
+        const clue = Object.assign({cat_idx: catIdx, clue_idx: clueIdx, category: cat.category}, cat.clues[clueIdx], data);
+        delete clue.ref;
+        return clue;
+    },
+
+    start(socket) {
+        socket.on('connect', () => socket.emit('resume', {since: this.version}));
+        socket.on('clue_table', (raw) => { this.table = this.decode(raw); });
+        socket.on('frame', (raw) => {
+            const frame = this.decode(raw);
+            if (!frame.resync && this.version !== null && frame.v <= this.version) return;
+            frame.events.forEach(([name, data]) => {
+                if (name === 'round_2_started' && data && data.clue_table) this.table = data.clue_table;
+            });
+            const events = frame.events.map(([name, data]) => [name, this.expand(data)]);
+            if (events.some(([, data]) => data === null)) {
+                socket.emit('request_state');  // Reference to a table we don't have
+                return;
+            }
+            const missed = !frame.resync && this.version !== null && frame.v !== this.version + 1;
+            this.version = frame.v;
+            this.phase = frame.phase;
+            events.forEach(([name, data]) => {
+                if (frame.replay && name === 'play_sound') return;
+                socket.listeners(name).forEach(handler => handler(data));
+            });
+            if (missed) socket.emit('request_state');
+        });
+    }
+};
@@ -0,0 +1,67 @@
+// MessagePack decoder for frames and clue tables (see wire.py). Pages only
+// ever decode, and only what msgpack.packb produces for plain JSON-like data:
+// nil, booleans, ints, floats, strings, binary, arrays and maps.
+const MessagePack = {
+    decode(raw) {
+        const bytes = raw instanceof ArrayBuffer ? new Uint8Array(raw) : new Uint8Array(raw.buffer, raw.byteOffset, raw.byteLength);
+        const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        const utf8 = new TextDecoder();
+        let pos = 0;
+
+        function take(n) {
+            const start = pos;
+            pos += n;
+            return start;
+        }
+        function str(n) { return utf8.decode(bytes.subarray(take(n), pos)); }
+        function bin(n) { return bytes.slice(take(n), pos); }
+        function array(n) {
+            const out = new Array(n);
+            for (let i = 0; i < n; i++) out[i] = value();
+            return out;
+        }
+        function map(n) {
+            const out = {};
+            for (let i = 0; i < n; i++) {
+                const key = value();
+                out[key] = value();
+            }
+            return out;
+        }
+        function value() {
+            const b = bytes[take(1)];
+            if (b < 0x80) return b;
+            if (b < 0x90) return map(b & 0x0f);
+            if (b < 0xa0) return array(b & 0x0f);
+            if (b < 0xc0) return str(b & 0x1f);
+            if (b >= 0xe0) return b - 0x100;
+            switch (b) {
+                case 0xc0: return null;
+                case 0xc2: return false;
+                case 0xc3: return true;
+                case 0xc4: return bin(bytes[take(1)]);
+                case 0xc5: return bin(view.getUint16(take(2)));
+                case 0xc6: return bin(view.getUint32(take(4)));
+                case 0xca: return view.getFloat32(take(4));
+                case 0xcb: return view.getFloat64(take(8));
+                case 0xcc: return bytes[take(1)];
+                case 0xcd: return view.getUint16(take(2));
+                case 0xce: return view.getUint32(take(4));
+                case 0xcf: return Number(view.getBigUint64(take(8)));
+                case 0xd0: return view.getInt8(take(1));
+                case 0xd1: return view.getInt16(take(2));
+                case 0xd2: return view.getInt32(take(4));
+                case 0xd3: return Number(view.getBigInt64(take(8)));
+                case 0xd9: return str(bytes[take(1)]);
+                case 0xda: return str(view.getUint16(take(2)));
+                case 0xdb: return str(view.getUint32(take(4)));
+                case 0xdc: return array(view.getUint16(take(2)));
+                case 0xdd: return array(view.getUint32(take(4)));
+                case 0xde: return map(view.getUint16(take(2)));
+                case 0xdf: return map(view.getUint32(take(4)));
+            }
+            throw new Error(`Unsupported MessagePack type 0x${b.toString(16)}`);
+        }
+        return value();
+    }
+};
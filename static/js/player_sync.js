@@ -0,0 +1,37 @@
+// Local copy of the game's player list, kept current from versioned deltas.
+// The server sends 'players_delta' ({from_version, version, players}) with only
+// the players that changed; when a delta doesn't start at our version we missed
+// one, so we ask for a full 'player_list_update' instead of guessing. The full
+// list a page starts from comes with the snapshot frame sent on connect.
+const PlayerSync = {
+    version: null,
+    players: {},    // pid -> player
+
+    start(socket, onChange) {
+        const resync = () => socket.emit('request_player_sync');
+        socket.on('player_list_update', (data) => {
+            this.players = {};
+            data.players.forEach(p => { this.players[p.pid] = p; });
+            this.version = data.version;
+            onChange(this.list());
+        });
+        socket.on('players_delta', (delta) => {
+            if (this.version === null || delta.version <= this.version) return;
+            if (delta.from_version !== this.version) {
+                resync();
+                return;
+            }
+            delta.players.forEach(p => { this.players[p.pid] = p; });
+            this.version = delta.version;
+            onChange(this.list());
+        });
+    },
+
+    list() {
+        return Object.values(this.players);
+    },
+
+    get(pid) {
+        return this.players[pid];
+    }
+};
@@ -0,0 +1,269 @@
+import bisect
+import contextlib
+import cProfile
+import io
+import json
+import logging
+import logging.handlers
+import pstats
+import queue
+import random
+import sys
+import time
+
+# In-process metrics, structured logging and per-game profiling.
+#
+# Metrics are plain counters/gauges/histograms in this process, rendered in the
+# Prometheus text format by /metrics; updating one is a dict lookup and an add,
+# cheap enough for the buzz path. With several workers, scrape each one.
+#
+# Logging goes through the 'jeopardy' logger. log() takes an event name plus
+# fields; sampled=True events (one per buzz packet and the like) are kept at
+# the configured sample rate. configure_logging() hands records to a queue so
+# formatting and console I/O happen off the handler.
+
+logger = logging.getLogger('jeopardy')
+sample_rate = 1.0  # Share of sampled=True events that are logged
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _Buckets:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextlib.contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.children = {}  # label values -> _Value/_Buckets
+
+    def _new_child(self):
+        return _Value()
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self._new_child()
+        return child
+
+    def remove(self, *values):
+        self.children.pop(values, None)
+
+    def _label_text(self, values, extra=()):
+        pairs = list(zip(self.label_names, values)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for values, child in sorted(self.children.items()):
+            lines.append(f'{self.name}{self._label_text(values)} {_number(child.value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for values, child in sorted(self.children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                lines.append(f'{self.name}_bucket{self._label_text(values, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{self._label_text(values)} {_number(child.sum)}')
+            lines.append(f'{self.name}_count{self._label_text(values)} {child.count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _add(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'metric {metric.name} already registered')
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def log(event, level=logging.INFO, sampled=False, **fields):
+    if not logger.isEnabledFor(level):
+        return
+    if sampled and sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+    logger.log(level, event, extra={'fields': fields})
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {'ts': round(record.created, 3), 'level': record.levelname.lower(), 'event': record.getMessage()}
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = ' '.join(f'{k}={v}' for k, v in getattr(record, 'fields', {}).items())
+        line = f'{record.levelname.lower()} {record.getMessage()} {fields}'.rstrip()
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level='INFO', fmt='text', rate=1.0, stream=None):
+    # Records are queued by the caller and written by a listener thread
+    global sample_rate
+    sample_rate = rate
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, handler)
+    logger.handlers = [logging.handlers.QueueHandler(records)]
+    logger.setLevel(level)
+    logger.propagate = False
+    listener.start()
+    return listener
+
+
+class GameProfiler:
+    # cProfile for the socket event handlers of one chosen game, switched on
+    # and off at runtime. A profiler's hook is process-wide and a second one
+    # would replace it, so only one game is profiled at a time.
+    def __init__(self):
+        self.active = {}  # code -> cProfile.Profile, at most one
+        self.finished = {}  # code -> cProfile.Profile
+
+    def start(self, code):
+        # False if another game is being profiled
+        if self.active and code not in self.active:
+            return False
+        self.active[code] = cProfile.Profile()
+        self.finished.pop(code, None)
+        return True
+
+    def stop(self, code):
+        prof = self.active.pop(code, None)
+        if prof is not None:
+            self.finished[code] = prof
+        return prof is not None
+
+    def discard(self, code):
+        self.active.pop(code, None)
+        self.finished.pop(code, None)
+
+    @contextlib.contextmanager
+    def profile(self, code):
+        prof = self.active.get(code)
+        if prof is None:
+            yield
+            return
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+
+    def report(self, code, limit=40, sort='cumulative'):
+        prof = self.active.get(code) or self.finished.get(code)
+        if prof is None:
+            return None
+        out = io.StringIO()
+        try:
+            pstats.Stats(prof, stream=out).sort_stats(sort).print_stats(limit)
+        except TypeError:
+            return 'No samples yet.\n'  # Nothing ran while profiling
+        return out.getvalue()
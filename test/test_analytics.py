@@ -0,0 +1,69 @@
+import analytics
+import simulator
+from analytics import BEATEN, CLOSED, CORRECT, INCORRECT, OPEN, TIMEOUT, WON
+
+
+def test_ring_overwrites_the_oldest_rows_and_counts_them():
+    recorder = analytics.Recorder(capacity=4)
+    for t in range(6):
+        recorder.record('ABCD', 'g1', OPEN, float(t))
+    batch = recorder.take()
+    assert batch.rows['t'].tolist() == [2, 3, 4, 5] and batch.dropped == 2
+    assert recorder.take() is None
+    recorder.record('ABCD', 'g1', OPEN, 6.0)
+    assert recorder.take().rows['t'].tolist() == [6] and recorder.dropped == 0
+
+
+def test_store_appends_blocks_and_reports_per_player(tmp_path):
+    recorder = analytics.Recorder()
+    store = analytics.PlayStore(str(tmp_path))
+    record = recorder.record
+    record('ABCD', 'g1', OPEN, 1.0, category='Rivers', value=200, round_no=1)
+    record('ABCD', 'g1', WON, 1.1, 'p1', 'Ann', 'Rivers', 200, 1, ms=100)
+    record('ABCD', 'g1', BEATEN, 1.2, 'p2', 'Bob', 'Rivers', 200, 1, ms=300)
+    record('ABCD', 'g1', CORRECT, 3.0, 'p1', 'Ann', 'Rivers', 200, 1, ms=2000)
+    record('WXYZ', 'g2', CLOSED, 1.5, 'p3', 'Cy', 'Lakes', 400, 1)
+    store.write(recorder.take())
+    assert store.load().columns['t'].size == 5
+
+    # A later block adds a new string to a game already on disk
+    record('ABCD', 'g1', OPEN, 4.0, category='Lakes', value=400, round_no=1)
+    record('ABCD', 'g1', WON, 4.1, 'p2', 'Bob', 'Lakes', 400, 1, ms=200)
+    record('ABCD', 'g1', INCORRECT, 6.0, 'p2', 'Bob', 'Lakes', 400, 1, ms=5000)
+    record('ABCD', 'g1', TIMEOUT, 9.0, 'p1', 'Ann', 'Lakes', 400, 1, ms=10000)
+    store.write(recorder.take())
+    # ...and a fresh store reads both blocks back the same way
+    for plays in (store.load(code='ABCD'), analytics.PlayStore(str(tmp_path)).load(code='ABCD')):
+        assert plays.games == ['ABCD-g1'] and plays.columns['t'].tolist() == [1.0, 1.1, 1.2, 3.0, 4.0, 4.1, 6.0, 9.0]
+
+    report = analytics.report(store.load())
+    assert report['games'] == 2 and report['rows'] == 9
+    assert report['windows'] == {'opened': 2, 'won': 2, 'won_rate': 1.0}
+    assert report['reaction_ms'] == {'n': 3, 'p50': 200.0, 'p90': 300.0, 'p99': 300.0}
+    assert report['lockout_rate'] == 0.25 and report['accuracy'] == 0.3333
+    bob, ann, cy = report['players']
+    assert (bob['name'], bob['won'], bob['beaten'], bob['accuracy'], bob['p50_ms']) == ('Bob', 1, 1, 0.0, 200.0)
+    assert (ann['judged'], ann['correct'], ann['timeouts']) == (2, 1, 1)
+    assert (cy['buzzes'], cy['closed'], cy['lockout_rate'], cy['p50_ms']) == (1, 1, 1.0, None)
+    assert [(c['category'], c['judged']) for c in report['categories']] == [('Lakes', 2), ('Rivers', 1)]
+    assert report['values'] == [{'value': 200, 'judged': 1, 'correct': 1, 'accuracy': 1.0},
+                                {'value': 400, 'judged': 2, 'correct': 0, 'accuracy': 0.0}]
+    assert analytics.report(store.load(since=5.0))['rows'] == 2
+
+
+def test_a_partly_written_block_is_cut_off_before_appending(tmp_path):
+    recorder = analytics.Recorder()
+    recorder.record('ABCD', 'g1', WON, 1.0, 'p1', 'Ann', ms=100)
+    analytics.PlayStore(str(tmp_path)).write(recorder.take())
+    with open(tmp_path / 'ABCD-g1.plays', 'ab') as f:
+        f.write(b'\x05\x00\x00')  # Crashed mid-write
+    recorder.record('ABCD', 'g1', WON, 2.0, 'p1', 'Ann', ms=150)
+    analytics.PlayStore(str(tmp_path)).write(recorder.take())
+    assert analytics.PlayStore(str(tmp_path)).load().columns['ms'].tolist() == [100, 150]
+
+
+def test_simulated_games_record_their_plays(tmp_path):
+    assert simulator.play(3, players=3, analytics_dir=str(tmp_path))['errors'] == []
+    report = analytics.report(analytics.PlayStore(str(tmp_path)).load())
+    assert report['games'] == 1 and len(report['players']) == 3
+    assert report['windows']['won'] and report['reaction_ms']['n'] and report['answer_ms']['n']
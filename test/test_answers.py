@@ -0,0 +1,26 @@
+import answers
+import game_events
+import game_logic
+
+
+def test_normalize_strips_question_form_articles_and_accents():
+    assert answers.normalize("What is the Eiffel Tower?") == 'eiffel tower'
+    assert answers.normalize("Who's Beyoncé") == 'beyonce'
+    assert answers.normalize('Who are The Who?') == 'who'
+
+
+def test_matcher_accepts_typos_optional_parts_and_alternates():
+    m = answers.final_matcher({'answer': '(Saint) Matthew', 'alternates': ['Levi']})
+    assert m.matches('What is Matthew?')
+    assert m.matches('saint mathew')
+    assert m.matches('Who was Levi')
+    assert not m.matches('Mark')
+    assert not m.matches('')
+    assert not answers.Matcher('Cairo').matches('Cairn')  # No typos in short answers
+
+
+def test_bulk_fj_grading_ignores_malformed_payloads():
+    g = game_logic.Game()
+    for data in (None, 'grades', ['p1'], {'grades': ['p1']}):
+        game_events.handle_grade_fj_bulk(None, g, data)
+    assert g.fj_grades == {}
@@ -0,0 +1,58 @@
+import game_events
+import game_logic
+
+
+def make_game():
+    g = game_logic.Game()
+    g.arbitration_window = 0.25
+    g.add_player('wired', 'Wired', 'p1')
+    g.add_player('wifi', 'Wifi', 'p2')
+    # Wired player: 10ms RTT, clock 1000ms behind the server
+    g.players['p1'].record_clock_sample(0, 1005, 10)
+    # Wi-Fi player: 200ms RTT, clock in step with the server
+    g.players['p2'].record_clock_sample(0, 100, 200)
+    g.clear_buzzers()
+    g.buzz_opened_at = 10000
+    return g
+
+
+def test_clock_sample_estimates_offset_and_rtt():
+    p = game_logic.Player('p1', 'Ann')
+    p.record_clock_sample(1000, 5050, 1100)
+    assert p.rtt == 100
+    assert p.clock_offset == 4000
+    assert p.to_dict()['rtt_ms'] == 100
+
+
+def test_earliest_corrected_buzz_wins_over_first_arrival():
+    g = make_game()
+    # Wired buzz pressed at server time 10100, arrives at 10105
+    assert g.submit_buzz('wired', 9100, 10105) is True
+    # Wi-Fi buzz pressed at server time 10050 but arrives later, at 10150
+    assert g.submit_buzz('wifi', 10050, 10150) is False
+    assert g.resolve_buzz() == 'wifi'
+    assert g.current_buzzer == 'wifi'
+    assert g.buzzers_locked is True
+
+
+def test_arbitration_keeps_incorrect_lockout_and_clamps_claims():
+    g = make_game()
+    g.incorrect_buzzers.add('wifi')
+    assert g.submit_buzz('wifi', 10000, 10150) is False
+    # A claim from before buzzers opened is clamped to the opening time
+    g.submit_buzz('wired', 0, 10105)
+    assert g.pending_buzzes['wired'] >= g.buzz_opened_at
+    assert g.resolve_buzz() == 'wired'
+
+
+def test_malformed_clock_pings_are_ignored(monkeypatch):
+    sent = []
+    monkeypatch.setattr(game_events, 'transport', type('Transport', (), {
+        'emit': lambda self, event, data=None, to=None: sent.append((event, data, to))})())
+    monkeypatch.setitem(game_events.clients, 's1', game_events.Client('s1', 'MAIN', 'json'))
+    game_events.handle_clock_ping('s1')
+    game_events.handle_clock_ping('s1', 'not a dict')
+    game_events.handle_clock_ping('s1', [1, 2])
+    assert sent == []
+    game_events.handle_clock_ping('s1', {'t0': 5})
+    assert [(event, data['t0'], to) for event, data, to in sent] == [('clock_pong', 5, 's1')]
@@ -0,0 +1,63 @@
+import pytest
+
+import board_generator
+from test_question_bank import make_bank
+
+
+def test_same_seed_builds_the_same_board(tmp_path):
+    bank = make_bank(tmp_path / 'bank.db', categories=20)
+    gen = board_generator.BoardGenerator(bank)
+    first = gen.generate(1, seed=42)
+    assert gen.generate(1, seed=42) == first
+    assert gen.generate(1, seed=43) != first
+
+
+def test_venue_never_repeats_clues_within_history(tmp_path):
+    bank = make_bank(tmp_path / 'bank.db', categories=20)
+    gen = board_generator.BoardGenerator(bank, history_games=2, seed=1)
+    seen = []
+    for game in range(3):
+        round_data, _ = gen.generate(1, venue='PUB', game_key=f'g{game}')
+        assert len(round_data) == 6
+        seen.append({clue['id'] for cat in round_data for clue in cat['clues']})
+    assert not seen[0] & seen[1] and not seen[1] & seen[2] and not seen[0] & seen[2]
+    # Other venues are unaffected by PUB's history
+    assert gen.recent_clues('OTHER') == {}
+
+
+def test_small_bank_repeats_the_least_recently_played_categories(tmp_path):
+    bank = make_bank(tmp_path / 'bank.db', categories=7)
+    gen = board_generator.BoardGenerator(bank, history_games=10, tier_mix={1: {1: 6}}, seed=3)
+    boards = []
+    for game in range(4):
+        round_data, _ = gen.generate(1, venue='PUB', game_key=f'g{game}')
+        assert len(round_data) == 6 and all(len(cat['clues']) == 5 for cat in round_data)
+        boards.append({cat['category'] for cat in round_data})
+    # The one category game 0 left out comes first in game 1, then the oldest
+    assert {f'Cat 1-{c}' for c in range(7)} - boards[0] <= boards[1]
+    assert len(boards[1] - boards[0]) == 1
+
+
+def test_a_bank_too_small_for_a_board_is_an_error(tmp_path):
+    bank = make_bank(tmp_path / 'bank.db', categories=4)
+    with pytest.raises(board_generator.BoardError):
+        board_generator.BoardGenerator(bank).generate(1)
+
+
+def test_daily_doubles_avoid_the_top_row_and_share_no_category(tmp_path):
+    bank = make_bank(tmp_path / 'bank.db', categories=20)
+    gen = board_generator.BoardGenerator(bank)
+    for seed in range(50):
+        round_data, dds = gen.generate(2, seed=seed)
+        assert len(dds) == 2
+        assert dds[0][0] != dds[1][0]
+        assert all(row > 0 for _, row in dds)
+
+
+def test_tier_mix_draws_harder_categories(tmp_path):
+    bank = make_bank(tmp_path / 'bank.db', categories=20)
+    gen = board_generator.BoardGenerator(bank, tier_mix={1: {1: 4, 2: 2}}, seed=7)
+    round_data, _ = gen.generate(1)
+    tiers = sorted(cat['category'].split(' ')[1][0] for cat in round_data)
+    assert tiers == ['1', '1', '1', '1', '2', '2']
+    assert all(c['value'] == v for cat in round_data for c, v in zip(cat['clues'], [200, 400, 600, 800, 1000]))
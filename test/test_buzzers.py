@@ -12,3 +12,20 @@ def test_clear_buzzers_opens_and_increments_session():
     g.clear_buzzers()
     assert g.buzzers_locked is False
     assert g.buzz_session == prev + 1
+
+
+def test_phase_summarises_clue_buzzers_and_scores():
+    g = game_logic.Game()
+    g.add_player('s1', 'Ann', 'p1')
+    g.update_score('s1', 400)
+    g.current_clue = g.get_clue(0, 0)
+    g.clear_buzzers()
+    assert g.handle_buzz('s1')
+    phase = g.phase()
+    assert phase['clue']['cat_idx'] == 0 and phase['clue']['clue_idx'] == 0
+    assert phase['buzzers'] == 'locked' and phase['buzzer'] == 's1'
+    assert phase['scores'] == {'p1': 400}
+    g.frame_version = 7
+    back = game_logic.Game()
+    back.load_state(g.to_state())
+    assert back.frame_version == 7
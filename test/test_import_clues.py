@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+import import_clues
+import question_bank
+
+HEADER = 'round\tclue_value\tcategory\tclue\tresponse\tair_date\n'
+ROWS = [
+    'Jeopardy!\t$200\tRIVERS\tLongest river in Africa\tthe Nile\t2004-01-01\n',
+    'Jeopardy!\t$400\tRIVERS\tIt flows through Baghdad\tthe Tigris\t2004-01-01\n',
+    'Jeopardy!\t$400\tRIVERS\tIt flows through Baghdad\tthe Tigris\t2004-01-01\n',  # duplicate
+    'Jeopardy!\t\tRIVERS\tNo value here\tnothing\t2004-01-01\n',  # rejected
+    'Tiebreaker\t$200\tRIVERS\tTiebreak clue\tsomething\t2004-01-01\n',  # rejected
+    'Final Jeopardy!\tNone\tWORLD CAPITALS\tOldest capital\tDamascus\t2004-01-01\n',
+]
+
+
+def write_dump(tmp_path):
+    path = tmp_path / 'dump.tsv'
+    path.write_text(HEADER + ''.join(ROWS))
+    return str(path)
+
+
+def test_tsv_import_validates_and_deduplicates(tmp_path):
+    bank = question_bank.QuestionBank(str(tmp_path / 'bank.db'))
+    importer = import_clues.Importer(bank, write_dump(tmp_path), 'tsv', out=io.StringIO())
+    progress = importer.run()
+    assert (progress['inserted'], progress['duplicates'], progress['rejected']) == (3, 1, 2)
+    cat_id = bank.category_id('RIVERS', 1, '2004-01-01')
+    assert [c['value'] for c in bank.category_clues(cat_id)] == [200, 400]
+    # Re-running a finished file is a no-op
+    assert importer.run()['inserted'] == 3
+
+
+def test_interrupted_import_resumes_after_last_batch(tmp_path, monkeypatch):
+    bank = question_bank.QuestionBank(str(tmp_path / 'bank.db'))
+    source = write_dump(tmp_path)
+    real_to_clue = import_clues.to_clue
+    seen = []
+
+    def flaky_to_clue(record):
+        seen.append(record['text'])
+        if len(seen) == 4:
+            raise KeyboardInterrupt
+        return real_to_clue(record)
+
+    monkeypatch.setattr(import_clues, 'to_clue', flaky_to_clue)
+    with pytest.raises(KeyboardInterrupt):
+        import_clues.Importer(bank, source, 'tsv', batch_size=2, out=io.StringIO()).run()
+    bank.conn.rollback()
+    monkeypatch.setattr(import_clues, 'to_clue', real_to_clue)
+
+    progress = import_clues.Importer(bank, source, 'tsv', batch_size=2, out=io.StringIO()).run()
+    assert progress['rows'] == len(ROWS)
+    assert bank.count_clues() == 3
+
+
+def test_values_and_rounds_are_normalized():
+    clue = import_clues.to_clue({'round': 'Double Jeopardy!', 'value': '$1,600', 'category': 'X',
+                                 'text': '<i>Some</i>  clue', 'answer': 'It', 'media_url': 'static/a.png'})
+    assert clue['round'] == 2 and clue['value'] == 1600
+    assert clue['text'] == 'Some clue'
+    assert clue['type'] == 'image'
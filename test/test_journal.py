@@ -0,0 +1,90 @@
+import os
+
+import game_logic
+import journal
+
+
+def play_some(game):
+    game.add_player('s1', 'Alice', 'p1')
+    game.add_player('s2', 'Bob', 'p2')
+    game.update_score('s1', 400)
+    game.update_score('s2', -200)
+    game.mark_answered(0, 1)
+    game.set_score('s2', 1000)
+
+
+def test_restart_recovers_scores_board_and_wagers(tmp_path):
+    j = journal.GameJournal(str(tmp_path), fsync=False)
+    r = game_logic.GameRegistry(journal=j)
+    g = r.get_or_create('abc')
+    play_some(g)
+    g.start_round_2()
+    g.mark_answered(2, 3)
+    g.start_final_jeopardy()
+    g.set_fj_wager('p1', 300)
+    g.set_fj_answer('p1', 'What is Paris?')
+    assert g.grade_fj('p1', True)
+    assert not g.grade_fj('p1', False)  # Graded once
+    j.flush()
+
+    r2 = game_logic.GameRegistry(journal=journal.GameJournal(str(tmp_path), fsync=False))
+    back = r2.get('abc')
+    assert back.game_id == g.game_id
+    assert {p.pid: p.score for p in back.players.values()} == {'p1': 700, 'p2': 1000}
+    assert back.control_player == 'p1'
+    assert back.current_round == 2
+    assert back.round_data == g.round_data
+    assert back.daily_double_coords == g.daily_double_coords
+    assert back.board_state == g.board_state
+    assert back.in_final_jeopardy
+    assert back.fj_wagers == {'p1': 300}
+    assert back.fj_answers == {'p1': 'What is Paris?'}
+    assert back.fj_grades == {'p1': True}
+    # Old sockets are gone; the returning player reclaims their score by player_id
+    assert not any(p.connected for p in back.players.values())
+    back.add_player('new-sid', 'Alice', 'p1')
+    assert back.get_player_by_sid('new-sid').score == 700
+
+
+def test_snapshots_compact_the_log(tmp_path):
+    j = journal.GameJournal(str(tmp_path), snapshot_every=3, fsync=False)
+    g = game_logic.GameRegistry(journal=j).get_or_create('abc')
+    play_some(g)
+    j.flush()
+    state, events = j.load('ABC')
+    assert state['journal_seq'] == 6
+    assert events == []
+
+    g.update_score('s1', 200)
+    j.flush()
+    state, events = j.load('ABC')
+    assert [e['event'] for e in events] == ['score']
+    back = game_logic.Game.recover('ABC', state, events)
+    assert back.players['p1'].score == 600
+
+
+def test_torn_tail_and_unflushed_events(tmp_path):
+    j = journal.GameJournal(str(tmp_path), fsync=False)
+    g = game_logic.GameRegistry(journal=j).get_or_create('abc')
+    play_some(g)
+    j.flush()
+    with open(os.path.join(str(tmp_path), 'ABC.log'), 'ab') as f:
+        f.write(b'{"seq": 7, "event": "sco')  # Crash mid-write
+    g.update_score('s1', 200)  # Never flushed
+
+    j2 = journal.GameJournal(str(tmp_path), fsync=False)
+    back = game_logic.GameRegistry(journal=j2).get('abc')
+    assert back.players['p1'].score == 400
+    back.update_score_by_pid('p1', 100)
+    j2.flush()
+    again = game_logic.GameRegistry(journal=journal.GameJournal(str(tmp_path), fsync=False)).get('abc')
+    assert again.players['p1'].score == 500
+
+
+def test_evicted_games_are_not_recovered(tmp_path):
+    j = journal.GameJournal(str(tmp_path), fsync=False)
+    r = game_logic.GameRegistry(ttl=60, journal=j)
+    r.get_or_create('old').last_active -= 120
+    assert r.evict_idle() == ['OLD']
+    j.flush()
+    assert game_logic.GameRegistry(journal=journal.GameJournal(str(tmp_path))).get('old') is None
@@ -0,0 +1,37 @@
+from flask import Flask
+
+import media
+
+
+def make_assets(tmp_path):
+    (tmp_path / 'clip.mp3').write_bytes(b'x' * 1000)
+    return media.AssetIndex(str(tmp_path))
+
+
+def test_manifest_versions_local_media_once_per_url(tmp_path):
+    assets = make_assets(tmp_path)
+    digest = assets.digest('clip.mp3')
+    assert assets.digest('../clip.mp3') is None and assets.digest('missing.png') is None
+    round_data = [{'category': 'A', 'clues': [{'media_url': '/static/clip.mp3'}, {'media_url': '/static/clip.mp3'},
+                                              {'media_url': 'https://example.com/a.png', 'type': 'image'}, {}]}]
+    manifest = media.round_manifest(1, round_data, assets)
+    assert manifest == {'round': 1, 'media': [
+        {'url': '/static/clip.mp3', 'src': f'/static/clip.mp3?v={digest}', 'type': 'audio'},
+        {'url': 'https://example.com/a.png', 'src': 'https://example.com/a.png', 'type': 'image'}]}
+    # Written without the leading slash, as in the README
+    assert assets.url('static/clip.mp3') == f'/static/clip.mp3?v={digest}'
+
+
+def test_static_files_get_etags_ranges_and_immutable_versions(tmp_path):
+    assets = make_assets(tmp_path)
+    app = Flask(__name__, static_folder=None)
+    media.install(app, assets)
+    client = app.test_client()
+    digest = assets.digest('clip.mp3')
+
+    plain = client.get('/static/clip.mp3')
+    assert plain.headers['ETag'] == f'"{digest}"' and 'no-cache' in plain.headers['Cache-Control']
+    assert client.get('/static/clip.mp3', headers={'If-None-Match': f'"{digest}"'}).status_code == 304
+    part = client.get(f'/static/clip.mp3?v={digest}', headers={'Range': 'bytes=100-199'})
+    assert part.status_code == 206 and len(part.data) == 100
+    assert part.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
@@ -0,0 +1,64 @@
+import gzip
+
+from flask import Flask
+
+import game_logic
+import pagecache
+
+
+def test_renders_once_per_version_and_answers_304s():
+    cache = pagecache.RenderCache()
+    app = Flask(__name__)
+    calls = []
+
+    def render():
+        calls.append(1)
+        return '<p>board</p>' * 100
+
+    @app.route('/page/<int:version>')
+    def page(version):
+        return pagecache.send(cache.get('board', 'ABCD', version, render))
+
+    client = app.test_client()
+    first = client.get('/page/1', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip' and first.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(first.data) == b'<p>board</p>' * 100
+    assert client.get('/page/1').data == b'<p>board</p>' * 100
+    plain = client.get('/page/1', headers={'Accept-Encoding': 'identity'})
+    assert plain.data == b'<p>board</p>' * 100 and plain.headers['ETag'] != first.headers['ETag']
+    assert client.get('/page/1', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']}).status_code == 304
+    # Each encoding has its own ETag, so a gzip ETag doesn't validate the plain body
+    assert client.get('/page/1', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+    assert len(calls) == 1
+
+    client.get('/page/2')
+    assert len(calls) == 2 and len(cache) == 1
+    cache.discard('ABCD')
+    assert len(cache) == 0
+
+
+def test_board_version_changes_with_the_board():
+    game = game_logic.Game()
+    game.round_data = [{'category': 'A', 'clues': [{'value': 200}, {'value': 400}]}]
+    game.reset_board(daily_doubles=[])
+    version = game.board_version
+    game.mark_answered(0, 1)
+    assert game.board_version == version + 1
+    assert game.board_view() == {'round': 1, 'categories': [{'category': 'A', 'values': [200, 400]}],
+                                 'board': [[False, True]]}
+    restored = game_logic.Game()
+    restored.load_state(game.to_state())
+    assert restored.board_version == game.board_version
+
+
+def test_least_recently_used_entries_are_dropped_past_capacity():
+    cache = pagecache.RenderCache(capacity=2)
+    cache.get('board', 'A', 1, lambda: 'a')
+    cache.get('board', 'B', 1, lambda: 'b')
+    cache.get('board', 'A', 1, lambda: 'a')  # A is now the most recently used
+    cache.get('board', 'C', 1, lambda: 'c')
+    assert len(cache) == 2 and cache.renders == 3
+    cache.get('board', 'A', 1, lambda: 'a')
+    assert cache.renders == 3
+    cache.get('board', 'B', 1, lambda: 'b')
+    assert cache.renders == 4
@@ -0,0 +1,59 @@
+import game_events
+import game_logic
+
+
+def test_changes_coalesce_into_one_versioned_delta():
+    g = game_logic.Game()
+    g.add_player('s1', 'Ann', 'p1')
+    g.add_player('s2', 'Bob', 'p2')
+    g.update_score('s1', 200)
+    g.update_score('s1', 400)
+    delta = g.take_player_delta()
+    assert delta['from_version'] == 0 and delta['version'] == 1
+    assert sorted(p['pid'] for p in delta['players']) == ['p1', 'p2']
+    assert g.take_player_delta() is None
+
+
+def test_delta_only_carries_changed_players():
+    g = game_logic.Game()
+    g.add_player('s1', 'Ann', 'p1')
+    g.add_player('s2', 'Bob', 'p2')
+    g.take_player_delta()
+    g.set_score('s2', 1000)
+    g.remove_player('s1')
+    delta = g.take_player_delta()
+    assert delta['from_version'] == 1
+    by_pid = {p['pid']: p for p in delta['players']}
+    assert by_pid['p2']['score'] == 1000
+    assert by_pid['p1']['connected'] is False
+    assert g.player_snapshot()['version'] == 2
+
+
+def test_reconnect_takes_over_the_old_socket():
+    g = game_logic.Game()
+    g.add_player('s1', 'Ann', 'p1')
+    g.clear_buzzers()
+    assert g.handle_buzz('s1')
+    g.incorrect_buzzers.add('s1')
+    g.add_player('s2', 'Ann', 'p1')  # New socket before the old one's disconnect arrived
+    assert g.sid_to_pid == {'s2': 'p1'}
+    assert g.current_buzzer == 's2' and g.incorrect_buzzers == {'s2'}
+    g.remove_player('s1')  # Late disconnect of the replaced socket
+    assert g.players['p1'].connected
+    g.remove_player('s2')
+    assert not g.players['p1'].connected and g.sid_to_pid == {}
+
+
+def test_resync_during_a_daily_double_wager_keeps_the_clue_hidden():
+    g = game_logic.Game()
+    g.add_player('s1', 'Ann', 'p1')
+    g.update_score('s1', 600)
+    g.control_player = 'p1'
+    g.current_clue = dict(g.get_clue(0, 3), is_daily_double=True)
+    g.wager_pending = True
+    events = dict((e[0], e[1] if len(e) > 1 else None) for e in game_events.state_events(g))
+    assert 'show_clue' not in events
+    assert events['show_daily_double']['dd_player_name'] == 'Ann' and events['show_daily_double']['dd_player_score'] == 600
+    g.set_wager(300)
+    events = dict((e[0], e[1] if len(e) > 1 else None) for e in game_events.state_events(g))
+    assert 'show_daily_double' not in events and events['show_clue'] == game_events.public_clue(g.current_clue)
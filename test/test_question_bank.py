@@ -0,0 +1,44 @@
+import pytest
+
+import board_generator
+import game_logic
+import question_bank
+
+
+def make_bank(path, categories=8):
+    bank = question_bank.QuestionBank(str(path))
+    for c in range(categories):
+        for round_no in (1, 2):
+            cat_id = bank.category_id(f'Cat {round_no}-{c}', round_no, '2001-09-1%d' % (c % 10))
+            for i, value in enumerate([100, 200, 300, 400, 500]):
+                clue = {'value': value * round_no, 'text': f'Clue {round_no}-{c}-{i}', 'answer': 'What is it?'}
+                bank.add_clue(cat_id, clue, f'h{round_no}-{c}-{i}')
+    final_id = bank.category_id('Final', question_bank.FINAL_ROUND)
+    bank.add_clue(final_id, {'value': 0, 'text': 'Final clue', 'answer': 'Final answer'}, 'final')
+    bank.commit()
+    return bank
+
+
+def test_duplicate_clues_are_ignored(tmp_path):
+    bank = make_bank(tmp_path / 'bank.db')
+    cat_id = bank.category_id('Cat 1-0', 1, '2001-09-10')
+    assert bank.add_clue(cat_id, {'value': 100, 'text': 'x', 'answer': 'y'}, 'h1-0-0') is False
+    assert bank.count_clues() == 8 * 2 * 5 + 1
+
+
+def test_game_boards_come_from_the_bank(tmp_path):
+    bank = make_bank(tmp_path / 'bank.db')
+    g = game_logic.Game('BANK', boards=board_generator.BoardGenerator(bank))
+    assert g.final_jeopardy == {'category': 'Final', 'text': 'Final clue', 'answer': 'Final answer'}
+    g.start_round_2()
+    assert g.get_clue(0, 4)['value'] == 2000
+    assert len(g.board_state) == 6
+
+
+def test_a_round_the_bank_cannot_fill_leaves_the_game_in_round_1(tmp_path):
+    bank = make_bank(tmp_path / 'bank.db', categories=5)  # Round 2 wants 6 tier-2 categories
+    g = game_logic.Game('BANK', boards=board_generator.BoardGenerator(bank, tier_mix={1: {1: 3, 2: 3}, 2: {2: 6}}))
+    round_data, board_state = g.round_data, g.board_state
+    with pytest.raises(board_generator.BoardError):
+        g.start_round_2()
+    assert g.current_round == 1 and g.round_data is round_data and g.board_state is board_state
@@ -0,0 +1,19 @@
+import ratelimit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_a_burst_then_refills_at_its_rate():
+    clock = FakeClock()
+    bucket = ratelimit.TokenBucket(2, 3, clock=clock)
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+    clock.now = 0.5  # One token back
+    assert bucket.take() and not bucket.take()
+    clock.now = 100
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]  # Never more than the burst
@@ -0,0 +1,19 @@
+import game_logic
+
+
+def test_registry_creates_one_game_per_code():
+    r = game_logic.GameRegistry()
+    g = r.get_or_create('abc')
+    assert g.code == 'ABC'
+    assert r.get_or_create('ABC') is g
+    assert r.get_or_create(None).code == game_logic.DEFAULT_GAME_CODE
+
+
+def test_registry_evicts_idle_games():
+    r = game_logic.GameRegistry(ttl=60)
+    old = r.get_or_create('old')
+    fresh = r.get_or_create('fresh')
+    old.last_active -= 120
+    assert r.evict_idle() == ['OLD']
+    assert r.get('old') is None
+    assert r.get('fresh') is fresh
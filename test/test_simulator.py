@@ -0,0 +1,22 @@
+import game_events
+import game_logic
+import simulator
+
+
+def test_a_seed_plays_a_whole_game_the_same_way_twice():
+    transport, timer_service = game_events.transport, game_events.timer_service
+    first = simulator.play(11, players=3)
+    assert first['errors'] == []
+    assert first['clues'] == 60 and first['virtual_seconds'] > 600
+    assert simulator.play(11, players=3) == first
+    assert simulator.play(12, players=3)['digest'] != first['digest']
+    # The process's own transport, timers and games are left as they were
+    assert (game_events.transport, game_events.timer_service) == (transport, timer_service)
+    assert game_events.registry.peek('SIM11') is None
+
+
+def test_a_rule_change_that_drifts_scores_is_caught(monkeypatch):
+    set_wager = game_logic.Game.set_wager
+    monkeypatch.setattr(game_logic.Game, 'set_wager', lambda game, wager: set_wager(game, wager + 1))
+    failed = [r for r in (simulator.play(seed, players=3) for seed in range(5)) if r['errors']]
+    assert failed and 'grading adds up to' in failed[0]['errors'][0]
@@ -0,0 +1,26 @@
+import wave
+
+import numpy as np
+
+import sounds
+
+
+def test_default_sounds_render_in_one_pass(tmp_path):
+    result = sounds.build_pack(sounds.DEFAULT_PACK, str(tmp_path))
+    assert result['written'] == sorted(sounds.DEFAULT_PACK)
+    with wave.open(str(tmp_path / 'daily_double.wav')) as f:
+        assert f.getnframes() == 88200 and f.getsampwidth() == 2
+        samples = np.frombuffer(f.readframes(f.getnframes()), '<i2')
+    assert samples[0] == 0 and samples.max() == 16383  # Half volume
+
+
+def test_unchanged_specs_are_not_rendered_again(tmp_path):
+    pack = dict(sounds.DEFAULT_PACK)
+    sounds.build_pack(pack, str(tmp_path))
+    assert sounds.build_pack(pack, str(tmp_path))['written'] == []
+    pack['buzz'] = {'kind': 'sequence', 'parts': [{'kind': 'tone', 'freq': 600, 'duration': 0.1},
+                                                  {'kind': 'silence', 'duration': 0.05}]}
+    result = sounds.build_pack(pack, str(tmp_path))
+    assert result['written'] == ['buzz'] and len(result['cached']) == 4
+    with wave.open(str(tmp_path / 'buzz.wav')) as f:
+        assert f.getnframes() == 4410 + 2205
@@ -0,0 +1,43 @@
+import json
+
+import game_logic
+import spectators
+
+
+def test_watchers_share_the_latest_projection():
+    hub = spectators.SpectatorHub(keepalive=0.01)
+    assert not hub.publish('ABC', '{"a":1}')  # Nobody watching
+    first, second = hub.stream('ABC'), hub.stream('ABC')
+    next(first), next(second)
+    assert hub.watched() == ['ABC'] and hub.watchers() == 2
+    assert hub.publish('ABC', '{"a":1}')
+    assert not hub.publish('ABC', '{"a":1}')  # Unchanged
+    hub.publish('ABC', '{"a":2}')
+    chunk = next(first)
+    assert chunk == b'id: 2\ndata: {"a":2}\n\n' and next(second) is chunk  # Skipped straight to the latest
+    assert next(first) == b': keepalive\n\n'
+    first.close()
+    second.close()
+    assert hub.watched() == []
+
+
+def test_spectator_view_hides_answers():
+    g = game_logic.Game()
+    g.add_player('s1', 'Ann', 'p1')
+    g.update_score('s1', 200)
+    g.current_clue = g.get_clue(1, 2)
+    view = json.loads(spectators.encode(g.spectator_view()))
+    assert 'answer' not in view['clue'] and view['clue']['text'] == g.current_clue['text']
+    assert view['scores'] == [{'name': 'Ann', 'score': 200}]
+    assert len(view['categories']) == len(view['board']) == len(g.round_data)
+
+
+def test_daily_double_text_waits_for_the_wager():
+    g = game_logic.Game()
+    g.current_clue = dict(g.get_clue(0, 3), is_daily_double=True, media_url='static/x.png')
+    g.wager_pending = True
+    clue = g.spectator_view()['clue']
+    assert clue['wager_pending'] and clue['text'] is None and clue['media_url'] is None
+    g.set_wager(500)
+    clue = g.spectator_view()['clue']
+    assert not clue['wager_pending'] and clue['text'] == g.current_clue['text'] and clue['media_url'] == 'static/x.png'
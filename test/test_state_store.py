@@ -0,0 +1,63 @@
+import game_logic
+import state_store
+
+
+def test_game_state_round_trip():
+    g = game_logic.Game('RT')
+    g.add_player('sid1', 'Ann', 'p1')
+    g.update_score('sid1', 400)
+    g.mark_answered(0, 0)
+    g.incorrect_buzzers.add('sid2')
+    restored = game_logic.Game('RT', state=g.to_state())
+    assert restored.to_state() == g.to_state()
+    assert restored.get_player_by_sid('sid1').score == 400
+    assert restored.daily_double_coords == g.daily_double_coords
+
+
+def test_sqlite_store_first_buzz_wins_across_workers(tmp_path):
+    path = str(tmp_path / 'state.db')
+    # Two registries on the same file stand in for two worker processes
+    worker_a = game_logic.GameRegistry(store=state_store.SQLiteStateStore(path))
+    worker_b = game_logic.GameRegistry(store=state_store.SQLiteStateStore(path))
+    with worker_a.session('g1') as game:
+        game.clear_buzzers()
+    with worker_a.session('g1') as game:
+        assert game.handle_buzz('sid-a') is True
+    with worker_b.session('g1') as game:
+        assert game.handle_buzz('sid-b') is False
+        assert game.current_buzzer == 'sid-a'
+
+
+def test_a_removed_game_is_gone_for_every_worker(tmp_path):
+    path = str(tmp_path / 'state.db')
+    worker_a = game_logic.GameRegistry(store=state_store.SQLiteStateStore(path))
+    worker_b = game_logic.GameRegistry(store=state_store.SQLiteStateStore(path))
+    with worker_a.session('g1') as game:
+        game.add_player('sid1', 'Ann', 'p1')
+    worker_a.remove('g1')
+    assert worker_b.peek('g1') is None
+    with worker_b.session('g1', create=False) as game:
+        assert game is None
+
+
+def test_store_session_rolls_back_on_error():
+    registry = game_logic.GameRegistry(store=state_store.MemoryStateStore())
+    with registry.session('g1') as game:
+        game.clear_buzzers()
+    try:
+        with registry.session('g1') as game:
+            game.handle_buzz('sid-a')
+            raise RuntimeError('handler failed')
+    except RuntimeError:
+        pass
+    with registry.session('g1') as game:
+        assert game.current_buzzer is None
+
+
+def test_store_evicts_idle_games():
+    registry = game_logic.GameRegistry(ttl=60, store=state_store.MemoryStateStore())
+    with registry.session('old'):
+        pass
+    assert registry.evict_idle(now=game_logic.time.time() + 120) == ['OLD']
+    with registry.session('old', create=False) as game:
+        assert game is None
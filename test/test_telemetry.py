@@ -0,0 +1,58 @@
+import io
+import logging
+
+import telemetry
+
+
+def test_metrics_render_in_prometheus_text_format():
+    reg = telemetry.Registry()
+    buzzes = reg.counter('buzz_total', 'Buzzes', ['result'])
+    latency = reg.histogram('handler_seconds', 'Handler time', ['handler'], buckets=(0.01, 0.1))
+    clients = reg.gauge('clients', 'Clients', ['game'])
+    buzzes.labels('accepted').inc()
+    buzzes.labels('rejected').inc(2)
+    latency.labels('buzz').observe(0.005)
+    latency.labels('buzz').observe(0.05)
+    latency.labels('buzz').observe(3)
+    clients.labels('ABC').inc()
+    clients.labels('OLD').inc()
+    clients.remove('OLD')
+
+    text = reg.render()
+    assert 'buzz_total{result="accepted"} 1\n' in text
+    assert 'buzz_total{result="rejected"} 2\n' in text
+    assert 'handler_seconds_bucket{handler="buzz",le="0.01"} 1\n' in text
+    assert 'handler_seconds_bucket{handler="buzz",le="0.1"} 2\n' in text
+    assert 'handler_seconds_bucket{handler="buzz",le="+Inf"} 3\n' in text
+    assert 'handler_seconds_count{handler="buzz"} 3\n' in text
+    assert 'clients{game="ABC"} 1\n' in text
+    assert 'OLD' not in text
+
+
+def test_sampled_events_are_dropped_at_the_sample_rate():
+    out = io.StringIO()
+    listener = telemetry.configure_logging(level=logging.DEBUG, fmt='json', rate=0.0, stream=out)
+    try:
+        telemetry.log('buzz_received', level=logging.DEBUG, sampled=True, sid='s1')
+        telemetry.log('buzz_accepted', sid='s1')
+    finally:
+        listener.stop()
+        telemetry.logger.handlers = []
+        telemetry.sample_rate = 1.0
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 1
+    assert '"event": "buzz_accepted"' in lines[0] and '"sid": "s1"' in lines[0]
+
+
+def test_profiler_only_records_the_chosen_game():
+    prof = telemetry.GameProfiler()
+    prof.start('ABC')
+    with prof.profile('ABC'):
+        sorted(range(1000))
+    with prof.profile('XYZ'):
+        pass
+    assert not prof.start('XYZ')  # One game at a time
+    assert prof.stop('ABC')
+    assert 'sorted' in prof.report('ABC')
+    assert prof.report('XYZ') is None
+    assert prof.start('XYZ')
@@ -0,0 +1,83 @@
+import timers
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_service():
+    clock = FakeClock()
+    return clock, timers.TimerService(clock=clock, wall_clock=clock)
+
+
+def test_timers_fire_in_deadline_order():
+    clock, svc = make_service()
+    fired = []
+    svc.schedule('G', 'answer', 10, fired.append, 'answer')
+    svc.schedule('G', 'buzz', 5, fired.append, 'buzz')
+    clock.now = 7
+    assert svc.run_due() == 1
+    clock.now = 10
+    svc.run_due()
+    assert fired == ['buzz', 'answer']
+    assert svc.pending() == 0
+
+
+def test_rescheduling_a_name_replaces_the_pending_timer():
+    clock, svc = make_service()
+    fired = []
+    svc.schedule('G', 'buzz', 10, fired.append, 'first')
+    clock.now = 5
+    svc.schedule('G', 'buzz', 10, fired.append, 'second')
+    clock.now = 12
+    svc.run_due()
+    assert fired == []
+    clock.now = 15
+    svc.run_due()
+    assert fired == ['second']
+
+
+def test_cancel_owner_only_drops_that_games_timers():
+    clock, svc = make_service()
+    fired = []
+    svc.schedule('A', 'buzz', 1, fired.append, 'A')
+    svc.schedule('B', 'buzz', 1, fired.append, 'B')
+    svc.cancel_owner('A')
+    clock.now = 2
+    svc.run_due()
+    assert fired == ['B']
+
+
+def test_countdown_payload_uses_the_enforced_deadline():
+    clock, svc = make_service()
+    clock.now = 100
+    timer = svc.schedule('G', 'answer', 10, lambda: None)
+    assert timer.countdown() == {'duration': 10, 'deadline': 110, 'show_countdown': True}
+
+
+def test_on_fire_reports_lateness():
+    clock = FakeClock()
+    late = []
+    svc = timers.TimerService(clock=clock, wall_clock=clock, on_fire=lambda t, s: late.append((t.name, s)))
+    svc.schedule('G', 'buzz', 5, lambda: None)
+    clock.now = 5.25
+    svc.run_due()
+    assert late == [('buzz', 0.25)]
+
+
+def test_runner_takes_over_running_due_callbacks():
+    clock = FakeClock()
+    handed = []
+    svc = timers.TimerService(clock=clock, wall_clock=clock, runner=handed.append)
+    fired = []
+    svc.schedule('G', 'buzz', 5, fired.append, 'buzz')
+    clock.now = 5
+    assert svc.run_due() == 1
+    assert fired == []
+    assert [(t.owner, t.name) for t in handed] == [('G', 'buzz')]
+    handed[0].callback(*handed[0].args)
+    assert fired == ['buzz']
@@ -0,0 +1,65 @@
+import pytest
+
+import game_events
+import game_logic
+import wire
+
+
+def expand(table, data):
+    # Mirror of Frames.expand in static/js/frames.js
+    round_no, cat_idx, clue_idx = data['ref']
+    assert table['round'] == round_no
+    cat = table['categories'][cat_idx]
+    clue = dict(cat['clues'][clue_idx], cat_idx=cat_idx, clue_idx=clue_idx, category=cat['category'])
+    clue.update((k, v) for k, v in data.items() if k != 'ref')
+    return clue
+
+
+def test_clues_are_sent_as_references_into_the_round_table():
+    g = game_logic.Game()
+    clue = g.get_clue(2, 3)
+    dd = dict(clue, dd_player_name='Ann')
+    table = wire.clue_table(g)
+    for data in (clue, dd):
+        ref = wire.intern_clue(g, data)
+        assert 'text' not in ref and 'answer' not in ref
+        assert expand(table, ref) == data
+    assert wire.intern_clue(g, {'text': 'no ids'}) == {'text': 'no ids'}
+
+
+def test_msgpack_frames_round_trip():
+    msgpack = pytest.importorskip('msgpack')
+    g = game_logic.Game()
+    frame = {'v': 3, 'phase': g.phase(), 'events': [['hide_clue'], ['show_clue', g.get_clue(0, 0)], ['buzzers_locked']]}
+    decoded = msgpack.unpackb(wire.encode_frame(g, frame))
+    assert decoded['v'] == 3
+    assert [e[0] for e in decoded['events']] == ['hide_clue', 'show_clue', 'buzzers_locked']
+    assert expand(msgpack.unpackb(wire.encode(wire.clue_table(g))), decoded['events'][1][1]) == g.get_clue(0, 0)
+
+
+def test_players_get_the_table_without_answers():
+    g = game_logic.Game()
+    assert all('answer' in clue for cat in wire.clue_table(g)['categories'] for clue in cat['clues'])
+    table = wire.clue_table(g, answers=False)
+    assert not any('answer' in clue for cat in table['categories'] for clue in cat['clues'])
+    g.start_round_2()
+    event = wire.compact_event(g, ['round_2_started', {'board_state': g.board_state}])
+    assert event[1]['clue_table'] == wire.clue_table(g, answers=False)
+    clue = g.get_clue(1, 1)
+    assert expand(event[1]['clue_table'], wire.intern_clue(g, clue)) == {k: v for k, v in clue.items() if k != 'answer'}
+
+
+def test_only_the_host_gets_the_answer(monkeypatch):
+    sent = []
+    monkeypatch.setattr(game_events, 'transport', type('Transport', (), {
+        'emit': lambda self, event, data=None, to=None: sent.append((event, data, to)),
+        'listening': lambda self, room: room != 'WIRE/msgpack'})())  # Nobody on the msgpack wire: no frame encoded
+    g = game_logic.Game('WIRE')
+    clue = g.get_clue(1, 2)
+    with game_events.game_frame(g):
+        game_events.broadcast(g.code, 'show_clue', clue)
+    (_, frame, room), answer = sent
+    assert room == 'WIRE/json' and frame['events'] == [['show_clue', game_events.public_clue(clue)]]
+    assert 'answer' not in frame['events'][0][1]
+    assert answer == ('clue_answer', {'cat_idx': 1, 'clue_idx': 2, 'answer': clue['answer']}, 'WIRE/admin')
+    game_events.frame_history.pop(g.code, None)
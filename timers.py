@@ -0,0 +1,129 @@
+import heapq
+import itertools
+import threading
+import time
+import traceback
+
+# One scheduler per process for every game timer (buzz window, answer window,
+# deferred clue closing, housekeeping sweeps).
+#
+# Timers are owned by a game code and named, e.g. ('PUB1', 'answer'). Scheduling
+# a name that is already pending replaces it, and cancel()/cancel_owner() remove
+# timers for real instead of leaving a sleeping task behind to notice later that
+# it is stale. Pending timers sit in a heap; cancelled entries are skipped when
+# popped and compacted away once they make up most of the heap.
+
+
+class Timer:
+    __slots__ = ('owner', 'name', 'delay', 'deadline', 'wall_deadline', 'callback', 'args', 'cancelled')
+
+    def __init__(self, owner, name, delay, deadline, wall_deadline, callback, args):
+        self.owner = owner
+        self.name = name
+        self.delay = delay
+        self.deadline = deadline  # On the service clock
+        self.wall_deadline = wall_deadline  # Epoch seconds, what clients count down to
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def countdown(self, show_countdown=True):
+        # Payload for the clients' start_timer event, taken from the same deadline the server enforces
+        return {'duration': self.delay, 'deadline': self.wall_deadline, 'show_countdown': show_countdown}
+
+
+class TimerService:
+    def __init__(self, clock=time.monotonic, wall_clock=time.time, max_wait=1.0, on_fire=None, runner=None):
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.max_wait = max_wait
+        self.on_fire = on_fire  # Called as on_fire(timer, seconds late) before each callback
+        # Called as runner(timer) to run a due timer's callback somewhere else (e.g.
+        # on an asyncio loop when this service runs in its own thread); by
+        # default callbacks run on the scheduler loop itself
+        self.runner = runner
+        self._heap = []  # (deadline, seq, Timer)
+        self._seq = itertools.count()
+        self._owned = {}  # (owner, name) -> Timer
+        self._cancelled = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def schedule(self, owner, name, delay, callback, *args):
+        now = self.clock()
+        timer = Timer(owner, name, delay, now + delay, self.wall_clock() + delay, callback, args)
+        with self._lock:
+            self._cancel_locked(owner, name)
+            self._owned[(owner, name)] = timer
+            heapq.heappush(self._heap, (timer.deadline, next(self._seq), timer))
+            earliest = self._heap[0][2] is timer
+        if earliest:
+            self._wakeup.set()
+        return timer
+
+    def get(self, owner, name):
+        return self._owned.get((owner, name))
+
+    def cancel(self, owner, name):
+        with self._lock:
+            return self._cancel_locked(owner, name)
+
+    def cancel_owner(self, owner):
+        with self._lock:
+            for key in [k for k in self._owned if k[0] == owner]:
+                self._cancel_locked(*key)
+
+    def _cancel_locked(self, owner, name):
+        timer = self._owned.pop((owner, name), None)
+        if timer is None:
+            return False
+        timer.cancelled = True
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        return True
+
+    def pending(self):
+        return len(self._owned)
+
+    def next_deadline(self):
+        with self._lock:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+                self._cancelled -= 1
+            return self._heap[0][0] if self._heap else None
+
+    def run_due(self, now=None):
+        # Fire every timer whose deadline has passed; returns how many ran
+        now = self.clock() if now is None else now
+        fired = 0
+        while True:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > now:
+                    return fired
+                _, _, timer = heapq.heappop(self._heap)
+                if timer.cancelled:
+                    self._cancelled -= 1
+                    continue
+                del self._owned[(timer.owner, timer.name)]
+            fired += 1
+            try:
+                if self.on_fire is not None:
+                    self.on_fire(timer, self.clock() - timer.deadline)
+                if self.runner is not None:
+                    self.runner(timer)
+                else:
+                    timer.callback(*timer.args)
+            except Exception:
+                traceback.print_exc()
+
+    def run_forever(self):
+        # The single scheduler loop; start it once per process as a background task
+        while True:
+            self._wakeup.clear()
+            self.run_due()
+            deadline = self.next_deadline()
+            wait = self.max_wait if deadline is None else min(self.max_wait, max(0.0, deadline - self.clock()))
+            self._wakeup.wait(wait)
@@ -0,0 +1,113 @@
+import json
+
+from flask import Flask, Response, render_template, request
+
+import analytics
+import game_events
+import game_logic
+import media
+import pagecache
+import telemetry
+
+# The HTML pages and plain HTTP endpoints. Both server runtimes serve this app
+# next to their Socket.IO server (see app.py and asgi_app.py).
+
+app = Flask(__name__, static_folder=None)
+app.config['SECRET_KEY'] = 'secret!'
+media.install(app, game_events.assets)
+
+@app.route('/')
+def lobby():
+    return render_template('lobby.html', game_code=request.args.get('game', ''))
+
+# Pages pick their game with ?game=CODE; the default game keeps old links working
+
+@app.route('/board')
+def board():
+    # The page is a static shell for its game, rendered once; the grid comes from /board/data
+    code = game_logic.normalize_code(request.args.get('game'))
+    return pagecache.send(game_events.pages.get('board', code, game_events.sound_dir, lambda: render_template(
+        'board.html', game_code=code, sound_dir=game_events.sound_dir, sound_names=game_events.sound_names)))
+
+@app.route('/board/data')
+def board_data():
+    # The current round's grid as JSON, re-rendered only when the board changes
+    with game_events.registry.session(request.args.get('game')) as game:
+        version = (game.game_id, game.current_round, game.board_version)
+        rendered = game_events.pages.get('board_data', game.code, version, lambda: json.dumps(
+            dict(game.board_view(), game=game.code)), mimetype='application/json')
+    return pagecache.send(rendered)
+
+@app.route('/player')
+def player():
+    name = request.args.get('name', 'Anonymous')
+    with game_events.registry.session(request.args.get('game')) as game:
+        return render_template('player.html', name=name, game_code=game.code)
+
+@app.route('/admin')
+def admin():
+    code = game_logic.normalize_code(request.args.get('game'))
+    return pagecache.send(game_events.pages.get('admin', code, None, lambda: render_template('admin.html', game_code=code)))
+
+@app.route('/watch')
+def watch():
+    # Read-only spectator page, fed by /watch/stream rather than Socket.IO
+    return render_template('watch.html', game_code=game_logic.normalize_code(request.args.get('game')))
+
+@app.route('/watch/stream')
+def watch_stream():
+    game_events.start_background_services()
+    code = game_logic.normalize_code(request.args.get('game'))
+    return Response(game_events.spectator_hub.stream(code), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/watch/state')
+def watch_state():
+    # Current projection as JSON; spectator.py polls this for the games it serves
+    game = game_events.registry.peek(request.args.get('game'))
+    if game is None:
+        return Response('{}', status=404, mimetype='application/json')
+    return Response(game_events.spectator_view(game), mimetype='application/json')
+
+@app.route('/metrics')
+def metrics_endpoint():
+    game_events.games_held.set(len(game_events.registry.games))
+    game_events.spectator_watchers.set(game_events.spectator_hub.watchers())
+    game_events.pending_timers.set(game_events.timer_service.pending())
+    return Response(game_events.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/analytics')
+def analytics_endpoint():
+    # Reaction-time, accuracy and lockout report over the recorded plays, for
+    # ?game=CODE only and/or plays at or after ?since=<epoch seconds> if given
+    if game_events.play_store is None:
+        return Response('{"error": "ANALYTICS_DIR is not set"}', status=404, mimetype='application/json')
+    game_events.write_plays()  # Include plays not flushed yet
+    code = request.args.get('game')
+    plays = game_events.play_store.load(code=game_logic.normalize_code(code) if code else None,
+                                        since=request.args.get('since', type=float))
+    return Response(json.dumps(analytics.report(plays, limit=request.args.get('limit', 100, type=int))),
+                    mimetype='application/json')
+
+@app.route('/profile/<code>', methods=['GET', 'POST', 'DELETE'])
+def profile_game(code):
+    # POST starts profiling one game's event handlers (for ?seconds=N if given),
+    # DELETE stops it, GET returns the cProfile report so far
+    code = game_logic.normalize_code(code)
+    if request.method == 'POST':
+        if not game_events.profiler.start(code):
+            busy = ', '.join(game_events.profiler.active)
+            return Response(f'Already profiling {busy}; one game at a time\n', status=409, mimetype='text/plain')
+        seconds = request.args.get('seconds', type=float)
+        if seconds:
+            game_events.timer_service.schedule(code, 'profile', seconds, game_events.profiler.stop, code)
+        telemetry.log('profile_started', game=code, seconds=seconds)
+        return Response(f'Profiling {code}\n', mimetype='text/plain')
+    if request.method == 'DELETE':
+        game_events.timer_service.cancel(code, 'profile')
+        stopped = game_events.profiler.stop(code)
+        return Response('Stopped\n' if stopped else 'Not profiling\n', mimetype='text/plain')
+    report = game_events.profiler.report(code, limit=request.args.get('limit', 40, type=int))
+    if report is None:
+        return Response(f'{code} has not been profiled\n', status=404, mimetype='text/plain')
+    return Response(report, mimetype='text/plain')
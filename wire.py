@@ -0,0 +1,72 @@
+try:
+    import msgpack
+except ImportError:  # Optional: without it every client gets JSON
+    msgpack = None
+
+# Opt-in binary encoding for frames. Pages that connect with ?wire=msgpack (and
+# a server with msgpack installed) get each frame as one MessagePack blob in a
+# Socket.IO binary attachment; everyone else keeps getting JSON.
+#
+# Clue dicts are interned: a msgpack client is sent the round's clue table once
+# (on connect, and to players in the round_2_started event; board and host
+# pages reload then), after which show_clue and show_daily_double carry only a
+# [round, cat_idx, clue_idx] reference plus the fields the table doesn't hold.
+# frames.js expands references before running handlers, so handlers see the
+# same dicts as JSON clients. Only board and host pages get the answers.
+
+ENCODINGS = ('json', 'msgpack') if msgpack else ('json',)
+
+CLUE_FIELDS = ('cat_idx', 'clue_idx', 'category', 'text', 'value', 'answer', 'type', 'media_url')
+INTERNED_EVENTS = ('show_clue', 'show_daily_double')
+
+
+def client_encoding(args):
+    # Encoding for a socket, from its connect query string
+    wanted = args.get('wire', 'json')
+    return wanted if wanted in ENCODINGS else 'json'
+
+
+def room(code, encoding):
+    # Every socket joins its game's room plus the room for its encoding
+    return f'{code}/{encoding}'
+
+
+def clue_table(game, answers=True):
+    # Daily Double placement stays out of the table; it rides on each reference
+    fields = [k for k in CLUE_FIELDS[3:] if answers or k != 'answer']
+    categories = []
+    for cat_idx, cat in enumerate(game.round_data):
+        clues = [game.get_clue(cat_idx, clue_idx) for clue_idx in range(len(cat['clues']))]
+        categories.append({'category': cat['category'],
+                           'clues': [{k: clue[k] for k in fields} for clue in clues]})
+    return {'round': game.current_round, 'categories': categories}
+
+
+def intern_clue(game, data):
+    base = game.get_clue(data.get('cat_idx', -1), data.get('clue_idx', -1))
+    if base is None:
+        return data
+    out = {'ref': [game.current_round, base['cat_idx'], base['clue_idx']]}
+    for k, v in data.items():
+        if k not in CLUE_FIELDS or base[k] != v:
+            out[k] = v
+    return out
+
+
+def compact_event(game, event):
+    name = event[0]
+    if len(event) > 1 and isinstance(event[1], dict):
+        if name in INTERNED_EVENTS:
+            return [name, intern_clue(game, event[1])]
+        if name == 'round_2_started':
+            # Board and host pages reload and fetch the new table; players take this one
+            return [name, dict(event[1], clue_table=clue_table(game, answers=False))]
+    return event
+
+
+def encode_frame(game, frame):
+    return msgpack.packb(dict(frame, events=[compact_event(game, e) for e in frame['events']]))
+
+
+def encode(data):
+    return msgpack.packb(data)